@@ -1,9 +1,23 @@
 import streamlit as st
 from pathlib import Path
+import os
 import json
 from typing import Dict, List, Optional
-from data_loader import load_workspace_data, WorkspaceData
-from ui_components import render_sidebar, render_conversation
+from data_loader import load_workspace_data, LoadProgress, WorkspaceData, DEFAULT_LAZY_MEMORY_BUDGET
+from background_loader import BackgroundLoad
+from load_profile import LoadProfile
+from workspace_cache import default_cache_path
+from search_index import get_message_index
+from conversation_index import get_conversation_index
+from sqlite_store import default_db_path, import_export, open_sqlite_workspace
+from ui_components import render_analytics, render_load_profile, render_sidebar, render_conversation
+from workspace_registry import RegistryKey, export_version, get_registry
+from workspace_refresh import refresh_workspace_data
+
+# How often "Watch for changes" checks the export for new or changed files
+WATCH_INTERVAL_SECONDS = 30
+# How often the progress of a background load is refreshed
+LOAD_POLL_SECONDS = 1
 
 st.set_page_config(
     page_title="Slack Export Explorer",
@@ -20,33 +34,303 @@ if "search_query" not in st.session_state:
 if "workspace_data" not in st.session_state:
     st.session_state.workspace_data = None
 
+def reload_export() -> Optional[str]:
+    """
+    Switch this session to the current version of its export, if files changed since it was loaded.
+    Message-list workspaces are refreshed incrementally, others reloaded. Returns a status message.
+    """
+    handle = st.session_state.get("workspace_handle")
+    if handle is None:
+        return None
+    version = export_version(handle.key.export_path)
+    if version == handle.key.version:
+        return None
+
+    registry = get_registry()
+    key, old_workspace, loader = handle.key, handle.workspace, registry.loader_for(handle.key)
+    # Let go of the old version first, so it can be dropped as soon as the new one is in (unless other
+    # sessions still use it)
+    del handle
+    st.session_state.pop("workspace_handle")
+    summary = None
+    def build() -> WorkspaceData:
+        nonlocal summary
+        if old_workspace.sources is None:
+            return loader()
+        workspace_data, summary = refresh_workspace_data(old_workspace, key.export_path)
+        if old_workspace.search_index is not None:
+            get_message_index(workspace_data)
+        get_conversation_index(workspace_data)
+        return workspace_data
+
+    new_handle = registry.acquire(key._replace(version=version), loader, build)
+    st.session_state.workspace_handle = new_handle
+    st.session_state.workspace_data = new_handle.workspace
+    if summary is None:  # Reloaded in full, or another session already had this version
+        return "Loaded the updated export"
+    return (f"Merged {summary.new_files} new and {summary.changed_files} changed day files "
+            f"({summary.messages_after - summary.messages_before:+d} messages)")
+
+@st.fragment(run_every=WATCH_INTERVAL_SECONDS)
+def watch_export() -> None:
+    """Polls the export while "Watch for changes" is on"""
+    status = reload_export()
+    if status:
+        st.session_state.reload_status = status
+        st.rerun()
+
+def render_loaded_exports() -> None:
+    """Workspaces held by this server process, shared between sessions"""
+    registry = get_registry()
+    with st.expander("🗂️ Loaded exports"):
+        if "reload_status" in st.session_state:
+            st.caption(st.session_state.pop("reload_status"))
+        reload_col, watch_col = st.columns(2)
+        if reload_col.button("Reload changed files", help="Parse only new or changed day files and merge them in"):
+            st.session_state.reload_status = reload_export() or "The export hasn't changed"
+            st.rerun()
+        if watch_col.checkbox("Watch for changes", key="watch_export",
+                              help=f"Check the export for new files every {WATCH_INTERVAL_SECONDS} seconds"):
+            watch_export()
+
+        st.dataframe(registry.stats(), hide_index=True, use_container_width=True)
+        close_col, prune_col = st.columns(2)
+        if close_col.button("Close export", help="Release this session's reference and go back to the load screen"):
+            st.session_state.pop("workspace_handle", None)
+            st.session_state.workspace_data = None
+            st.session_state.selected_channel = None
+            st.rerun()
+        if prune_col.button("Free unused", help="Drop loaded exports no session is using"):
+            st.toast(f"Dropped {registry.prune()} unused export(s)")
+
+def format_duration(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    return f"{minutes}m {seconds:02d}s" if minutes else f"{seconds}s"
+
+@st.fragment(run_every=LOAD_POLL_SECONDS)
+def render_load_progress() -> None:
+    """Progress of the session's background load, refreshed on its own while the rest of the page stays put"""
+    load = st.session_state.get("background_load")
+    if load is None:
+        return
+    progress = load.progress
+    # The whole page reruns when the load ends or more conversations are ready for the sidebar
+    if load.done or progress.channels_done != st.session_state.get("load_channels_seen"):
+        st.rerun()
+
+    fraction = progress.files_done / progress.files_total if progress.files_total else 0.0
+    st.progress(
+        min(fraction, 1.0),
+        text=f"{progress.phase}: {progress.channels_done}/{len(progress.channels)} conversations, "
+             f"{progress.files_done}/{progress.files_total} day files, {progress.messages:,} messages"
+    )
+    eta = progress.eta_seconds
+    status_col, cancel_col = st.columns([3, 1])
+    status_col.caption(
+        f"{format_duration(progress.elapsed_seconds)} elapsed"
+        + (f", about {format_duration(eta)} left" if eta is not None else "")
+    )
+    if progress.cancelled:
+        cancel_col.caption("Cancelling...")
+    else:
+        cancel_col.button("Cancel loading", on_click=load.cancel)
+
+    with st.expander("Progress per conversation"):
+        rows = [
+            {
+                "conversation": channel.name,
+                "status": "done" if channel.done else "loading" if channel.files_done else "waiting",
+                "day files": f"{channel.files_done}/{channel.files_total}",
+                "messages": channel.messages,
+            }
+            for channel in list(progress.channels.values())
+        ]
+        rows.sort(key=lambda row: {"loading": 0, "waiting": 1, "done": 2}[row["status"]])
+        st.dataframe(rows, hide_index=True, use_container_width=True)
+
+def finish_background_load(load: BackgroundLoad) -> None:
+    """Take over the result of a finished background load"""
+    st.session_state.pop("background_load", None)
+    st.session_state.pop("load_channels_seen", None)
+    if load.handle is not None:
+        st.session_state.workspace_handle = load.handle
+        st.session_state.workspace_data = load.handle.workspace
+        st.session_state.load_status = ("success", f"Data loaded successfully in {format_duration(load.progress.elapsed_seconds)}!")
+        return
+    st.session_state.workspace_data = None
+    st.session_state.selected_channel = None
+    if load.cancelled:
+        st.session_state.load_status = ("info", "Loading cancelled")
+    else:
+        st.session_state.load_status = ("error", f"Error loading data: {str(load.error)}")
+
 def main():
     st.title("Slack Export Explorer")
 
+    load = st.session_state.get("background_load")
+    if load is not None and load.done:
+        finish_background_load(load)
+        load = None
+    if "load_status" in st.session_state:
+        level, message = st.session_state.pop("load_status")
+        getattr(st, level)(message)
+
     # Check if data is loaded
-    if st.session_state.workspace_data is None:
+    if st.session_state.workspace_data is None and load is None:
         export_path = st.text_input(
-            "Enter the path to your Slack export directory:",
+            "Enter the path to your Slack export directory or .zip file:",
             value=str(Path("exported").absolute()),
-            help="This should be the directory containing channels.json, users.json, etc."
+            help="This should be the directory (or the export .zip as downloaded from Slack) containing "
+                 "channels.json, users.json, etc."
+        )
+        older_exports = st.text_area(
+            "Older exports to merge in (optional, one path per line, oldest first):",
+            help="Periodic exports overlap: these are loaded together with the export above as one workspace. "
+                 "Messages found in several exports are kept once, as the newest export has them."
+        )
+
+        backend = st.radio(
+            "Storage",
+            options=["memory", "sqlite"],
+            format_func=lambda x: {
+                "memory": "In memory",
+                "sqlite": "SQLite database (for very large exports)"
+            }[x],
+            horizontal=True,
+            help="The SQLite option imports the export into `.explorer_cache/workspace.sqlite3` once "
+                 "(later loads only import new or changed day files) and reads messages page by page."
+        )
+        in_memory = backend == "memory"
+
+        use_cache = st.checkbox(
+            "Cache parsed data",
+            value=True,
+            help="Keeps a compressed copy of the parsed export in `.explorer_cache/` so the next load "
+                 "only re-parses channels whose files changed.",
+            disabled=not in_memory
+        )
+
+        lazy = st.checkbox(
+            "Load messages on demand",
+            value=False,
+            disabled=not in_memory,
+            help="Only users and channels are loaded up front; a conversation's messages are parsed when "
+                 "you open it, and the least recently viewed ones are dropped once the memory budget is used."
+        )
+        lazy_budget_mb = st.number_input(
+            "On-demand memory budget (MB)",
+            min_value=16,
+            value=DEFAULT_LAZY_MEMORY_BUDGET // (1024 * 1024),
+            disabled=not (in_memory and lazy)
+        )
+
+        columnar = st.checkbox(
+            "Compact columnar storage",
+            value=False,
+            disabled=not in_memory or lazy,
+            help="Keeps messages in NumPy arrays instead of one Python object per message, several times "
+                 "less memory for big exports. The parsed-data cache isn't used in this mode."
+        )
+
+        workers = st.number_input(
+            "Parser processes",
+            min_value=1,
+            max_value=os.cpu_count() or 1,
+            value=1,
+            help="Number of processes used to parse channel folders in parallel. 1 parses in-process, which "
+                 "is faster for small exports: starting the processes costs more than they save.",
+            disabled=not in_memory or lazy
+        )
+
+        profile_load = st.checkbox(
+            "Profile the load",
+            value=False,
+            disabled=not in_memory or lazy or columnar,
+            help="Measures time per load phase and per conversation, shown once loaded. Conversations are "
+                 "parsed in one process. For memory figures, run load_profile.py from the command line."
         )
 
         if st.button("Load Export Data"):
-            with st.spinner("Loading workspace data..."):
-                try:
-                    st.session_state.workspace_data = load_workspace_data(export_path)
-                    st.success("Data loaded successfully!")
-                    st.rerun()
-                except Exception as e:
-                    st.error(f"Error loading data: {str(e)}")
+            try:
+                # Loaded workspaces are shared by every session that opens the same export version
+                # with the same options, only the first one pays for loading it
+                export_path = os.path.abspath(export_path)
+                older_paths = [os.path.abspath(path.strip()) for path in older_exports.splitlines() if path.strip()]
+                if older_paths:
+                    if backend == "sqlite":
+                        raise ValueError("Merged exports can only be loaded into memory")
+                    export_path = os.pathsep.join([*older_paths, export_path])  # see split_export_paths
+                if backend == "sqlite":
+                    options = ("sqlite",)
+                    def loader(progress: Optional[LoadProgress] = None) -> WorkspaceData:
+                        db_path = default_db_path(export_path)
+                        import_export(export_path, db_path, progress=progress)
+                        workspace_data = open_sqlite_workspace(db_path)
+                        get_conversation_index(workspace_data)
+                        return workspace_data
+                else:
+                    options = ("memory", f"lazy {lazy_budget_mb} MB" if lazy else "eager",
+                               "columnar" if columnar else "objects")
+                    if older_paths:  # Merged loads are always eager Message lists, see load_workspace_data
+                        options = ("memory", "merged")
+                    elif profile_load:  # Its own registry entry, so the load really runs (and is measured)
+                        options = (*options, "profiled")
+                    def loader(progress: Optional[LoadProgress] = None) -> WorkspaceData:
+                        cache_path = default_cache_path(export_path) if use_cache else None
+                        # No tracemalloc here: it would trace (and slow down) every session of the server
+                        profile = LoadProfile(trace_memory=False) if profile_load and not older_paths else None
+                        workspace_data = load_workspace_data(
+                            export_path,
+                            cache_path=cache_path,
+                            workers=int(workers),
+                            lazy=lazy,
+                            lazy_max_bytes=int(lazy_budget_mb) * 1024 * 1024,
+                            columnar=columnar,
+                            progress=progress,
+                            profile=profile
+                        )
+                        workspace_data.load_profile = profile
+                        if progress:
+                            progress.phase = "Building indexes"
+                        if not lazy:  # In lazy mode the index is built on the first message search instead
+                            get_message_index(workspace_data)
+                        get_conversation_index(workspace_data)
+                        return workspace_data
+
+                # Parsed on a worker thread: this session keeps rerunning to show progress meanwhile
+                key = RegistryKey(export_path, export_version(export_path), options)
+                st.session_state.background_load = BackgroundLoad(get_registry(), key, loader)
+                st.rerun()
+            except Exception as e:
+                st.error(f"Error loading data: {str(e)}")
+        return
+
+    if load is not None:
+        # Still loading: browse what's ready so far, the rest of the conversations show as pending
+        st.session_state.load_channels_seen = load.progress.channels_done  # What this rerun shows
+        render_load_progress()
+        st.session_state.workspace_data = load.progress.snapshot()
+        if st.session_state.workspace_data is None:  # Channels not known yet, or a backend that can't be browsed early
+            return
+        with st.sidebar:
+            render_sidebar(pending=load.progress.pending())
+        if st.session_state.selected_channel:
+            render_conversation()
+        else:
+            st.info("👈 Conversations can be opened from the sidebar as soon as they're loaded")
         return
 
     # Split into sidebar and main content
     with st.sidebar:
         render_sidebar()
+        render_loaded_exports()
 
     # Main content area
-    if st.session_state.selected_channel:
+    if st.session_state.workspace_data.load_profile is not None:
+        render_load_profile(st.session_state.workspace_data)
+    if st.session_state.get("conversation_type") == "analytics":
+        render_analytics()
+    elif st.session_state.selected_channel:
         render_conversation()
     else:
         st.info("👈 Select a channel or DM from the sidebar to view conversations")
@@ -0,0 +1,52 @@
+"""
+Loads a workspace on a background thread, so the app can show progress and stay usable meanwhile.
+
+`BackgroundLoad` runs the registry load (see workspace_registry.py) on a worker thread with a
+`LoadProgress` the loader reports to. The session keeps the `BackgroundLoad` in its state and polls it
+on reruns: the progress counts, the partial workspace to browse (`progress.snapshot()`), and when the
+thread is done, either the handle to the loaded workspace or what went wrong. Cancelling sets a flag the
+loader checks after every day file, so the thread stops within one file (one channel per pool worker).
+
+The worker thread never touches Streamlit: everything it produces is read by the session's own reruns.
+"""
+import threading
+from typing import Callable, Optional
+
+from data_loader import LoadCancelled, LoadProgress, WorkspaceData
+from workspace_registry import RegistryKey, WorkspaceHandle, WorkspaceRegistry
+
+class BackgroundLoad:
+    def __init__(
+        self,
+        registry: WorkspaceRegistry,
+        key: RegistryKey,
+        loader: Callable[[Optional[LoadProgress]], WorkspaceData]
+    ):
+        self.key = key
+        self.progress = LoadProgress()
+        self.handle: Optional[WorkspaceHandle] = None
+        self.error: Optional[Exception] = None
+        self.cancelled = False
+        # The registry keeps loader itself for later reloads, this one load reports progress
+        self._thread = threading.Thread(
+            target=self._run,
+            args=(registry, loader),
+            name=f"load {key.export_path}",
+            daemon=True  # Don't keep the server from exiting over a load nobody waits for
+        )
+        self._thread.start()
+
+    def _run(self, registry: WorkspaceRegistry, loader: Callable[[Optional[LoadProgress]], WorkspaceData]) -> None:
+        try:
+            self.handle = registry.acquire(self.key, loader, build=lambda: loader(self.progress))
+        except LoadCancelled:
+            self.cancelled = True
+        except Exception as e:
+            self.error = e
+
+    @property
+    def done(self) -> bool:
+        return not self._thread.is_alive()
+
+    def cancel(self) -> None:
+        self.progress.cancel()
@@ -0,0 +1,59 @@
+"""
+Benchmark serial vs. parallel parsing in `load_workspace_data`.
+
+Usage:
+    python benchmark_loader.py                          # generate a synthetic export in a temp dir
+    python benchmark_loader.py --export ../exported     # benchmark a real export
+    python benchmark_loader.py --workers 1 2 4 8 --channels 200 --days 120
+"""
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from data_loader import load_workspace_data
+from synthetic_export import SyntheticExportConfig, write_synthetic_export
+
+def time_load(export_path: str, workers: int, repeat: int) -> float:
+    """Best-of-N wall time for a full (uncached) load"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        load_workspace_data(export_path, workers=workers)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--export", help="Existing export directory (default: generate a synthetic one)")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1])
+    parser.add_argument("--channels", type=int, default=100)
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--messages-per-day", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        export_path = args.export
+        if not export_path:
+            export_path = tmp_dir
+            print(f"Generating synthetic export ({args.channels} channels x {args.days} days x "
+                  f"{args.messages_per_day} messages)...")
+            write_synthetic_export(Path(tmp_dir), SyntheticExportConfig(
+                channels=args.channels, days=args.days, messages_per_day=args.messages_per_day
+            ))
+
+        workspace = load_workspace_data(export_path)
+        total_messages = sum(len(m) for m in workspace.messages.values())
+        print(f"{len(workspace.messages)} conversations, {total_messages:,} messages, {os.cpu_count()} CPUs\n")
+
+        baseline = None
+        print(f"{'workers':>8} {'seconds':>10} {'speedup':>8}")
+        for workers in sorted(set(args.workers)):
+            seconds = time_load(export_path, workers, args.repeat)
+            baseline = baseline or seconds
+            print(f"{workers:>8} {seconds:>10.2f} {baseline / seconds:>7.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+Benchmark suite: load time, peak memory and per-phase timings on a synthetic (or real) export.
+
+Every scenario runs in a fresh process, so its peak RSS isn't inflated by the ones before it. Within a
+scenario the phases run in the order the app goes through them:
+
+- load_workspace_data, split into reading users/channels and parsing the messages
+- thread grouping as done by render_conversation: a ThreadIndex per channel, then the first page
+- mention parsing: parse_user_mentions over every message, then filling and re-reading the RenderCache
+
+"peak MB" is the process's peak RSS at the end of each phase (it never goes down).
+
+Usage:
+    python benchmark_suite.py                            # default synthetic export in a temp dir
+    python benchmark_suite.py --channels 200 --thread-ratio 0.3 --json results.json
+    python benchmark_suite.py --export ../exported --modes default cached columnar
+"""
+import argparse
+import json
+import multiprocessing
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from synthetic_export import SyntheticExportConfig, add_config_arguments, config_from_arguments, write_synthetic_export
+
+MODES = ["default", "cached", "columnar"]
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident memory of this process so far"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024  # bytes on macOS, KB elsewhere
+
+class PhaseTimer:
+    def __init__(self):
+        self.phases: List[Dict] = []
+
+    def run(self, name: str, fn: Callable, *args, **kwargs):
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        self.phases.append({"phase": name, "seconds": time.perf_counter() - start, "peak_mb": peak_rss_mb()})
+        return result
+
+def _parse_messages(export_dir, channels, users) -> int:
+    from data_loader import existing_channel_dirs, parse_channels
+    return sum(len(messages) for _, (messages, _) in parse_channels(existing_channel_dirs(export_dir, channels, users)))
+
+def _load_phases(export_path: str, timer: PhaseTimer) -> None:
+    # The steps of an uncached list load, timed one by one
+    from data_loader import load_channels, load_users, open_export
+    export_dir = open_export(export_path)
+    users = timer.run("load: users.json", load_users, export_dir)
+    channels = timer.run("load: channels/DMs/MPDMs", load_channels, export_dir, users)
+    timer.run("load: parse messages", _parse_messages, export_dir, channels, users)
+
+def _group_threads(workspace) -> int:
+    from thread_index import get_thread_index
+    return sum(len(get_thread_index(workspace, channel_id).order) for channel_id in workspace.messages)
+
+def _first_pages(workspace, page_size: int) -> int:
+    # What render_conversation does per rerun once the index exists
+    from thread_index import get_thread_index
+    shown = 0
+    for channel_id, messages in workspace.messages.items():
+        positions = get_thread_index(workspace, channel_id).display_order(True)[:page_size]
+        shown += len([messages[position] for position in positions])
+    return shown
+
+def _parse_mentions(workspace) -> int:
+    from render_cache import parse_user_mentions
+    return sum(
+        len(parse_user_mentions(msg.text, workspace.users))
+        for messages in workspace.messages.values() for msg in messages
+    )
+
+def _fill_render_cache(workspace) -> int:
+    from render_cache import get_render_cache
+    render_cache = get_render_cache(workspace)
+    count = 0
+    for channel_id, messages in workspace.messages.items():
+        for msg in messages:
+            render_cache.get(channel_id, msg, workspace.users)
+            count += 1
+    return count
+
+def run_scenario(export_path: str, mode: str, cache_dir: str, page_size: int) -> Dict:
+    """One scenario, meant to run in its own process"""
+    from data_loader import load_workspace_data
+    timer = PhaseTimer()
+    if mode == "default":
+        _load_phases(export_path, timer)
+    options = {"cached": {"cache_path": cache_dir}, "columnar": {"columnar": True}}.get(mode, {})
+    workspace = timer.run("load_workspace_data", load_workspace_data, export_path, **options)
+    timer.run("threads: build ThreadIndex", _group_threads, workspace)
+    timer.run(f"threads: first {page_size} of each channel", _first_pages, workspace, page_size)
+    timer.run("mentions: parse_user_mentions", _parse_mentions, workspace)
+    timer.run("mentions: RenderCache fill", _fill_render_cache, workspace)
+    timer.run("mentions: RenderCache hits", _fill_render_cache, workspace)
+    return {
+        "mode": mode,
+        "conversations": len(workspace.messages),
+        "messages": sum(len(messages) for messages in workspace.messages.values()),
+        "phases": timer.phases,
+    }
+
+def run_isolated(*args) -> Dict:
+    # spawn rather than fork: a forked child would start with the parent's peak RSS
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        return pool.apply(run_scenario, args)
+
+def print_scenario(result: Dict) -> None:
+    print(f"\n[{result['mode']}] {result['conversations']} conversations, {result['messages']:,} messages")
+    print(f"{'phase':<36} {'seconds':>9} {'peak MB':>9}")
+    for phase in result["phases"]:
+        peak = f"{phase['peak_mb']:.0f}" if phase["peak_mb"] is not None else "n/a"
+        print(f"{phase['phase']:<36} {phase['seconds']:>9.3f} {peak:>9}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--export", help="Existing export directory or .zip (default: generate a synthetic one)")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=MODES,
+                        help="cached runs twice: a cold run that writes the cache, then a warm one")
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--json", help="Also write the results to this file")
+    add_config_arguments(parser, SyntheticExportConfig(
+        users=200, channels=50, dms=100, mpdms=20, days=60, messages_per_day=50,
+        thread_ratio=0.2, attachment_ratio=0.05, mention_ratio=0.1
+    ))
+    args = parser.parse_args()
+    config = config_from_arguments(args)
+
+    results = {"export": args.export, "config": None if args.export else config.__dict__, "scenarios": []}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        export_path = args.export
+        if not export_path:
+            export_path = str(Path(tmp_dir) / "export")
+            print(f"Generating synthetic export: {config}")
+            start = time.perf_counter()
+            write_synthetic_export(Path(export_path), config)
+            print(f"Generated in {time.perf_counter() - start:.1f}s")
+
+        cache_dir = str(Path(tmp_dir) / "cache")
+        for mode in args.modes:
+            runs = ["cached (cold)", "cached (warm)"] if mode == "cached" else [mode]
+            for label in runs:
+                result = run_isolated(export_path, mode, cache_dir, args.page_size)
+                result["mode"] = label
+                print_scenario(result)
+                results["scenarios"].append(result)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nWrote {args.json}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Columnar, NumPy-backed per-channel message storage.
+
+A `Message` dataclass costs a few hundred bytes (instance __dict__, float objects, a repeated user-id
+string and an attachments list each). `ChannelColumns` keeps a channel's messages as arrays instead:
+
+- ts_us / thread_ts_us: int64 microsecond timestamps parsed straight from Slack's "seconds.micros"
+  strings, so ordering is exact even for messages sent in the same second
+- user_idx: int32 index into a workspace-wide `UserTable` of interned user ids
+- thread_parent: int32 offset of the thread parent within the channel (-1 for top-level messages
+  and for replies whose parent isn't in the export)
+- text_buffer / text_offsets: all texts as one UTF-8 buffer plus n+1 offsets
+- attachments: sparse {offset: files list}, most messages have none
+
+It behaves as a read-only sequence of `Message`s (built on access), so code written against plain
+message lists keeps working.
+"""
+from collections.abc import Sequence
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+from data_loader import ExportPath, Message, iter_day_file, list_day_files
+
+def parse_timestamp_us(ts: str) -> int:
+    """Convert a Slack "1700000000.123456" timestamp to integer microseconds without float rounding"""
+    seconds, _, fraction = ts.partition(".")
+    return int(seconds) * 1_000_000 + int((fraction + "000000")[:6])
+
+class UserTable:
+    """Interned user ids: every distinct id is stored once and referenced by index"""
+
+    def __init__(self):
+        self.ids: List[str] = []
+        self._index: Dict[str, int] = {}
+
+    def intern(self, user_id: str) -> int:
+        index = self._index.get(user_id)
+        if index is None:
+            index = self._index[user_id] = len(self.ids)
+            self.ids.append(user_id)
+        return index
+
+class ChannelColumns(Sequence):
+    """A channel's messages in ts order, stored column-wise"""
+
+    def __init__(
+        self,
+        ts_us: np.ndarray,
+        thread_ts_us: np.ndarray,
+        user_idx: np.ndarray,
+        text_buffer: bytes,
+        text_offsets: np.ndarray,
+        attachments: Dict[int, List[Dict]],
+        user_table: UserTable
+    ):
+        self.ts_us = ts_us
+        self.thread_ts_us = thread_ts_us  # 0 where the message isn't part of a thread
+        self.user_idx = user_idx
+        self.text_buffer = text_buffer
+        self.text_offsets = text_offsets
+        self.attachments = attachments
+        self.user_table = user_table
+        self.thread_parent = self._find_thread_parents()
+
+    @classmethod
+    def from_records(cls, records: List[tuple], user_table: UserTable) -> "ChannelColumns":
+        """Build from (ts_us, thread_ts_us, user_id, text, files) tuples in any order"""
+        ts_us = np.fromiter((r[0] for r in records), dtype=np.int64, count=len(records))
+        order = np.argsort(ts_us, kind="stable")
+        records = [records[i] for i in order]
+
+        encoded = [r[3].encode("utf-8") for r in records]
+        text_offsets = np.zeros(len(records) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=text_offsets[1:])
+
+        return cls(
+            ts_us=ts_us[order],
+            thread_ts_us=np.fromiter((r[1] for r in records), dtype=np.int64, count=len(records)),
+            user_idx=np.fromiter((user_table.intern(r[2]) for r in records), dtype=np.int32, count=len(records)),
+            text_buffer=b"".join(encoded),
+            text_offsets=text_offsets,
+            attachments={i: r[4] for i, r in enumerate(records) if r[4]},
+            user_table=user_table
+        )
+
+    def _find_thread_parents(self) -> np.ndarray:
+        # Replies point at the message whose ts equals their thread_ts; ts_us is sorted so searchsorted finds it
+        parents = np.full(len(self.ts_us), -1, dtype=np.int32)
+        is_reply = (self.thread_ts_us != 0) & (self.thread_ts_us != self.ts_us)
+        if not is_reply.any() or not len(self.ts_us):
+            return parents
+        candidates = np.searchsorted(self.ts_us, self.thread_ts_us[is_reply])
+        candidates = np.minimum(candidates, len(self.ts_us) - 1)
+        found = self.ts_us[candidates] == self.thread_ts_us[is_reply]
+        reply_positions = np.flatnonzero(is_reply)
+        parents[reply_positions[found]] = candidates[found]
+        return parents
+
+    def intern_users(self, user_table: UserTable) -> None:
+        """Re-point user indices at another table (e.g. the workspace table after a parallel load)"""
+        if user_table is self.user_table:
+            return
+        mapping = np.array([user_table.intern(uid) for uid in self.user_table.ids], dtype=np.int32)
+        self.user_idx = mapping[self.user_idx] if len(self.user_idx) else self.user_idx
+        self.user_table = user_table
+
+    def __len__(self) -> int:
+        return len(self.ts_us)
+
+    def text(self, i: int) -> str:
+        return self.text_buffer[self.text_offsets[i]:self.text_offsets[i + 1]].decode("utf-8")
+
+    def message(self, i: int) -> Message:
+        thread_ts_us = int(self.thread_ts_us[i])
+        return Message(
+            user=self.user_table.ids[self.user_idx[i]],
+            text=self.text(i),
+            ts=int(self.ts_us[i]) / 1_000_000,
+            attachments=self.attachments.get(i, []),
+            thread_ts=thread_ts_us / 1_000_000 if thread_ts_us else None
+        )
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.message(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return self.message(index)
+
+    def __iter__(self) -> Iterator[Message]:
+        return (self.message(i) for i in range(len(self)))
+
+    def thread_order(self) -> np.ndarray:
+        """
+        Positions in display order: every top-level message followed by its replies. Replies whose parent
+        is missing are left out, the same as the list-based rendering does.
+        """
+        is_reply = (self.thread_ts_us != 0) & (self.thread_ts_us != self.ts_us)
+        visible = ~is_reply | (self.thread_parent >= 0)
+        group_ts = np.where(is_reply, self.thread_ts_us, self.ts_us)
+        positions = np.flatnonzero(visible)
+        return positions[np.lexsort((self.ts_us[positions], group_ts[positions]))]
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the columns (attachments excluded)"""
+        arrays = (self.ts_us, self.thread_ts_us, self.user_idx, self.text_offsets, self.thread_parent)
+        return sum(a.nbytes for a in arrays) + len(self.text_buffer)
+
+def load_channel_columns(channel_dir: ExportPath, user_table: Optional[UserTable] = None) -> ChannelColumns:
+    """Parse a channel directory's day files straight into columns (system messages skipped)"""
+    records = []
+    for msg_file in list_day_files(channel_dir):
+        for msg in iter_day_file(msg_file):
+            if "subtype" in msg:  # Skip system messages
+                continue
+            records.append((
+                parse_timestamp_us(msg["ts"]),
+                parse_timestamp_us(msg["thread_ts"]) if "thread_ts" in msg else 0,
+                msg["user"],
+                msg["text"],
+                msg.get("files") or None
+            ))
+    return ChannelColumns.from_records(records, user_table or UserTable())
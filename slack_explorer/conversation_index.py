@@ -0,0 +1,152 @@
+"""
+Sidebar index of conversations, built once per workspace.
+
+The sidebar used to filter and sort every channel, DM and MPDM on each rerun and render one button per
+conversation. `ConversationIndex` precomputes, per sidebar list ("channels", "dms", "mpdms"), the
+entries in each sort order plus a name index, so a rerun only looks up the current page:
+
+- queries of 3+ characters: trigram posting lists, intersected and then checked with `in`
+- shorter queries: bisect over the sorted words of every name (prefix match on any word)
+
+Message counts and last activity come from the loaded messages (or the database for SQLite
+workspaces). Lazy workspaces haven't parsed their messages yet, so there the last day file's date
+stands in for the last activity and counts are unknown.
+"""
+import re
+from array import array
+from bisect import bisect_left
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from data_loader import LazyMessages, WorkspaceData, list_day_files
+from sqlite_store import SqliteMessages
+
+SORT_KEYS = ["name", "activity", "messages"]
+
+WORD_PATTERN = re.compile(r"[^\W_]+")
+
+@dataclass
+class ConversationEntry:
+    channel_id: str
+    section: str  # "public", "private", "dm" or "mpdm"
+    label: str  # button text
+    search_key: str  # lower-cased name the filter matches against
+    message_count: Optional[int]  # None if unknown (lazy workspaces)
+    last_ts: Optional[float]  # newest message, None if the conversation has none
+
+def conversation_stats(workspace: WorkspaceData) -> Dict[str, Tuple[Optional[int], Optional[float]]]:
+    """channel_id -> (message count, last activity ts)"""
+    messages = workspace.messages
+    if isinstance(messages, SqliteMessages):
+        return {channel_id: (len(messages[channel_id]), messages.last_ts[channel_id]) for channel_id in messages}
+    if isinstance(messages, LazyMessages):
+        stats = {}
+        for channel_id, channel_dir in messages.channel_dirs.items():
+            day_files = sorted(msg_file.name for msg_file in list_day_files(channel_dir))
+            try:
+                last_ts = datetime.strptime(day_files[-1], "%Y-%m-%d.json").timestamp() if day_files else None
+            except ValueError:  # Not a yyyy-mm-dd.json day file
+                last_ts = None
+            stats[channel_id] = (None, last_ts)
+        return stats
+    return {channel_id: (len(msgs), msgs[-1].ts) for channel_id, msgs in messages.items() if len(msgs)}
+
+class ConversationList:
+    """One sidebar list: its entries, their orderings and the name index"""
+
+    def __init__(self, entries: List[ConversationEntry]):
+        self.entries = entries
+        # Sections stay grouped (public before private channels), sorted within each section
+        section_rank = {section: i for i, section in enumerate(dict.fromkeys(e.section for e in entries))}
+        sort_keys = {
+            "name": lambda i: (section_rank[entries[i].section], entries[i].search_key),
+            "activity": lambda i: (section_rank[entries[i].section], -(entries[i].last_ts or 0),
+                                   entries[i].search_key),
+            "messages": lambda i: (section_rank[entries[i].section], -(entries[i].message_count or 0),
+                                   entries[i].search_key),
+        }
+        self.orders: Dict[str, array] = {}
+        self.ranks: Dict[str, array] = {}  # sort key -> entry index -> position in that order
+        for sort_key, key in sort_keys.items():
+            order = array("I", sorted(range(len(entries)), key=key))
+            rank = array("I", bytes(4 * len(entries)))
+            for position, i in enumerate(order):
+                rank[i] = position
+            self.orders[sort_key], self.ranks[sort_key] = order, rank
+
+        self.trigrams: Dict[str, array] = {}
+        words = []
+        for i, entry in enumerate(entries):
+            key = entry.search_key
+            for trigram in {key[j:j + 3] for j in range(len(key) - 2)}:
+                self.trigrams.setdefault(trigram, array("I")).append(i)
+            words.extend((word, i) for word in set(WORD_PATTERN.findall(key)))
+        words.sort()
+        self.words = [word for word, _ in words]
+        self.word_entries = array("I", (i for _, i in words))
+
+    def matches(self, query: str) -> Optional[set]:
+        """Entry indexes whose name matches the query, None for an empty query (everything)"""
+        query = query.lower().strip()
+        if not query:
+            return None
+        if len(query) >= 3:
+            postings = sorted(
+                (self.trigrams.get(query[j:j + 3], ()) for j in range(len(query) - 2)), key=len
+            )
+            candidates = set(postings[0])
+            for posting in postings[1:]:
+                candidates.intersection_update(posting)
+            return {i for i in candidates if query in self.entries[i].search_key}
+        # Too short for trigrams: names with a word starting with the query
+        found = set()
+        for j in range(bisect_left(self.words, query), len(self.words)):
+            if not self.words[j].startswith(query):
+                break
+            found.add(self.word_entries[j])
+        return found
+
+    def page(self, query: str, sort_key: str, offset: int, limit: int) -> Tuple[List[ConversationEntry], int]:
+        """(entries on the page, total number of matches)"""
+        matched = self.matches(query)
+        if matched is None:
+            order = self.orders[sort_key]
+            return [self.entries[i] for i in order[offset:offset + limit]], len(order)
+        rank = self.ranks[sort_key]
+        ordered = sorted(matched, key=rank.__getitem__)
+        return [self.entries[i] for i in ordered[offset:offset + limit]], len(ordered)
+
+class ConversationIndex:
+    """The sidebar lists of a workspace: "channels", "dms" and "mpdms" -> ConversationList"""
+
+    def __init__(self, lists: Dict[str, ConversationList]):
+        self.lists = lists
+
+    @classmethod
+    def build(cls, workspace: WorkspaceData) -> "ConversationIndex":
+        stats = conversation_stats(workspace)
+        lists = {"channels": [], "dms": [], "mpdms": []}
+        for channel_id, channel in workspace.channels.items():
+            channel_type = getattr(channel, "type", "channel")
+            message_count, last_ts = stats.get(channel_id, (0, None))
+            if channel_type == "channel":
+                section = "private" if channel.is_private else "public"
+                label = f"🔒 {channel.name}" if channel.is_private else f"# {channel.name}"
+                search_key = channel.name.lower()
+                target = lists["channels"]
+            else:
+                section = channel_type
+                label = channel.display_name or ("Unknown User" if channel_type == "dm" else "Group Message")
+                search_key = (channel.display_name or "").lower()
+                target = lists["dms" if channel_type == "dm" else "mpdms"]
+            target.append(ConversationEntry(channel_id, section, label, search_key, message_count, last_ts))
+        # Public channels are listed before private ones
+        lists["channels"].sort(key=lambda entry: entry.section != "public")
+        return cls({name: ConversationList(entries) for name, entries in lists.items()})
+
+def get_conversation_index(workspace: WorkspaceData) -> ConversationIndex:
+    """The workspace's sidebar index, built on first use"""
+    if workspace.conversations is None:
+        workspace.conversations = ConversationIndex.build(workspace)
+    return workspace.conversations
@@ -1,8 +1,42 @@
-from dataclasses import dataclass
+from collections import OrderedDict
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, replace
 from datetime import datetime
+from functools import partial
 from pathlib import Path
 import json
-from typing import Dict, List, Optional, Set
+import math
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple, Union
+
+from load_profile import LoadProfile, Span, no_span
+from zip_export import ZipExportPath, is_zip_export
+
+if TYPE_CHECKING:
+    from conversation_index import ConversationIndex
+    from render_cache import RenderCache
+    from search_index import MessageIndex
+    from similarity_index import SimilarityIndex
+    from thread_index import ThreadIndex
+    from time_index import TimeIndex
+    from workspace_analytics import WorkspaceAnalytics
+
+# Default memory budget for channels kept parsed in lazy mode, see LazyMessages
+DEFAULT_LAZY_MEMORY_BUDGET = 512 * 1024 * 1024
+
+# Day files bigger than this are parsed one message at a time instead of with a single json.load,
+# so peak memory stays bounded by the read chunk size rather than the full object tree of the file
+STREAMING_THRESHOLD_BYTES = 16 * 1024 * 1024
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+# Parser processes are spawned, not forked: the explorer loads on a background thread of a multithreaded
+# server, and a forked child can deadlock on a lock (logging, the import lock, ...) another thread held
+POOL_CONTEXT = multiprocessing.get_context("spawn")
 
 @dataclass
 class User:
@@ -41,20 +75,51 @@ class Message:
 class WorkspaceData:
     users: Dict[str, User]
     channels: Dict[str, Channel]
-    messages: Dict[str, List[Message]]  # channel_id -> messages
+    messages: Mapping[str, List[Message]]  # channel_id -> messages (a LazyMessages in lazy mode)
+    search_index: Optional["MessageIndex"] = None  # full-text index, see search_index.get_message_index
+                                                   # (a sqlite_store.SqliteSearchIndex for SQLite workspaces)
+    threads: Dict[str, "ThreadIndex"] = field(default_factory=dict)  # channel_id -> thread structure, see
+                                                                      # thread_index.get_thread_index
+    time_indexes: Dict[str, "TimeIndex"] = field(default_factory=dict)  # channel_id -> timestamps by day/month,
+                                                                         # see time_index.get_time_index
+    # channel_id -> day file name -> DaySource, what each channel was parsed from (only for loads that
+    # hold Message lists, see workspace_refresh.refresh_workspace_data)
+    sources: Optional[Dict[str, Dict[str, "DaySource"]]] = None
+    rendered: Optional["RenderCache"] = None  # display-ready message text, see render_cache.get_render_cache
+    conversations: Optional["ConversationIndex"] = None  # sidebar lists, see conversation_index.get_conversation_index
+    analytics: Optional["WorkspaceAnalytics"] = None  # dashboard data, see workspace_analytics.get_workspace_analytics
+    similarity: Optional["SimilarityIndex"] = None  # TF-IDF vectors, see similarity_index.get_similarity_index
+    load_profile: Optional[LoadProfile] = None  # time and memory per load phase, for profiled loads
+
+# A day file as it was when parsed: (size, mtime_ns, first message ts, last message ts). Day files hold
+# one calendar day each, so a file's messages are one contiguous ts range of the channel
+DaySource = Tuple[int, int, float, float]
+
+# An export root: a regular directory, or the root of a zipped export (same pathlib-style API)
+ExportPath = Union[Path, ZipExportPath]
+
+def split_export_paths(export_path: str) -> List[str]:
+    """
+    The export roots in an export path: one, or several overlapping exports separated by os.pathsep
+    (oldest first, like PATH), loaded merged (see export_merge.py)
+    """
+    return [path for path in export_path.split(os.pathsep) if path] or [export_path]
+
+def open_export(export_path: str) -> ExportPath:
+    """Export root for a directory or a .zip archive path"""
+    if is_zip_export(export_path):
+        return ZipExportPath(export_path)
+    return Path(export_path)
 
 def parse_timestamp(ts: str) -> float:
     """Convert Slack timestamp to float for easier sorting/comparison"""
     # return float(ts.split(".")[0])
     return float(ts) # Trying out keeping fractional part to better sort simultaneous messages
 
-def load_workspace_data(export_path: str) -> WorkspaceData:
-    """Load and parse all workspace data from the export directory"""
-    export_dir = Path(export_path)
-
-    # Load users
+def load_users(export_dir: ExportPath) -> Dict[str, User]:
+    """Load users from users.json"""
     users = {}
-    with open(export_dir / "users.json", "r", encoding="utf-8") as f:
+    with (export_dir / "users.json").open("r", encoding="utf-8") as f:
         users_data = json.load(f)
         for user in users_data:
             users[user["id"]] = User(
@@ -64,13 +129,16 @@ def load_workspace_data(export_path: str) -> WorkspaceData:
                 avatar_url=user.get("image_32"), # also avail: "image_48", "image_72", etc.
                 avatar_hash=user.get("avatar_hash"),
             )
+    return users
 
-    # Load channels (both public and private)
+def load_channels(export_dir: ExportPath, users: Dict[str, User], span: Optional[Span] = None) -> Dict[str, Channel]:
+    """Load channels, DMs and MPDMs from groups.json, dms.json and mpims.json (span: see load_profile.py)"""
+    span = span or no_span
     channels = {}
 
     # Public channels?
     # NOTE: channels.json seems to be empty in the export, keeping this for reference
-    # with open(export_dir / "channels.json", "r", encoding="utf-8") as f:
+    # with (export_dir / "channels.json").open("r", encoding="utf-8") as f:
     #     channels_data = json.load(f)
     #     for channel in channels_data:
     #         channels[channel["id"]] = Channel(
@@ -85,127 +153,669 @@ def load_workspace_data(export_path: str) -> WorkspaceData:
     #         )
 
     # Private channels
-    try:
-        with open(export_dir / "groups.json", "r", encoding="utf-8") as f:
-            groups_data = json.load(f)
-            for group in groups_data:
-                channels[group["id"]] = Channel(
-                    id=group["id"],
-                    name=group["name"],
-                    is_private=True, # All channels in groups.json are private?
-                    created=datetime.fromtimestamp(group["created"]),
-                    creator=group.get("creator"),
-                    is_archived=group.get("is_archived", False),
-                    members=set(group.get("members", [])),
-                    type="channel",
-                    display_name=f"#{group['name']}"
-                )
-    except FileNotFoundError:
-        pass  # No private channels in export
+    with span("channels: groups.json"):
+        try:
+            with (export_dir / "groups.json").open("r", encoding="utf-8") as f:
+                groups_data = json.load(f)
+                for group in groups_data:
+                    channels[group["id"]] = Channel(
+                        id=group["id"],
+                        name=group["name"],
+                        is_private=True, # All channels in groups.json are private?
+                        created=datetime.fromtimestamp(group["created"]),
+                        creator=group.get("creator"),
+                        is_archived=group.get("is_archived", False),
+                        members=set(group.get("members", [])),
+                        type="channel",
+                        display_name=f"#{group['name']}"
+                    )
+        except FileNotFoundError:
+            pass  # No private channels in export
 
     # Load DMs
-    try:
-        with open(export_dir / "dms.json", "r", encoding="utf-8") as f:
-            dms_data = json.load(f)
-            for dm in dms_data:
-                members = set(dm.get("members", []))
-                if len(members) != 2:  # DMs should have exactly 2 members
-                    continue
-
-                # Get member names for the DM channel name
-                member_names = [
-                    users[uid].user_name
-                    for uid in members if uid in users
-                ]
-
-                # Create display name from both users' real names or usernames
-                display_names = [
-                    users[uid].real_name or users[uid].user_name
-                    for uid in members if uid in users
-                ]
-                display_name = " & ".join(sorted(display_names))
-
-                channels[dm["id"]] = Channel(
-                    id=dm["id"],
-                    name=f"dm-{'--'.join(sorted(member_names))}-{dm['id']}", # Internal name with usernames
-                    is_private=True,
-                    created=datetime.fromtimestamp(dm["created"]),
-                    members=members,
-                    type="dm",
-                    display_name=display_name
-                )
-    except FileNotFoundError:
-        pass  # No DMs in export
+    with span("channels: dms.json"):
+        try:
+            with (export_dir / "dms.json").open("r", encoding="utf-8") as f:
+                dms_data = json.load(f)
+        except FileNotFoundError:
+            dms_data = []  # No DMs in export
+    with span("channels: DM names"):
+        for dm in dms_data:
+            members = set(dm.get("members", []))
+            if len(members) != 2:  # DMs should have exactly 2 members
+                continue
+
+            # Get member names for the DM channel name
+            member_names = [
+                users[uid].user_name
+                for uid in members if uid in users
+            ]
+
+            # Create display name from both users' real names or usernames
+            display_names = [
+                users[uid].real_name or users[uid].user_name
+                for uid in members if uid in users
+            ]
+            display_name = " & ".join(sorted(display_names))
+
+            channels[dm["id"]] = Channel(
+                id=dm["id"],
+                name=f"dm-{'--'.join(sorted(member_names))}-{dm['id']}", # Internal name with usernames
+                is_private=True,
+                created=datetime.fromtimestamp(dm["created"]),
+                members=members,
+                type="dm",
+                display_name=display_name
+            )
 
     # Load MPDMs
+    with span("channels: mpims.json"):
+        try:
+            with (export_dir / "mpims.json").open("r", encoding="utf-8") as f:
+                mpdms_data = json.load(f)
+        except FileNotFoundError:
+            mpdms_data = []  # No MPDMs in export
+    with span("channels: MPDM names"):
+        for mpdm in mpdms_data:
+            members = set(mpdm.get("members", []))
+            if len(members) <= 2:  # MPDMs should have more than 2 members
+                continue
+
+            # Create display name from member names
+            member_names = [
+                users[uid].real_name or users[uid].user_name
+                for uid in members if uid in users
+            ]
+            display_name = ", ".join(sorted(member_names))
+
+            channels[mpdm["id"]] = Channel(
+                id=mpdm["id"],
+                name=mpdm["name"],
+                is_private=True,
+                created=datetime.fromtimestamp(mpdm["created"]),
+                members=members,
+                type="mpdm",
+                display_name=display_name
+            )
+
+    return channels
+
+def get_channel_dir(export_dir: ExportPath, channel: Channel, users: Dict[str, User]) -> Optional[ExportPath]:
+    """Determine the export directory holding a channel's day files"""
+    if channel.type == "channel":
+        return export_dir / channel.name
+    elif channel.type == "dm":
+        return export_dir / channel.id
+    elif channel.type == "mpdm":
+        # MPDM folders use double dashes between usernames and end with -1
+        member_names = [users[uid].user_name for uid in channel.members if uid in users]
+        return export_dir / f"mpdm-{'--'.join(sorted(member_names))}-1"
+    return None
+
+def list_day_files(channel_dir: ExportPath) -> List[ExportPath]:
+    """List the per-day message files of a channel directory (canvas files are skipped)"""
+    return [
+        msg_file for msg_file in channel_dir.glob("*.json")
+        if msg_file.name != "canvas_in_the_conversation.json"
+    ]
+
+def iter_json_array(f, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[Any]:
+    """
+    Yield the elements of a top-level JSON array one by one, reading the file in chunks.
+    Only the current chunk and the element being decoded are held in memory. Malformed input raises
+    json.JSONDecodeError like json.load does (positions are relative to the current chunk).
+    """
+    decoder = json.JSONDecoder()
+    buffer = f.read(chunk_size)
+    pos = 0
+    eof = not buffer
+    expecting = "["  # "[", "value or ]" (first element), "value" (after a comma), ", or ]", then "end"
+
+    while True:
+        # Skip whitespace, pulling in more data when the buffer runs out
+        while pos < len(buffer) and buffer[pos].isspace():
+            pos += 1
+        if pos == len(buffer):
+            if eof:
+                if expecting == "end":
+                    return
+                raise json.JSONDecodeError("Unexpected end of JSON array", buffer, pos)
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buffer, pos = buffer[pos:] + chunk, 0
+            continue
+
+        char = buffer[pos]
+        if expecting == "end":
+            raise json.JSONDecodeError("Extra data", buffer, pos)
+        if expecting == "[":
+            if char != "[":
+                raise json.JSONDecodeError("Expected a JSON array", buffer, pos)
+            expecting = "value or ]"
+            pos += 1
+            continue
+        if expecting == ", or ]" or (expecting == "value or ]" and char == "]"):
+            if char == "]":
+                expecting = "end"
+            elif char == ",":
+                expecting = "value"
+            else:
+                raise json.JSONDecodeError("Expecting ',' delimiter", buffer, pos)
+            pos += 1
+            continue
+
+        try:
+            element, end = decoder.raw_decode(buffer, pos)
+            # A value cut off at the chunk boundary can still decode (e.g. "12" of "12.5"), so only trust
+            # it when it's followed by a separator
+            complete = (end < len(buffer) and buffer[end] in " \t\r\n,]") or eof
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            complete = False
+        if not complete:
+            # Grow reads with the pending element so huge elements don't get re-decoded once per chunk
+            chunk = f.read(max(chunk_size, len(buffer) - pos))
+            eof = not chunk
+            buffer, pos = buffer[pos:] + chunk, 0
+            continue
+
+        yield element
+        expecting = ", or ]"
+        pos = end
+        if pos > chunk_size:  # Drop consumed text
+            buffer, pos = buffer[pos:], 0
+
+def iter_day_file(msg_file: ExportPath) -> Iterator[Dict]:
+    """Raw message dicts of a day file, streamed for files above STREAMING_THRESHOLD_BYTES"""
+    with msg_file.open("r", encoding="utf-8") as f:
+        if msg_file.stat().st_size > STREAMING_THRESHOLD_BYTES:
+            yield from iter_json_array(f)
+        else:
+            yield from json.load(f)
+
+def load_day_file(msg_file: ExportPath, span: Optional[Span] = None) -> List[Message]:
+    """
+    Parse one per-day message file (unsorted, system messages skipped). With span (see load_profile.py)
+    the JSON is decoded whole first, so decoding and Message construction are measured separately.
+    """
+    if span is None:
+        return messages_from_raw(iter_day_file(msg_file))
+    with span("day files: json decode"):
+        raw_messages = list(iter_day_file(msg_file))
+    with span("day files: Message construction"):
+        return messages_from_raw(raw_messages)
+
+def messages_from_raw(raw_messages: Iterable[Dict]) -> List[Message]:
+    """Messages from the dicts of a day file"""
+    day_file_messages = []
+    for msg in raw_messages:
+        if "subtype" in msg:  # Skip system messages
+            continue
+
+        # Only the fields below are kept, the rest of the (large) Slack message dict is dropped here
+        day_file_messages.append(Message(
+            user=msg["user"],
+            text=msg["text"],
+            ts=parse_timestamp(msg["ts"]),
+            thread_ts=parse_timestamp(msg["thread_ts"]) if "thread_ts" in msg else None,
+            attachments=msg.get("files", [])
+        ))
+    return day_file_messages
+
+def day_file_source(stat: Any, messages: List[Message]) -> DaySource:
+    """
+    Signature and ts range of a day file. stat is the file's stat() taken before reading it, so a write
+    that lands during the read shows up as a change on the next refresh
+    """
+    if not messages:
+        return stat.st_size, stat.st_mtime_ns, math.inf, -math.inf
+    timestamps = [m.ts for m in messages]
+    return stat.st_size, stat.st_mtime_ns, min(timestamps), max(timestamps)
+
+def load_channel_sources(
+    channel_dir: ExportPath,
+    on_file: Optional[Callable[[int], None]] = None,
+    span: Optional[Span] = None
+) -> Tuple[List[Message], Dict[str, DaySource]]:
+    """
+    Like load_channel_messages, plus the DaySource of every day file (file name -> source).
+    on_file is called with the number of messages after each day file (see LoadProgress.file_done),
+    span measures the parse (see load_profile.py).
+    """
+    channel_messages = []
+    sources = {}
+    for msg_file in list_day_files(channel_dir):
+        stat = msg_file.stat()
+        day_messages = load_day_file(msg_file, span)
+        sources[msg_file.name] = day_file_source(stat, day_messages)
+        channel_messages.extend(day_messages)
+        if on_file:
+            on_file(len(day_messages))
+
+    with (span or no_span)("sort"):
+        return sorted(channel_messages, key=lambda m: m.ts), sources
+
+def load_channel_messages(channel_dir: ExportPath) -> List[Message]:
+    """Parse all day files of a channel directory into a list of messages sorted by ts"""
+    return load_channel_sources(channel_dir)[0]
+
+def messages_to_columns(messages: List[Message]) -> tuple:
+    """
+    Pack messages into one tuple per field. Pickling/unpickling a handful of tuples is several times
+    faster than one dataclass per message, which matters when sending messages between processes or
+    to/from the on-disk cache.
+    """
+    return (
+        tuple(m.user for m in messages),
+        tuple(m.text for m in messages),
+        tuple(m.ts for m in messages),
+        tuple(m.attachments for m in messages),
+        tuple(m.thread_ts for m in messages),
+    )
+
+def messages_from_columns(columns: tuple) -> List[Message]:
+    """Inverse of `messages_to_columns`, column order matches the Message field order"""
+    return list(map(Message, *columns))
+
+def _load_channel_columns(channel_dir: ExportPath) -> tuple:
+    # Process pool entry point, has to live at module level to be picklable
+    messages, sources = load_channel_sources(channel_dir)
+    return messages_to_columns(messages), sources
+
+def _dir_size(channel_dir: ExportPath) -> int:
+    return sum(msg_file.stat().st_size for msg_file in list_day_files(channel_dir))
+
+def parse_channels(
+    channel_dirs: Dict[str, ExportPath],
+    workers: int = 1,
+    loader: Optional[Callable[[ExportPath], Any]] = None,
+    on_file: Optional[Callable[[str, int], None]] = None,
+    span: Optional[Span] = None
+) -> Iterable[Tuple[str, Any]]:
+    """
+    Parse the given channel directories, yielding (channel_id, (sorted messages, day file sources)) pairs.
+
+    With workers > 1 the directories are spread over a process pool, largest first so a single huge
+    channel doesn't end up as the straggler. Each worker returns its channel already sorted, so the
+    results just need to be collected.
+
+    loader replaces the default Message-list parser (it must be a picklable module-level function
+    when workers > 1), e.g. columnar_store.load_channel_columns; results are then whatever it returns.
+
+    on_file(channel_id, message count) is called after each day file, only when parsing in-process
+    with the default parser; pool workers report whole channels. span(phase, channel_id) measures each
+    channel and its day files (see load_profile.py), it needs workers=1 and the default parser.
+    """
+    if workers <= 1 or len(channel_dirs) <= 1:
+        for channel_id, channel_dir in channel_dirs.items():
+            if loader:
+                yield channel_id, loader(channel_dir)
+                continue
+            channel_span = partial(span, channel_id=channel_id) if span else None
+            with (span or no_span)("channel", channel_id):
+                result = load_channel_sources(channel_dir, partial(on_file, channel_id) if on_file else None, channel_span)
+            yield channel_id, result
+        return
+
+    ordered = sorted(channel_dirs.items(), key=lambda item: _dir_size(item[1]), reverse=True)
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=POOL_CONTEXT)
     try:
-        with open(export_dir / "mpims.json", "r", encoding="utf-8") as f:
-            mpdms_data = json.load(f)
-            for mpdm in mpdms_data:
-                members = set(mpdm.get("members", []))
-                if len(members) <= 2:  # MPDMs should have more than 2 members
-                    continue
-
-                # Create display name from member names
-                member_names = [
-                    users[uid].real_name or users[uid].user_name
-                    for uid in members if uid in users
-                ]
-                display_name = ", ".join(sorted(member_names))
-
-                channels[mpdm["id"]] = Channel(
-                    id=mpdm["id"],
-                    name=mpdm["name"],
-                    is_private=True,
-                    created=datetime.fromtimestamp(mpdm["created"]),
-                    members=members,
-                    type="mpdm",
-                    display_name=display_name
-                )
-    except FileNotFoundError:
-        pass  # No MPDMs in export
+        results = executor.map(loader or _load_channel_columns, [channel_dir for _, channel_dir in ordered])
+        for (channel_id, _), result in zip(ordered, results):
+            yield channel_id, result if loader else (messages_from_columns(result[0]), result[1])
+    finally:
+        # Also runs when the caller stops early (a cancelled load): drop the channels not started yet
+        # instead of waiting for all of them
+        executor.shutdown(cancel_futures=True)
+
+def estimate_messages_bytes(messages: List[Message]) -> int:
+    """Rough resident size of a parsed message list (objects, their __dict__s, texts and attachments)"""
+    if not messages:
+        return sys.getsizeof(messages)
+    per_message = sys.getsizeof(messages[0]) + sys.getsizeof(messages[0].__dict__) + 2 * 24  # + ts floats
+    total = sys.getsizeof(messages) + per_message * len(messages)
+    for msg in messages:
+        total += sys.getsizeof(msg.text) + sys.getsizeof(msg.attachments)
+        if msg.attachments:
+            total += 512 * len(msg.attachments)  # Slack file dicts are big, don't walk them
+    return total
+
+class LazyMessages(Mapping):
+    """
+    Read-only channel_id -> messages mapping that parses a channel's day files on first access.
+
+    Parsed channels are kept in an LRU; once their estimated size exceeds `max_bytes` the least
+    recently viewed channels are dropped (the most recent one is always kept, however big).
+    """
+
+    def __init__(self, channel_dirs: Dict[str, ExportPath], max_bytes: int = DEFAULT_LAZY_MEMORY_BUDGET):
+        self.channel_dirs = channel_dirs
+        self.max_bytes = max_bytes
+        self._loaded: "OrderedDict[str, Tuple[List[Message], int]]" = OrderedDict()
+        self._loaded_bytes = 0
+        self._lock = threading.Lock()  # Streamlit runs each session's script in its own thread
+
+    def __getitem__(self, channel_id: str) -> List[Message]:
+        if channel_id not in self.channel_dirs:
+            raise KeyError(channel_id)
+
+        with self._lock:
+            if channel_id in self._loaded:
+                self._loaded.move_to_end(channel_id)
+                return self._loaded[channel_id][0]
+
+            messages = load_channel_messages(self.channel_dirs[channel_id])
+            size = estimate_messages_bytes(messages)
+            self._loaded[channel_id] = (messages, size)
+            self._loaded_bytes += size
+
+            while self._loaded_bytes > self.max_bytes and len(self._loaded) > 1:
+                _, (_, evicted_size) = self._loaded.popitem(last=False)
+                self._loaded_bytes -= evicted_size
+
+            return messages
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.channel_dirs)
+
+    def __len__(self) -> int:
+        return len(self.channel_dirs)
+
+    def __contains__(self, channel_id) -> bool:
+        return channel_id in self.channel_dirs
+
+    def is_loaded(self, channel_id: str) -> bool:
+        return channel_id in self._loaded
+
+    @property
+    def loaded_bytes(self) -> int:
+        return self._loaded_bytes
+
+class LoadCancelled(Exception):
+    """Raised inside a load whose LoadProgress was cancelled"""
+
+@dataclass
+class ChannelProgress:
+    name: str
+    files_total: int
+    files_done: int = 0
+    messages: int = 0
+    done: bool = False
+
+class LoadProgress:
+    """
+    Live progress of a load_workspace_data (or sqlite_store.import_export) call, written by the loading
+    thread and read from others (see background_loader.py).
+
+    Besides counts and an ETA it keeps the channels finished so far, so the partial workspace can be
+    browsed while the rest loads (`snapshot`). It's also how a load is stopped: after `cancel()` the
+    loader raises LoadCancelled at its next day file (next channel when parsing on a process pool).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cancel = threading.Event()
+        self.started_at = time.monotonic()
+        self.phase = "Reading users and channels"
+        self.channels: Dict[str, ChannelProgress] = {}  # conversations with a folder in the export
+        self.channels_done = 0
+        self.files_total = 0
+        self.files_done = 0
+        self.messages = 0
+        self._files_parsed = 0  # files_done minus those read back from the cache, for the ETA
+        self._parse_started: Optional[float] = None
+        self._workspace: Optional[WorkspaceData] = None  # users and channels, messages filled in by snapshot
+        self._loaded: Dict[str, Any] = {}
+
+    def cancel(self) -> None:
+        self._cancel.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def check(self) -> None:
+        if self._cancel.is_set():
+            raise LoadCancelled()
+
+    def start(
+        self,
+        users: Dict[str, User],
+        channels: Dict[str, Channel],
+        channel_dirs: Dict[str, ExportPath],
+        browsable: bool = True
+    ) -> None:
+        """Users and channels are known; browsable=False when finished channels can't be shown early (SQLite)"""
+        self.check()
+        file_counts = {channel_id: len(list_day_files(channel_dir)) for channel_id, channel_dir in channel_dirs.items()}
+        with self._lock:
+            self.channels = {
+                channel_id: ChannelProgress(channels[channel_id].display_name or channels[channel_id].name, files)
+                for channel_id, files in file_counts.items()
+            }
+            self.files_total = sum(file_counts.values())
+            if browsable:
+                self._workspace = WorkspaceData(users=users, channels=channels, messages={})
+        self.phase = "Parsing messages"
+        self._parse_started = time.monotonic()
+
+    def file_done(self, channel_id: str, messages: int) -> None:
+        channel = self.channels[channel_id]
+        channel.files_done += 1
+        channel.messages += messages
+        self.files_done += 1
+        self._files_parsed += 1
+        self.messages += messages
+        self.check()
+
+    def channel_done(self, channel_id: str, messages: Optional[Sequence] = None, cached: bool = False) -> None:
+        """A channel finished (parsed, or read from the cache); messages makes it browsable right away"""
+        channel = self.channels[channel_id]
+        remaining = channel.files_total - channel.files_done
+        count = len(messages) if messages is not None else channel.messages
+        with self._lock:
+            self.files_done += remaining
+            if not cached:
+                self._files_parsed += remaining
+            self.messages += count - channel.messages
+            channel.files_done, channel.messages, channel.done = channel.files_total, count, True
+            self.channels_done += 1
+            if messages is not None and self._workspace is not None:
+                self._loaded[channel_id] = messages
+        self.check()
+
+    @property
+    def elapsed_seconds(self) -> float:
+        return time.monotonic() - self.started_at
+
+    @property
+    def eta_seconds(self) -> Optional[float]:
+        """Time left at the parse rate so far, None until there's a rate to go by"""
+        if self._parse_started is None or not self._files_parsed:
+            return None
+        rate = self._files_parsed / (time.monotonic() - self._parse_started)
+        return (self.files_total - self.files_done) / rate
+
+    def pending(self) -> Set[str]:
+        """Conversations whose messages aren't loaded yet"""
+        with self._lock:
+            return {channel_id for channel_id, channel in self.channels.items() if not channel.done}
+
+    def snapshot(self) -> Optional[WorkspaceData]:
+        """
+        The workspace so far: all users and channels, messages of the finished channels. None before
+        the channels are known or for loads that can't be browsed early. Snapshots share their derived
+        per-channel indexes (thread and time indexes), which stay valid as finished channels don't change.
+        """
+        with self._lock:
+            if self._workspace is None:
+                return None
+            loaded = dict(self._loaded)
+        channels = self._workspace.channels
+        return replace(
+            self._workspace,
+            messages={channel_id: loaded[channel_id] for channel_id in channels if len(loaded.get(channel_id, ()))}
+        )
+
+def existing_channel_dirs(export_dir: ExportPath, channels: Dict[str, Channel], users: Dict[str, User]) -> Dict[str, ExportPath]:
+    """channel_id -> directory, for the channels that have a folder in the export"""
+    channel_dirs = {}
+    for channel_id, channel in channels.items():
+        channel_dir = get_channel_dir(export_dir, channel, users)
+        if channel_dir is not None and channel_dir.exists():
+            channel_dirs[channel_id] = channel_dir
+    return channel_dirs
+
+def _load_message_lists(
+    export_dir: ExportPath,
+    cache_path: Optional[str],
+    workers: int,
+    progress: Optional[LoadProgress],
+    span: Optional[Span] = None
+) -> WorkspaceData:
+    """load_workspace_data's default mode: Message lists, optionally through the parsed-data cache"""
+    measure = span or no_span
+    cache = None
+    if cache_path:
+        # Imported here to avoid a circular import (workspace_cache pickles our dataclasses)
+        import workspace_cache
+        with measure("cache: read"):
+            cache = workspace_cache.WorkspaceCache(cache_path, export_dir)
+
+    if cache and cache.metadata_is_fresh():
+        users, channels = cache.users, cache.channels
+    else:
+        with measure("users.json"):
+            users = load_users(export_dir)
+        channels = load_channels(export_dir, users, span)
 
     # Load messages for each channel/DM/MPDM
-    # TODO: probably should pull this out into a separate function
     # load all the data into memory or session storage one time, as this might be run frequently when
     # switching between channels/dms/mpdms
-    messages = {}
-    for channel_id, channel in channels.items():
-        # Determine the correct directory path based on channel type
-        if channel.type == "channel":
-            channel_dir = export_dir / channel.name
-        elif channel.type == "dm":
-            channel_dir = export_dir / channel_id
-        elif channel.type == "mpdm":
-            # MPDM folders use double dashes between usernames and end with -1
-            member_names = [users[uid].user_name for uid in channel.members if uid in users]
-            channel_dir = export_dir / f"mpdm-{'--'.join(sorted(member_names))}-1"
+    loaded = {}
+    sources = {}
+    to_parse = {}
+    with measure("channel folders"):
+        channel_dirs = existing_channel_dirs(export_dir, channels, users)
+    if progress:
+        progress.start(users, channels, channel_dirs)
+    for channel_id, channel_dir in channel_dirs.items():
+        cached = None
+        if cache:
+            with measure("cache: channel lookup", channel_id):
+                cached = cache.get_channel_messages(channel_id, channel_dir)
+        if cached is not None:
+            loaded[channel_id], sources[channel_id] = cached
+            if progress:
+                progress.channel_done(channel_id, loaded[channel_id], cached=True)
         else:
-            continue
+            to_parse[channel_id] = channel_dir
 
-        if not channel_dir.exists():
-            continue
+    on_file = progress.file_done if progress else None
+    for channel_id, (channel_messages, channel_sources) in parse_channels(to_parse, workers, on_file=on_file, span=span):
+        loaded[channel_id] = channel_messages
+        sources[channel_id] = channel_sources
+        if cache:
+            with measure("cache: pack", channel_id):
+                cache.put_channel_messages(channel_id, to_parse[channel_id], channel_messages, channel_sources)
+        if progress:
+            progress.channel_done(channel_id, channel_messages)
 
-        channel_messages = []
-        for msg_file in channel_dir.glob("*.json"):
-            if msg_file.name == "canvas_in_the_conversation.json":
-                continue
+    # Keep the channel order of channels.json regardless of the order channels finished parsing in
+    messages = {
+        channel_id: loaded[channel_id]
+        for channel_id in channels
+        if loaded.get(channel_id)
+    }
+
+    workspace = WorkspaceData(users=users, channels=channels, messages=messages, sources=sources)
+    if cache:
+        with measure("cache: write"):
+            cache.save(workspace)
+    return workspace
+
+def load_workspace_data(
+    export_path: str,
+    cache_path: Optional[str] = None,
+    workers: int = 1,
+    lazy: bool = False,
+    lazy_max_bytes: int = DEFAULT_LAZY_MEMORY_BUDGET,
+    columnar: bool = False,
+    progress: Optional[LoadProgress] = None,
+    profile: Optional[LoadProfile] = None
+) -> WorkspaceData:
+    """
+    Load and parse all workspace data from the export directory (or .zip archive, read in place).
+
+    If cache_path is given, the parsed data is also kept in a compressed on-disk cache there
+    (see workspace_cache.py). Only channels whose day files changed since the cache was written
+    are parsed again; everything else is read back from the cache.
+
+    workers > 1 parses channel directories in parallel on a process pool (see `parse_channels`).
 
-            with open(msg_file, "r", encoding="utf-8") as f:
-                day_messages = json.load(f)
-                for msg in day_messages:
-                    if "subtype" in msg:  # Skip system messages
-                        continue
+    With lazy=True only users and channels are loaded up front; messages are parsed per channel on
+    first access and kept within lazy_max_bytes (see LazyMessages). The cache and workers settings
+    don't apply to lazy loads.
 
-                    channel_messages.append(Message(
-                        user=msg["user"],
-                        text=msg["text"],
-                        ts=parse_timestamp(msg["ts"]),
-                        thread_ts=parse_timestamp(msg["thread_ts"]) if "thread_ts" in msg else None,
-                        attachments=msg.get("files", [])
-                    ))
+    With columnar=True each channel's messages are a columnar_store.ChannelColumns (NumPy arrays,
+    a fraction of the memory of Message lists) instead of a list. Not combined with the cache.
 
-        if channel_messages:
-            messages[channel_id] = sorted(channel_messages, key=lambda m: m.ts)
+    progress, if given, is updated as channels are parsed and can cancel the load (LoadCancelled is
+    raised, nothing is written to the cache).
 
-    return WorkspaceData(users=users, channels=channels, messages=messages)
\ No newline at end of file
+    export_path can also list several overlapping exports, oldest first (see split_export_paths); they
+    are merged into one workspace by export_merge.load_merged_workspace. The cache, lazy and columnar
+    settings don't apply to merged loads.
+
+    profile, if given, records time and memory per phase and per channel (see load_profile.py). Only
+    the default Message-list load (with or without the cache) is profiled; it then parses in-process.
+    """
+    export_paths = split_export_paths(export_path)
+    if len(export_paths) > 1:
+        # Imported here, export_merge builds on this module
+        from export_merge import load_merged_workspace
+        return load_merged_workspace(export_paths, workers=workers, progress=progress)
+
+    export_dir = open_export(export_path)
+
+    if lazy:
+        users = load_users(export_dir)
+        channels = load_channels(export_dir, users)
+        if progress:  # Nothing to parse up front
+            progress.start(users, channels, {}, browsable=False)
+        return WorkspaceData(
+            users=users,
+            channels=channels,
+            messages=LazyMessages(existing_channel_dirs(export_dir, channels, users), max_bytes=lazy_max_bytes)
+        )
+
+    if columnar:
+        # Imported here, columnar_store builds on this module (and needs numpy)
+        from columnar_store import UserTable, load_channel_columns
+        users = load_users(export_dir)
+        channels = load_channels(export_dir, users)
+        channel_dirs = existing_channel_dirs(export_dir, channels, users)
+        if progress:
+            progress.start(users, channels, channel_dirs)
+        user_table = UserTable()
+        loaded = {}
+        for channel_id, columns in parse_channels(channel_dirs, workers=workers, loader=load_channel_columns):
+            columns.intern_users(user_table)  # Workers intern into their own tables
+            loaded[channel_id] = columns
+            if progress:
+                progress.channel_done(channel_id, columns)
+        return WorkspaceData(
+            users=users,
+            channels=channels,
+            messages={channel_id: loaded[channel_id] for channel_id in channels if len(loaded.get(channel_id, ()))}
+        )
+
+    if profile is None:
+        return _load_message_lists(export_dir, cache_path, workers, progress)
+    # Profiled: parsed in-process, so every channel and day file is measured here
+    profile.start()
+    try:
+        return _load_message_lists(export_dir, cache_path, 1, progress, profile.span)
+    finally:
+        profile.stop()
@@ -0,0 +1,140 @@
+"""
+Several overlapping exports of the same workspace, loaded as one `WorkspaceData`.
+
+Periodic exports overlap: each one repeats some (or all) of the days of the previous one. Given the
+export roots oldest first (see data_loader.split_export_paths), `load_merged_workspace`:
+
+- matches users and conversations by id across exports. The newest export's record wins, and fields it
+  leaves empty are filled from older ones. A conversation's folder is looked up in each export with that
+  export's own records, so a channel renamed between exports is still found.
+- merges each conversation's messages with a k-way merge (`heapq.merge`) of the per-export message
+  streams, which are normally already sorted: day files hold one calendar day each and are read in date
+  order, one at a time per export, each sorted on its own. A message found in several exports (same
+  conversation and ts) is kept once, as the newest export has it (so edits win). If the streams turn
+  out not to be sorted (a day file with messages from before an earlier one), that conversation falls
+  back to sorting all of its messages.
+
+Only the merged lists and the day file being read from each export are held, so memory scales with
+the union of the exports rather than their sum. Merged workspaces have no `sources`, so reloading one
+is a full load.
+"""
+import heapq
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import fields, replace
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, TypeVar
+
+from data_loader import (
+    POOL_CONTEXT, Channel, ExportPath, LoadProgress, Message, User, WorkspaceData, existing_channel_dirs,
+    list_day_files, load_channels, load_day_file, load_users, messages_from_columns, messages_to_columns,
+    open_export,
+)
+
+Record = TypeVar("Record", User, Channel)
+
+def _is_empty(value) -> bool:
+    return value is None or (isinstance(value, (str, set, list, dict)) and not value)
+
+def reconcile(newer: Record, older: Record) -> Record:
+    """The newer record, with the fields it leaves empty taken from the older one"""
+    missing = {
+        field.name: getattr(older, field.name)
+        for field in fields(newer)
+        if _is_empty(getattr(newer, field.name)) and not _is_empty(getattr(older, field.name))
+    }
+    return replace(newer, **missing) if missing else newer
+
+def merge_records(per_export: List[Dict[str, Record]]) -> Dict[str, Record]:
+    """id -> reconciled record, per_export oldest first; ordered like the newest export that has each id"""
+    merged: Dict[str, Record] = {}
+    for records in reversed(per_export):
+        for record_id, record in records.items():
+            merged[record_id] = reconcile(merged[record_id], record) if record_id in merged else record
+    return merged
+
+def iter_channel_messages(channel_dir: ExportPath) -> Iterator[Message]:
+    """A conversation's messages, parsed one day file at a time: in ts order as long as day files don't overlap"""
+    for msg_file in sorted(list_day_files(channel_dir), key=lambda path: path.name):
+        yield from sorted(load_day_file(msg_file), key=lambda m: m.ts)
+
+def _dedup(messages: Iterable[Message]) -> Optional[List[Message]]:
+    """Keeps the last of every run of messages with the same ts; None if messages aren't in ts order"""
+    deduped: List[Message] = []
+    for msg in messages:
+        if deduped and msg.ts <= deduped[-1].ts:
+            if msg.ts < deduped[-1].ts:
+                return None
+            deduped[-1] = msg
+        else:
+            deduped.append(msg)
+    return deduped
+
+def merge_channel_messages(channel_dirs: Sequence[ExportPath]) -> List[Message]:
+    """One conversation's folders, oldest export first, merged into one ts-sorted list without duplicates"""
+    # heapq.merge is stable: of messages with the same ts, the newest export's comes last
+    merged = _dedup(heapq.merge(*map(iter_channel_messages, channel_dirs), key=lambda m: m.ts))
+    if merged is None:
+        # A day file holds messages from before an earlier one (edited or re-exported days), so the
+        # streams weren't sorted. Sort everything instead, stably, so the newest export's copy of a
+        # message still comes last
+        everything = [msg for channel_dir in channel_dirs for msg in iter_channel_messages(channel_dir)]
+        merged = _dedup(sorted(everything, key=lambda m: m.ts))
+    return merged
+
+def _merged_size(channel_dirs: Sequence[ExportPath]) -> int:
+    return sum(msg_file.stat().st_size for channel_dir in channel_dirs for msg_file in list_day_files(channel_dir))
+
+def _merge_channel_columns(channel_dirs: Sequence[ExportPath]) -> tuple:
+    # Process pool entry point, has to live at module level to be picklable
+    return messages_to_columns(merge_channel_messages(channel_dirs))
+
+def load_merged_workspace(
+    export_paths: Sequence[str],
+    workers: int = 1,
+    progress: Optional[LoadProgress] = None
+) -> WorkspaceData:
+    """
+    Load overlapping exports (directories or .zip archives, oldest first) as one workspace.
+
+    workers > 1 merges conversations in parallel on a process pool, largest first. progress reports
+    whole conversations (its file counts are the newest export's) and can cancel the load.
+    """
+    export_dirs = [open_export(export_path) for export_path in export_paths]
+    users_per_export = [load_users(export_dir) for export_dir in export_dirs]
+    channels_per_export = [
+        load_channels(export_dir, users) for export_dir, users in zip(export_dirs, users_per_export)
+    ]
+    users = merge_records(users_per_export)
+    channels = merge_records(channels_per_export)
+
+    # channel_id -> its folder in each export that has one, oldest first
+    channel_dirs: Dict[str, List[ExportPath]] = {}
+    for export_dir, export_channels, export_users in zip(export_dirs, channels_per_export, users_per_export):
+        for channel_id, channel_dir in existing_channel_dirs(export_dir, export_channels, export_users).items():
+            channel_dirs.setdefault(channel_id, []).append(channel_dir)
+    if progress:
+        progress.start(users, channels, {channel_id: dirs[-1] for channel_id, dirs in channel_dirs.items()})
+
+    loaded = {}
+    if workers <= 1 or len(channel_dirs) <= 1:
+        for channel_id, dirs in channel_dirs.items():
+            loaded[channel_id] = merge_channel_messages(dirs)
+            if progress:
+                progress.channel_done(channel_id, loaded[channel_id])
+    else:
+        ordered = sorted(channel_dirs.items(), key=lambda item: _merged_size(item[1]), reverse=True)
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=POOL_CONTEXT)  # Not forked, see data_loader
+        try:
+            results = executor.map(_merge_channel_columns, [dirs for _, dirs in ordered])
+            for (channel_id, _), columns in zip(ordered, results):
+                loaded[channel_id] = messages_from_columns(columns)
+                if progress:
+                    progress.channel_done(channel_id, loaded[channel_id])
+        finally:
+            executor.shutdown(cancel_futures=True)  # Cancelled: drop the conversations not started yet
+
+    # Keep the channel order, like load_workspace_data
+    return WorkspaceData(
+        users=users,
+        channels=channels,
+        messages={channel_id: loaded[channel_id] for channel_id in channels if loaded.get(channel_id)}
+    )
@@ -0,0 +1,344 @@
+"""
+Compact, token-budgeted transcripts of a conversation, to paste into an LLM (e.g. the context builder).
+
+A chunk looks like:
+
+    #proj-x, part 2: 2024-03-04 09:12 to 2024-03-06 17:40
+    Speakers: A=Clayton Bell, B=Dimitri Sudomoin
+    Times: [HH:MM] first message of a day, [+Δ] since the previous message; > replies, Δ since the previous message in the thread
+
+    == 2024-03-04 Mon ==
+    [09:12] A: deploy is done
+      > B +5m: thanks @A [file: notes.pdf]
+    [+2h10m] B: next up is the invoice export
+
+Speakers get short aliases in order of first appearance (A, B, ..., Z, AA, ...), kept across chunks of
+the same export; mentions use the aliases too. Threads are inlined under their parent, as grouped by
+`thread_index.ThreadIndex` (or the SQLite backend's thread pages), and a date range selects the threads
+started in it, like the conversation view.
+
+`iter_transcript_chunks` is a generator: threads are added to the current chunk until the next one
+wouldn't fit the token budget, then the chunk is yielded, so a whole channel is never held as one
+string. A thread that doesn't fit an empty chunk on its own is split between chunks (and a single
+message longer than the budget is cut). Tokens are counted with tiktoken, using the same encodings as
+pages/token_counter_calc.py.
+
+Usage:
+    python llm_export.py ../exported --channel proj-x --max-tokens 8000 --out chunks/
+    python llm_export.py ../exported --channel proj-x --from 2024-03-01 --to 2024-03-31 --model gpt-4o
+"""
+import argparse
+import sys
+from dataclasses import dataclass
+from datetime import date, datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from data_loader import Message, WorkspaceData, load_workspace_data
+from render_cache import MENTION_PATTERN, user_display_name
+from sqlite_store import SqliteChannelMessages
+from thread_index import get_thread_index
+from time_index import day_bounds
+
+DEFAULT_MAX_TOKENS = 8000
+DEFAULT_MODEL = "gpt-4o"
+# Models offered in the explorer; any tiktoken model name (or claude-*) works from the command line
+MODELS = ["gpt-4o", "gpt-4o-mini", "o1", "gpt-4", "gpt-3.5-turbo", "claude-3-5-sonnet-latest"]
+
+TIMES_LEGEND = ("Times: [HH:MM] first message of a day, [+Δ] since the previous message; "
+                "> replies, Δ since the previous message in the thread")
+# SQLite workspaces are read this many messages at a time
+SQLITE_BATCH_SIZE = 1000
+
+@dataclass
+class TranscriptChunk:
+    index: int  # 1-based
+    text: str
+    tokens: int
+    first_ts: float
+    last_ts: float
+    message_count: int
+
+def token_counter(model: str) -> Callable[[str], int]:
+    """
+    Token count function for a model, with the encodings pages/token_counter_calc.py uses: tiktoken's
+    encoding for OpenAI models, cl100k_base as the (offline) approximation for Claude models
+    """
+    import tiktoken  # Imported here, only needed for exports
+    if model.startswith("claude-"):
+        encoding = tiktoken.get_encoding("cl100k_base")
+    else:
+        encoding = tiktoken.encoding_for_model(model)
+    return lambda text: len(encoding.encode(text, disallowed_special=()))
+
+def speaker_alias(n: int) -> str:
+    """0 -> A, 25 -> Z, 26 -> AA, ..."""
+    alias = ""
+    n += 1
+    while n:
+        n, rest = divmod(n - 1, 26)
+        alias = chr(ord("A") + rest) + alias
+    return alias
+
+def format_delta(seconds: float) -> str:
+    minutes = int(max(seconds, 0) // 60)
+    if minutes < 60:
+        return f"+{minutes}m"
+    hours, minutes = divmod(minutes, 60)
+    if hours < 24:
+        return f"+{hours}h{minutes:02d}m" if minutes else f"+{hours}h"
+    days, hours = divmod(hours, 24)
+    return f"+{days}d{hours}h" if hours else f"+{days}d"
+
+def iter_thread_blocks(
+    workspace: WorkspaceData,
+    channel_id: str,
+    start_day: Optional[date] = None,
+    end_day: Optional[date] = None
+) -> Iterator[List[Message]]:
+    """Each thread started in the date range (parent first, then its replies), oldest first"""
+    messages = workspace.messages.get(channel_id, [])
+    if isinstance(messages, SqliteChannelMessages):
+        source = messages
+        total = len(messages) - messages.orphan_count
+    else:
+        source = get_thread_index(workspace, channel_id)
+        total = len(source.order)
+    lo = source.offset_for(day_bounds(start_day)[0]) if start_day else 0
+    hi = source.offset_for(day_bounds(end_day)[1]) if end_day else total
+
+    def ordered() -> Iterator[Message]:
+        if isinstance(messages, SqliteChannelMessages):
+            for offset in range(lo, hi, SQLITE_BATCH_SIZE):
+                yield from messages.thread_page(offset, min(SQLITE_BATCH_SIZE, hi - offset), False)
+        else:
+            for position in source.order[lo:hi]:
+                yield messages[position]
+
+    block, block_ts = [], None
+    for msg in ordered():
+        thread_ts = msg.thread_ts or msg.ts
+        if block and thread_ts != block_ts:
+            yield block
+            block = []
+        block.append(msg)
+        block_ts = thread_ts
+    if block:
+        yield block
+
+class TranscriptWriter:
+    """Turns thread blocks into transcript lines and packs them into chunks within a token budget"""
+
+    def __init__(self, workspace: WorkspaceData, label: str, max_tokens: int, count_tokens: Callable[[str], int]):
+        self.users = workspace.users
+        self.label = label
+        self.max_tokens = max_tokens
+        self.count_tokens = count_tokens
+        self.aliases: Dict[str, str] = {}  # user id -> alias, for the whole export
+        self.alias_users: Dict[str, str] = {}  # alias -> user id
+        self.chunk_index = 0
+        # Worst-case header without speakers: the real dates have the same shape as these
+        self.header_tokens = count_tokens(self._header("0000-00-00 00:00", "0000-00-00 00:00", [])) + 2
+        if self.header_tokens >= max_tokens:
+            raise ValueError(f"A budget of {max_tokens} tokens doesn't even fit the chunk header")
+        self._reset()
+
+    def _reset(self) -> None:
+        self.lines: List[str] = []
+        self.tokens = self.header_tokens
+        self.speakers: Dict[str, str] = {}  # alias -> name, in this chunk
+        self.day: Optional[date] = None
+        self.last_ts: Optional[float] = None  # previous top-level message
+        self.first_ts: Optional[float] = None
+        self.chunk_last_ts: Optional[float] = None
+        self.message_count = 0
+
+    def _header(self, first: str, last: str, speakers: List[str]) -> str:
+        lines = [f"{self.label}, part {self.chunk_index + 1}: {first} to {last}"]
+        if speakers:
+            lines.append("Speakers: " + ", ".join(speakers))
+        lines.append(TIMES_LEGEND)
+        return "\n".join(lines) + "\n\n"
+
+    def alias(self, user_id: str) -> str:
+        alias = self.aliases.get(user_id)
+        if alias is None:
+            alias = self.aliases[user_id] = speaker_alias(len(self.aliases))
+            self.alias_users[alias] = user_id
+        return alias
+
+    def _message_text(self, msg: Message, indent: str) -> str:
+        text = MENTION_PATTERN.sub(lambda match: "@" + self.alias(match.group(1)), msg.text) if "<@" in msg.text else msg.text
+        text = text.strip().replace("\n", "\n" + indent)
+        if msg.attachments:
+            names = ", ".join(attachment.get("name", "unnamed") for attachment in msg.attachments)
+            text = f"{text} [file: {names}]" if text else f"[file: {names}]"
+        return text
+
+    def _render(self, msg: Message, previous_in_thread: Optional[float]) -> Tuple[List[str], List[str]]:
+        """(lines, user ids that need a legend entry) for one message, advancing the time context"""
+        lines = []
+        is_reply = bool(msg.thread_ts and msg.thread_ts != msg.ts)
+        users = [msg.user] + MENTION_PATTERN.findall(msg.text)
+        if is_reply:
+            delta = format_delta(msg.ts - previous_in_thread) if previous_in_thread is not None else "+?"
+            lines.append(f"  > {self.alias(msg.user)} {delta}: {self._message_text(msg, '    ')}")
+        else:
+            moment = datetime.fromtimestamp(msg.ts)
+            if moment.date() != self.day:
+                lines.append(f"== {moment:%Y-%m-%d %a} ==")
+                stamp = f"[{moment:%H:%M}]"
+            else:
+                stamp = f"[{format_delta(msg.ts - self.last_ts)}]"
+            self.day, self.last_ts = moment.date(), msg.ts
+            lines.append(f"{stamp} {self.alias(msg.user)}: {self._message_text(msg, '  ')}")
+        return lines, users
+
+    def _cost(self, lines: List[str], users: List[str]) -> int:
+        new_speakers = {self.alias(uid) for uid in users} - set(self.speakers)
+        legend = sum(self.count_tokens(f", {alias}={self._name(alias)}") for alias in new_speakers)
+        return sum(self.count_tokens(line + "\n") for line in lines) + legend
+
+    def _name(self, alias: str) -> str:
+        user_id = self.alias_users[alias]
+        return user_display_name(self.users.get(user_id)) if user_id in self.users else user_id
+
+    def _add(self, lines: List[str], users: List[str], msg: Message, cost: int) -> None:
+        self.lines.extend(lines)
+        self.tokens += cost
+        for uid in users:
+            alias = self.alias(uid)
+            self.speakers.setdefault(alias, self._name(alias))
+        self.first_ts = msg.ts if self.first_ts is None else self.first_ts
+        self.chunk_last_ts = msg.ts
+        self.message_count += 1
+
+    def add_block(self, block: List[Message]) -> Iterator[TranscriptChunk]:
+        """Add a thread; yields the chunks it closes"""
+        # Try the thread as a whole in the current chunk first
+        saved = self.day, self.last_ts
+        rendered, previous = [], None
+        for msg in block:
+            lines, users = self._render(msg, previous)
+            rendered.append((msg, lines, users))
+            previous = msg.ts
+        cost = sum(self._cost(lines, users) for _, lines, users in rendered)
+        if self.tokens + cost <= self.max_tokens:
+            for msg, lines, users in rendered:
+                self._add(lines, users, msg, self._cost(lines, users))
+            return
+        self.day, self.last_ts = saved
+
+        # Doesn't fit: start a new chunk for it, splitting it if it doesn't fit an empty chunk either
+        if self.lines:
+            yield self.close()
+        previous = None
+        for msg in block:
+            lines, users = self._render(msg, previous)
+            cost = self._cost(lines, users)
+            if self.tokens + cost > self.max_tokens and self.lines:
+                yield self.close()
+                lines, users = self._render(msg, previous)  # Fresh chunk: absolute time again
+                cost = self._cost(lines, users)
+            if self.tokens + cost > self.max_tokens:  # The message alone is bigger than a chunk
+                budget = self.max_tokens - self.tokens - (cost - self.count_tokens(lines[-1] + "\n"))
+                lines[-1] = self._truncate(lines[-1], budget)
+                cost = self._cost(lines, users)
+            self._add(lines, users, msg, cost)
+            previous = msg.ts
+
+    def _truncate(self, line: str, budget: int) -> str:
+        """Cut a line so it fits in budget tokens (a single message bigger than a whole chunk)"""
+        if self.count_tokens(line + "\n") <= budget:
+            return line
+        marker = " …[cut]"
+        lo, hi = 0, len(line)
+        while lo < hi:  # Longest prefix that fits
+            mid = (lo + hi + 1) // 2
+            if self.count_tokens(line[:mid] + marker + "\n") <= budget:
+                lo = mid
+            else:
+                hi = mid - 1
+        return line[:lo] + marker
+
+    def close(self) -> TranscriptChunk:
+        """The current chunk, then start a new one"""
+        speakers = [f"{alias}={name}" for alias, name in self.speakers.items()]
+        text = self._header(
+            f"{datetime.fromtimestamp(self.first_ts):%Y-%m-%d %H:%M}",
+            f"{datetime.fromtimestamp(self.chunk_last_ts):%Y-%m-%d %H:%M}",
+            speakers
+        ) + "\n".join(self.lines) + "\n"
+        self.chunk_index += 1
+        chunk = TranscriptChunk(
+            index=self.chunk_index,
+            text=text,
+            tokens=self.count_tokens(text),
+            first_ts=self.first_ts,
+            last_ts=self.chunk_last_ts,
+            message_count=self.message_count
+        )
+        self._reset()
+        return chunk
+
+def conversation_title(workspace: WorkspaceData, channel_id: str) -> str:
+    channel = workspace.channels[channel_id]
+    return channel.display_name or channel.name
+
+def iter_transcript_chunks(
+    workspace: WorkspaceData,
+    channel_id: str,
+    max_tokens: int = DEFAULT_MAX_TOKENS,
+    count_tokens: Optional[Callable[[str], int]] = None,
+    start_day: Optional[date] = None,
+    end_day: Optional[date] = None
+) -> Iterator[TranscriptChunk]:
+    """
+    The conversation (or the threads started from start_day through end_day) as transcript chunks of
+    at most max_tokens each; count_tokens defaults to the DEFAULT_MODEL encoding
+    """
+    writer = TranscriptWriter(
+        workspace, conversation_title(workspace, channel_id), max_tokens, count_tokens or token_counter(DEFAULT_MODEL)
+    )
+    for block in iter_thread_blocks(workspace, channel_id, start_day, end_day):
+        yield from writer.add_block(block)
+    if writer.lines:
+        yield writer.close()
+
+def main():
+    # Imported here: only the command line needs name lookups
+    from search_query import resolve_channels
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("export", help="Export directory or .zip")
+    parser.add_argument("--channel", required=True, help="Channel name (or DM/MPDM display name, or id)")
+    parser.add_argument("--from", dest="start_day", type=date.fromisoformat, help="First day, YYYY-MM-DD")
+    parser.add_argument("--to", dest="end_day", type=date.fromisoformat, help="Last day, YYYY-MM-DD")
+    parser.add_argument("--max-tokens", type=int, default=DEFAULT_MAX_TOKENS, help="Token budget per chunk")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help="Model whose tokenizer counts the tokens")
+    parser.add_argument("--out", help="Directory for chunk-001.txt, ... (default: print to stdout)")
+    args = parser.parse_args()
+
+    workspace = load_workspace_data(args.export, lazy=True)  # Only the one conversation gets parsed
+    matches = resolve_channels(args.channel.lstrip("#"), workspace.channels)
+    if len(matches) != 1:
+        names = ", ".join(sorted(conversation_title(workspace, cid) for cid in matches)) or "none"
+        sys.exit(f"--channel {args.channel} has to match exactly one conversation (matches: {names})")
+    channel_id = matches.pop()
+
+    out_dir = Path(args.out) if args.out else None
+    if out_dir:
+        out_dir.mkdir(parents=True, exist_ok=True)
+    chunks = iter_transcript_chunks(
+        workspace, channel_id, args.max_tokens, token_counter(args.model), args.start_day, args.end_day
+    )
+    for chunk in chunks:  # Written as they're produced
+        if out_dir:
+            (out_dir / f"chunk-{chunk.index:03d}.txt").write_text(chunk.text, encoding="utf-8")
+            print(f"chunk-{chunk.index:03d}.txt: {chunk.message_count} messages, {chunk.tokens} tokens",
+                  file=sys.stderr)
+        else:
+            print(chunk.text)
+
+if __name__ == "__main__":
+    main()
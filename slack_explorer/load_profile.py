@@ -0,0 +1,171 @@
+"""
+Where a load spends its time and memory: per-phase and per-channel spans for load_workspace_data.
+
+A `LoadProfile` passed to load_workspace_data wraps each phase (users.json, channel records and DM/MPDM
+names, cache lookup, each channel's parse, ...) in a `span`. Inside a channel, every day file is
+split into decoding the JSON and constructing the `Message`s. A span measures perf_counter time and,
+with tracemalloc on, the bytes still allocated when it ends (what it added to the workspace) and the
+peak allocation during it. Spans with the same phase and channel add up.
+
+Profiled loads parse channels in-process, so that every span is measured in this process, and day
+files are decoded whole instead of streamed so the two halves can be told apart. tracemalloc slows
+parsing down severalfold: compare seconds between profiled runs only. tracemalloc is process-wide, so
+the explorer profiles with trace_memory=False (it would trace every session of the server); memory is
+measured from the command line.
+
+`report` gives a JSON-ready summary (phases, plus the top channels by seconds and by bytes), shown in
+the explorer after a profiled load and written by the command line for CI comparison:
+
+    python load_profile.py ../exported --json profile.json
+    python load_profile.py ../exported --no-memory  # timings only, close to normal speed
+"""
+import argparse
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from dataclasses import asdict, dataclass
+from typing import TYPE_CHECKING, Callable, ContextManager, Dict, Iterator, List, Optional, Tuple
+
+if TYPE_CHECKING:  # Only for annotations, data_loader imports this module
+    from data_loader import WorkspaceData
+
+# What the loader functions take to measure themselves: span(phase) or span(phase, channel_id), a
+# LoadProfile's span method or no_span
+Span = Callable[..., ContextManager]
+
+def no_span(phase: str, channel_id: Optional[str] = None) -> ContextManager:
+    return nullcontext()
+
+@dataclass
+class SpanStats:
+    calls: int = 0
+    seconds: float = 0.0
+    bytes: int = 0  # still allocated at the end of the spans (0 without tracemalloc); for "json decode" that's
+                    # the decoded day files, handed on to Message construction and freed after it
+    peak_bytes: int = 0  # highest allocation during any of the spans, above what was allocated at its start
+    nested: bool = False  # inside another span of the same channel (e.g. a day file inside its channel)
+
+class LoadProfile:
+    def __init__(self, trace_memory: bool = True):
+        self.trace_memory = trace_memory
+        self.spans: Dict[Tuple[str, Optional[str]], SpanStats] = {}  # (phase, channel_id) -> stats, in first-seen order
+        self._open: List[list] = []  # [channel_id, start allocation, peak so far] of the spans we're inside of
+        self._started_tracing = False
+        self._started_at: Optional[float] = None
+        self.total_seconds = 0.0
+        self.peak_bytes = 0
+
+    def start(self) -> None:
+        self._started_at = time.perf_counter()
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    def stop(self) -> None:
+        self.total_seconds = time.perf_counter() - self._started_at
+        if self.trace_memory:
+            self.peak_bytes = max(self.peak_bytes, tracemalloc.get_traced_memory()[1])
+            if self._started_tracing:
+                tracemalloc.stop()
+                self._started_tracing = False
+
+    def _note_peak(self) -> int:
+        """Current allocation; folds the peak since the last reset into every open span"""
+        current, peak = tracemalloc.get_traced_memory()
+        self.peak_bytes = max(self.peak_bytes, peak)
+        for span in self._open:
+            span[2] = max(span[2], peak - span[1])
+        tracemalloc.reset_peak()
+        return current
+
+    @contextmanager
+    def span(self, phase: str, channel_id: Optional[str] = None) -> Iterator[None]:
+        tracing = self.trace_memory and tracemalloc.is_tracing()
+        nested = channel_id is not None and any(span[0] == channel_id for span in self._open)
+        self._open.append([channel_id, self._note_peak() if tracing else 0, 0])
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            stats = self.spans.setdefault((phase, channel_id), SpanStats(nested=nested))
+            stats.calls += 1
+            stats.seconds += seconds
+            current = self._note_peak() if tracing else 0
+            _, start_bytes, peak = self._open.pop()
+            if tracing:
+                stats.bytes += current - start_bytes
+                stats.peak_bytes = max(stats.peak_bytes, peak)
+
+    def report(self, workspace: Optional["WorkspaceData"] = None, top: int = 10) -> Dict:
+        """JSON-ready summary; workspace adds conversation names and message counts"""
+        phases: Dict[str, SpanStats] = {}
+        channels: Dict[str, Dict[str, SpanStats]] = {}
+        for (phase, channel_id), stats in self.spans.items():
+            total = phases.setdefault(phase, SpanStats(nested=stats.nested))
+            total.calls += stats.calls
+            total.seconds += stats.seconds
+            total.bytes += stats.bytes
+            total.peak_bytes = max(total.peak_bytes, stats.peak_bytes)
+            if channel_id is not None:
+                channels.setdefault(channel_id, {})[phase] = stats
+
+        channel_rows = []
+        for channel_id, channel_phases in channels.items():
+            channel = workspace.channels.get(channel_id) if workspace else None
+            messages = workspace.messages.get(channel_id) if workspace else None
+            outer = [stats for stats in channel_phases.values() if not stats.nested]
+            channel_rows.append({
+                "channel_id": channel_id,
+                "name": (channel.display_name or channel.name) if channel else channel_id,
+                "messages": len(messages) if messages is not None else None,
+                "seconds": sum(stats.seconds for stats in outer),
+                "bytes": sum(stats.bytes for stats in outer),
+                "peak_bytes": max((stats.peak_bytes for stats in outer), default=0),
+                **{f"{phase} seconds": stats.seconds for phase, stats in channel_phases.items()},
+            })
+        return {
+            "total_seconds": self.total_seconds,
+            "peak_bytes": self.peak_bytes if self.trace_memory else None,
+            "trace_memory": self.trace_memory,
+            "phases": [{"phase": phase, **asdict(stats)} for phase, stats in phases.items()],
+            "top_channels_by_seconds": sorted(channel_rows, key=lambda row: -row["seconds"])[:top],
+            "top_channels_by_bytes": sorted(channel_rows, key=lambda row: -row["bytes"])[:top],
+        }
+
+def main():
+    # Imported here, data_loader imports this module
+    from data_loader import load_workspace_data
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("export", help="Export directory or .zip")
+    parser.add_argument("--cache", help="Parsed-data cache file to load through (measures a cached load)")
+    parser.add_argument("--no-memory", action="store_true", help="Only time the phases, without tracemalloc")
+    parser.add_argument("--top", type=int, default=10, help="Channels listed per ranking")
+    parser.add_argument("--json", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    profile = LoadProfile(trace_memory=not args.no_memory)
+    workspace = load_workspace_data(args.export, cache_path=args.cache, profile=profile)
+    report = profile.report(workspace, top=args.top)
+
+    print(f"Loaded in {report['total_seconds']:.2f} s" + (
+        f", peak {report['peak_bytes'] / 2**20:.1f} MB traced" if report["peak_bytes"] is not None else ""
+    ))
+    print(f"{'phase':<36}{'calls':>8}{'seconds':>10}{'MB kept':>10}{'MB peak':>10}")
+    for phase in report["phases"]:
+        print(f"{phase['phase']:<36}{phase['calls']:>8}{phase['seconds']:>10.3f}"
+              f"{phase['bytes'] / 2**20:>10.1f}{phase['peak_bytes'] / 2**20:>10.1f}")
+    for title, key, value in (("seconds", "top_channels_by_seconds", "seconds"), ("MB kept", "top_channels_by_bytes", "bytes")):
+        print(f"\nTop channels by {title}:")
+        for row in report[key]:
+            amount = row[value] if value == "seconds" else row[value] / 2**20
+            print(f"  {row['name']:<40}{amount:>10.3f}  ({row['messages']} messages)")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
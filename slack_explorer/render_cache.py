@@ -0,0 +1,113 @@
+"""
+Display-ready message text, made once per message and reused on every rerun.
+
+Streamlit reruns the whole script on every interaction, so without this each visible message had its
+author looked up, its timestamp formatted and its `<@U...>` mentions rewritten again every time. A
+`RenderCache` lives on the workspace (`WorkspaceData.rendered`) and fills in lazily, per channel and
+message ts, as pages are viewed, and drops the least recently viewed channels past MAX_RENDERED_MESSAGES.
+Everything it holds depends on the user table, so it's tied to a fingerprint of the users' names and
+dropped when they change. The fingerprint is only recomputed when the workspace gets a new user table
+(user tables are replaced, never modified in place), not on every rerun.
+"""
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+from data_loader import Message, User, WorkspaceData
+
+# Rendered messages kept per workspace; the channel being viewed is never dropped, even past this
+MAX_RENDERED_MESSAGES = 200_000
+
+MENTION_PATTERN = re.compile(r"<@([A-Z0-9]+)(?:\|[^>]+)?>")
+
+def format_timestamp(ts: float) -> str:
+    """Format a Unix timestamp into a readable date/time"""
+    dt = datetime.fromtimestamp(ts)
+    return dt.strftime("%Y-%m-%d %I:%M %p")
+
+def user_display_name(user: Optional[User]) -> str:
+    return user.real_name or user.user_name if user else "Unknown User"
+
+def parse_user_mentions(text: str, users_dict: dict) -> str:
+    """
+    Replace Slack-style user mentions (<@U123ABC>) with @RealName, falling back to @UserName.
+    """
+    def replacer(match):
+        user_id = match.group(1)
+        if user_id in users_dict:
+            user = users_dict[user_id]
+            # Prioritize real_name over user_name
+            name = user.real_name or user.user_name or "UnknownUser"
+            return f"@{name}"
+        return "@UnknownUser"
+    if "<@" not in text:  # Most messages have no mentions
+        return text
+    return MENTION_PATTERN.sub(replacer, text)
+
+def users_fingerprint(users: Dict[str, User]) -> int:
+    """Changes whenever a user is added, removed or renamed"""
+    return hash(tuple((uid, user.real_name, user.user_name) for uid, user in users.items()))
+
+@dataclass(frozen=True)
+class RenderedMessage:
+    author: str
+    timestamp: str
+    text: str  # mentions resolved
+
+class RenderCache:
+    """channel_id -> {message ts -> RenderedMessage}, valid for one state of the user table"""
+
+    def __init__(self, users_key: int, users: Optional[Dict[str, User]] = None, max_messages: int = MAX_RENDERED_MESSAGES):
+        self.users_key = users_key
+        self.users = users  # the user table users_key was last checked against, see get_render_cache
+        self.max_messages = max_messages
+        self.channels: "OrderedDict[str, Dict[float, RenderedMessage]]" = OrderedDict()  # least recently viewed first
+        self.size = 0  # messages held, over all channels
+        self._lock = threading.Lock()  # Shared by every session viewing the workspace, each in its own thread
+
+    def get(self, channel_id: str, msg: Message, users: Dict[str, User]) -> RenderedMessage:
+        with self._lock:
+            channel = self.channels.get(channel_id)
+            if channel is None:
+                channel = self.channels[channel_id] = {}
+            else:
+                self.channels.move_to_end(channel_id)
+            rendered = channel.get(msg.ts)
+            if rendered is None:
+                rendered = channel[msg.ts] = RenderedMessage(
+                    author=user_display_name(users.get(msg.user)),
+                    timestamp=format_timestamp(msg.ts),
+                    text=parse_user_mentions(msg.text, users)
+                )
+                self.size += 1
+                # channel_id was just moved to the end, so it's never the one evicted
+                while self.size > self.max_messages and len(self.channels) > 1:
+                    _, evicted = self.channels.popitem(last=False)
+                    self.size -= len(evicted)
+            return rendered
+
+    def for_channels(self, channel_ids: Iterable[str]) -> "RenderCache":
+        """A new cache holding this one's entries for channel_ids only (e.g. those a refresh left unchanged)"""
+        kept = RenderCache(self.users_key, self.users, self.max_messages)
+        channel_ids = set(channel_ids)
+        with self._lock:
+            for channel_id, channel in self.channels.items():  # Keeps the viewing order
+                if channel_id in channel_ids:
+                    # Copied: sessions still on the old workspace keep filling this cache's dicts
+                    kept.channels[channel_id] = dict(channel)
+                    kept.size += len(channel)
+        return kept
+
+def get_render_cache(workspace: WorkspaceData) -> RenderCache:
+    """The workspace's render cache, replaced by an empty one if the user table changed since it was made"""
+    rendered = workspace.rendered
+    if rendered is not None and rendered.users is workspace.users:
+        return rendered
+    users_key = users_fingerprint(workspace.users)
+    if rendered is None or rendered.users_key != users_key:
+        rendered = workspace.rendered = RenderCache(users_key)
+    rendered.users = workspace.users
+    return rendered
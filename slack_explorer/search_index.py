@@ -0,0 +1,149 @@
+"""
+Inverted full-text index over message text.
+
+Built once per loaded workspace. Every message gets a document id; ids are handed out channel by
+channel in message order, so a channel is a contiguous id range and a document id maps back to
+(channel_id, position in workspace.messages[channel_id]) with a bisect.
+"""
+import heapq
+import math
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from typing import Container, Dict, Iterable, List, Optional, Tuple
+
+from data_loader import WorkspaceData
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+# BM25 parameters, the usual defaults
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+def tokenize(text: str) -> List[str]:
+    """Case-folded word tokens of a message text"""
+    return TOKEN_PATTERN.findall(text.casefold())
+
+@dataclass
+class SearchHit:
+    channel_id: str
+    position: Optional[int]  # index into workspace.messages[channel_id], None if the backend doesn't know it
+    ts: float
+    score: float
+    text: Optional[str] = None  # set by backends that return the message text along with the hit
+
+class MessageIndex:
+    """Term -> posting list (document ids + term frequencies), ranked with BM25"""
+
+    def __init__(self):
+        self.postings: Dict[str, Tuple[array, array]] = {}  # term -> (doc ids, term frequencies)
+        self.doc_ts = array("d")
+        self.doc_lengths = array("I")
+        self.channel_ids: List[str] = []
+        self.channel_starts: List[int] = []  # first document id of each channel in channel_ids
+        self.avg_doc_length = 1.0
+        # Structured-query posting lists (see search_query.py)
+        self.user_postings: Dict[str, array] = {}  # user id -> doc ids
+        self.attachment_docs = array("I")  # doc ids of messages with files
+
+    @classmethod
+    def build(cls, workspace: WorkspaceData) -> "MessageIndex":
+        index = cls()
+        postings = defaultdict(lambda: (array("I"), array("I")))
+        user_postings = defaultdict(lambda: array("I"))
+        doc_id = 0
+        for channel_id, messages in workspace.messages.items():
+            index.channel_ids.append(channel_id)
+            index.channel_starts.append(doc_id)
+            for msg in messages:
+                term_counts = Counter(tokenize(msg.text))
+                for term, count in term_counts.items():
+                    doc_ids, freqs = postings[term]
+                    doc_ids.append(doc_id)
+                    freqs.append(count)
+                index.doc_ts.append(msg.ts)
+                index.doc_lengths.append(sum(term_counts.values()))
+                user_postings[msg.user].append(doc_id)
+                if msg.attachments:
+                    index.attachment_docs.append(doc_id)
+                doc_id += 1
+        index.postings = dict(postings)
+        index.user_postings = dict(user_postings)
+        if doc_id:
+            index.avg_doc_length = (sum(index.doc_lengths) / doc_id) or 1.0
+        return index
+
+    @property
+    def doc_count(self) -> int:
+        return len(self.doc_ts)
+
+    def locate(self, doc_id: int) -> Tuple[str, int]:
+        """Map a document id to (channel_id, position within the channel's messages)"""
+        i = bisect_right(self.channel_starts, doc_id) - 1
+        return self.channel_ids[i], doc_id - self.channel_starts[i]
+
+    def _idf(self, term: str) -> float:
+        doc_freq = len(self.postings[term][0])
+        return math.log(1 + (self.doc_count - doc_freq + 0.5) / (doc_freq + 0.5))
+
+    def _term_freqs(self, term: str, doc_ids: set) -> Iterable[Tuple[int, int]]:
+        """(doc id, term frequency) for the given documents, which must all contain the term"""
+        posting_ids, freqs = self.postings[term]
+        if len(doc_ids) * 16 < len(posting_ids):
+            # Few candidates in a long posting list: binary search instead of a full scan
+            for doc_id in doc_ids:
+                yield doc_id, freqs[bisect_left(posting_ids, doc_id)]
+        else:
+            for doc_id, freq in zip(posting_ids, freqs):
+                if doc_id in doc_ids:
+                    yield doc_id, freq
+
+    def scores(self, terms: List[str], doc_filter: Optional[Container[int]] = None) -> Dict[int, float]:
+        """
+        BM25 score of every document containing all terms. doc_filter optionally restricts the candidates:
+        a set is intersected, any other container (e.g. ranges of ids) is checked per candidate.
+        """
+        terms = list(dict.fromkeys(terms))
+        if not terms or any(term not in self.postings for term in terms):
+            return {}
+
+        # Intersect starting from the rarest term to keep the candidate set small
+        terms.sort(key=lambda term: len(self.postings[term][0]))
+        candidates = set(self.postings[terms[0]][0])
+        if isinstance(doc_filter, (set, frozenset)):
+            candidates.intersection_update(doc_filter)
+        elif doc_filter is not None:
+            candidates = {doc_id for doc_id in candidates if doc_id in doc_filter}
+        for term in terms[1:]:
+            if not candidates:
+                return {}
+            candidates.intersection_update(self.postings[term][0])
+
+        scores = dict.fromkeys(candidates, 0.0)
+        for term in terms:
+            idf = self._idf(term)
+            for doc_id, freq in self._term_freqs(term, candidates):
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_lengths[doc_id] / self.avg_doc_length)
+                scores[doc_id] += idf * freq * (BM25_K1 + 1) / (freq + norm)
+        return scores
+
+    def hit(self, doc_id: int, score: float) -> SearchHit:
+        channel_id, position = self.locate(doc_id)
+        return SearchHit(channel_id=channel_id, position=position, ts=self.doc_ts[doc_id], score=score)
+
+    def search(self, query: str, limit: int = 50, doc_filter: Optional[Container[int]] = None) -> List[SearchHit]:
+        """
+        Messages containing all query terms, best BM25 score first (newest first on ties).
+        doc_filter optionally restricts the candidates to a set of document ids.
+        """
+        scores = self.scores(tokenize(query), doc_filter)
+        best = heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], self.doc_ts[item[0]]))
+        return [self.hit(doc_id, score) for doc_id, score in best]
+
+def get_message_index(workspace: WorkspaceData) -> MessageIndex:
+    """The workspace's message index, built on first use"""
+    if workspace.search_index is None:
+        workspace.search_index = MessageIndex.build(workspace)
+    return workspace.search_index
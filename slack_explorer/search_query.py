@@ -0,0 +1,239 @@
+"""
+Structured message search: `from:@clayton in:#proj-x after:2024-01-01 has:file "deploy now" rollback`.
+
+`parse_query` turns the query into a `QueryPlan`, with user and channel names resolved to ids
+against the workspace. `search_messages` runs it. With an in-memory `MessageIndex`, the filters are
+applied first: channels and dates become ranges of document ids (a channel is a contiguous id range
+whose timestamps are sorted, so a date range is two bisects per channel), and users and has:file
+become posting-list sets. Text terms are intersected and ranked only within what the filters leave,
+and quoted phrases are checked last, on the best-scoring candidates only. The SQLite backend turns
+the same plan into one FTS5 query with WHERE clauses.
+
+Supported operators:
+- from:@name / from:name / from:"Real Name": messages by a user (id, user name or real name)
+- in:#channel / in:name: in a channel, DM or MPDM (by name or display name); in:@name: DMs with a user
+- after:YYYY-MM-DD / before:YYYY-MM-DD: after/before that day (both exclusive, like Slack); on:YYYY-MM-DD
+- has:file: messages with attachments
+- "quoted phrase": the words in this order; anything else is a plain word that must appear
+"""
+import heapq
+import re
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from data_loader import Channel, User, WorkspaceData
+from search_index import MessageIndex, SearchHit, get_message_index, tokenize
+from time_index import day_bounds
+
+QUERY_TOKEN_PATTERN = re.compile(r'(\w+):("[^"]*"|\S+)|"([^"]*)"|(\S+)')
+
+OPERATORS = {"from", "in", "after", "before", "on", "has"}
+
+@dataclass
+class QueryPlan:
+    terms: List[str] = field(default_factory=list)  # plain words, all must match
+    phrases: List[List[str]] = field(default_factory=list)  # token sequences that must appear in order
+    user_ids: Optional[Set[str]] = None  # None: any user
+    channel_ids: Optional[Set[str]] = None  # None: any conversation
+    start_ts: Optional[float] = None  # inclusive
+    end_ts: Optional[float] = None  # exclusive
+    has_file: bool = False
+    errors: List[str] = field(default_factory=list)  # parts of the query that couldn't be resolved
+
+    @property
+    def text_terms(self) -> List[str]:
+        """Every word the text has to contain, phrase words included"""
+        return list(dict.fromkeys(self.terms + [term for phrase in self.phrases for term in phrase]))
+
+def _restrict(current: Optional[Set[str]], ids: Set[str]) -> Set[str]:
+    # Repeated operators of one kind widen the match (from:a from:b = either user), like Slack
+    return ids if current is None else current | ids
+
+def resolve_users(name: str, users: Dict[str, User]) -> Set[str]:
+    """User ids matching an id, user name or real name exactly, else by prefix"""
+    key = name.casefold()
+    exact = {
+        uid for uid, user in users.items()
+        if key in (uid.casefold(), user.user_name.casefold(), (user.real_name or "").casefold())
+    }
+    if exact:
+        return exact
+    return {
+        uid for uid, user in users.items()
+        if user.user_name.casefold().startswith(key)
+        or any(word.startswith(key) for word in (user.real_name or "").casefold().split())
+    }
+
+def resolve_channels(name: str, channels: Dict[str, Channel]) -> Set[str]:
+    """Conversation ids matching a name or display name exactly, else by prefix"""
+    key = name.casefold()
+    exact = {
+        cid for cid, channel in channels.items()
+        if key in (cid.casefold(), channel.name.casefold(), (channel.display_name or "").casefold())
+    }
+    if exact:
+        return exact
+    return {
+        cid for cid, channel in channels.items()
+        if channel.name.casefold().startswith(key) or (channel.display_name or "").casefold().startswith(key)
+    }
+
+def _parse_day(value: str):
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+def parse_query(query: str, workspace: WorkspaceData) -> QueryPlan:
+    plan = QueryPlan()
+    for match in QUERY_TOKEN_PATTERN.finditer(query):
+        operator, value, phrase, word = match.groups()
+        if operator and operator.lower() not in OPERATORS:
+            word = match.group(0)  # Not an operator ("http://..." or "re:"), search it as text
+            operator = None
+        if phrase is not None:
+            tokens = tokenize(phrase)
+            if len(tokens) > 1:
+                plan.phrases.append(tokens)
+            else:
+                plan.terms.extend(tokens)
+            continue
+        if word is not None:
+            plan.terms.extend(tokenize(word))
+            continue
+
+        operator = operator.lower()
+        value = value.strip('"')
+        if operator == "from":
+            user_ids = resolve_users(value.lstrip("@"), workspace.users)
+            if not user_ids:
+                plan.errors.append(f"No user matches from:{value}")
+            plan.user_ids = _restrict(plan.user_ids, user_ids)
+        elif operator == "in":
+            if value.startswith("@"):  # DMs with that user
+                user_ids = resolve_users(value[1:], workspace.users)
+                channel_ids = {
+                    cid for cid, channel in workspace.channels.items()
+                    if channel.type == "dm" and channel.members & user_ids
+                }
+            else:
+                channel_ids = resolve_channels(value.lstrip("#"), workspace.channels)
+            if not channel_ids:
+                plan.errors.append(f"No conversation matches in:{value}")
+            plan.channel_ids = _restrict(plan.channel_ids, channel_ids)
+        elif operator == "has":
+            if value.lower() in ("file", "files", "attachment", "attachments"):
+                plan.has_file = True
+            else:
+                plan.errors.append(f"Unsupported has:{value} (only has:file)")
+        else:  # after / before / on
+            try:
+                day_start, next_day_start = day_bounds(_parse_day(value))
+            except ValueError:
+                plan.errors.append(f"{operator}:{value} isn't a YYYY-MM-DD date")
+                continue
+            if operator in ("after", "on"):
+                start = next_day_start if operator == "after" else day_start
+                plan.start_ts = start if plan.start_ts is None else max(plan.start_ts, start)
+            if operator in ("before", "on"):
+                end = day_start if operator == "before" else next_day_start
+                plan.end_ts = end if plan.end_ts is None else min(plan.end_ts, end)
+    return plan
+
+class DocRanges:
+    """Sorted, non-overlapping [lo, hi) ranges of document ids, used as a candidate filter"""
+
+    def __init__(self, ranges: List[Tuple[int, int]]):
+        self.ranges = sorted(ranges)
+        self.starts = [lo for lo, _ in self.ranges]
+
+    def __contains__(self, doc_id: int) -> bool:
+        i = bisect_right(self.starts, doc_id) - 1
+        return i >= 0 and doc_id < self.ranges[i][1]
+
+    def __len__(self) -> int:
+        return sum(hi - lo for lo, hi in self.ranges)
+
+    def __iter__(self) -> Iterator[int]:
+        for lo, hi in self.ranges:
+            yield from range(lo, hi)
+
+    def newest(self, limit: int) -> Iterator[int]:
+        """Enough candidates to find the newest `limit` documents: the last `limit` of every range"""
+        for lo, hi in self.ranges:
+            yield from range(max(lo, hi - limit), hi)
+
+def plan_doc_ranges(index: MessageIndex, plan: QueryPlan) -> DocRanges:
+    """Channel and date filters as document id ranges"""
+    ranges = []
+    for i, channel_id in enumerate(index.channel_ids):
+        if plan.channel_ids is not None and channel_id not in plan.channel_ids:
+            continue
+        lo = index.channel_starts[i]
+        hi = index.channel_starts[i + 1] if i + 1 < len(index.channel_starts) else index.doc_count
+        # Timestamps are sorted within a channel's range
+        if plan.start_ts is not None:
+            lo = bisect_left(index.doc_ts, plan.start_ts, lo, hi)
+        if plan.end_ts is not None:
+            hi = bisect_left(index.doc_ts, plan.end_ts, lo, hi)
+        if lo < hi:
+            ranges.append((lo, hi))
+    return DocRanges(ranges)
+
+def contains_phrase(text: str, phrase: List[str]) -> bool:
+    tokens = tokenize(text)
+    n = len(phrase)
+    return any(tokens[i:i + n] == phrase for i in range(len(tokens) - n + 1))
+
+def execute_plan(index: MessageIndex, workspace: WorkspaceData, plan: QueryPlan, limit: int = 50) -> List[SearchHit]:
+    """Run a plan against an in-memory index: filters first, then text, then phrases"""
+    # 1. Structural filters, cheapest representation first: id ranges for channels/dates, sets for the rest
+    doc_filter = plan_doc_ranges(index, plan) if plan.channel_ids is not None or plan.start_ts is not None \
+        or plan.end_ts is not None else None
+    posting_sets = []
+    if plan.user_ids is not None:
+        posting_sets.append(set().union(*(index.user_postings.get(uid, ()) for uid in plan.user_ids)))
+    if plan.has_file:
+        posting_sets.append(set(index.attachment_docs))
+    if posting_sets:
+        posting_sets.sort(key=len)
+        candidates = posting_sets[0]
+        for other in [doc_filter, *posting_sets[1:]]:
+            if other is not None:
+                candidates = {doc_id for doc_id in candidates if doc_id in other}
+        doc_filter = candidates
+
+    # 2. Text terms within the remaining candidates
+    terms = plan.text_terms
+    if not terms:
+        if doc_filter is None:
+            return []
+        # Filters only: newest first
+        pool = doc_filter.newest(limit) if isinstance(doc_filter, DocRanges) else doc_filter
+        return [index.hit(doc_id, 0.0) for doc_id in heapq.nlargest(limit, pool, key=index.doc_ts.__getitem__)]
+
+    scores = index.scores(terms, doc_filter)
+    ranked = sorted(scores.items(), key=lambda item: (item[1], index.doc_ts[item[0]]), reverse=True) \
+        if plan.phrases else heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], index.doc_ts[item[0]]))
+
+    # 3. Phrases: check word order on the best candidates until there are enough hits
+    hits = []
+    for doc_id, score in ranked:
+        hit = index.hit(doc_id, score)
+        if plan.phrases:
+            text = workspace.messages[hit.channel_id][hit.position].text
+            if not all(contains_phrase(text, phrase) for phrase in plan.phrases):
+                continue
+        hits.append(hit)
+        if len(hits) == limit:
+            break
+    return hits
+
+def search_messages(workspace: WorkspaceData, query: str, limit: int = 50) -> Tuple[List[SearchHit], QueryPlan]:
+    """Parse and run a structured query on whichever search backend the workspace has"""
+    plan = parse_query(query, workspace)
+    if plan.errors:
+        return [], plan
+    index = get_message_index(workspace)
+    if isinstance(index, MessageIndex):
+        return execute_plan(index, workspace, plan, limit), plan
+    return index.search_plan(plan, limit), plan
@@ -0,0 +1,284 @@
+"""
+"Find similar": cosine similarity of TF-IDF vectors, for single messages and for whole threads.
+
+Every message is a document, with ids handed out like in search_index.py (channel by channel, in
+message order, so a channel is a contiguous id range). Every thread (a parent and its replies, or a
+message without replies) is a document of a second, thread-level matrix made of the summed term
+counts of its messages. Weights are sublinear tf (1 + log count) times smoothed idf, and rows are
+L2-normalized, so the dot product of two rows is their cosine similarity.
+
+The matrices are sparse, in CSR layout (row r's terms and weights are indices/data[indptr[r]:indptr[r + 1]])
+and built with vectorized NumPy from one flat array of term ids, no SciPy needed. A transposed (CSC)
+copy lists the documents containing each term, so a query only touches the postings of its own terms.
+
+Building takes a pass tokenizing every message, so the arrays are saved to the export's cache folder
+per export version (see workspace_registry.export_version) and loaded from there on later runs.
+"""
+import os
+from array import array
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from data_loader import WorkspaceData
+from search_index import SearchHit, tokenize
+from workspace_cache import default_cache_dir
+
+# Bump when the saved arrays change meaning, older files are then rebuilt
+SIMILARITY_FORMAT_VERSION = 1
+
+# A query reads at most this many postings: its terms are taken by weight, and the lowest-weighted
+# (most common, so least telling) terms that would go over are left out. Bounds the cost of a query
+MAX_QUERY_POSTINGS = 1_000_000
+
+# Saved indexes kept per export, most recently used first: the registry can hold several versions of a
+# workspace at once (e.g. a session still on the export from before a refresh)
+KEEP_SIMILARITY_VERSIONS = 3
+
+@dataclass
+class SparseMatrix:
+    """TF-IDF rows in CSR layout, plus the transposed layout used for scoring"""
+    indptr: np.ndarray  # int64, n_rows + 1
+    indices: np.ndarray  # int32 term ids, sorted within each row
+    data: np.ndarray  # float32 weights
+    term_indptr: np.ndarray  # int64, n_terms + 1
+    term_rows: np.ndarray  # int32 row ids of each term, ascending
+    term_data: np.ndarray  # float32 weights, aligned with term_rows
+
+    @classmethod
+    def from_counts(cls, rows: np.ndarray, terms: np.ndarray, counts: np.ndarray, n_rows: int, n_terms: int) -> "SparseMatrix":
+        """Weighted, normalized matrix from (row, term, count) triples sorted by row, then term"""
+        doc_freq = np.bincount(terms, minlength=n_terms)
+        idf = np.log((1 + n_rows) / (1 + doc_freq)) + 1
+        weights = (1 + np.log(counts)) * idf[terms]
+        norms = np.sqrt(np.bincount(rows, weights=weights ** 2, minlength=n_rows))
+        data = (weights / np.where(norms > 0, norms, 1)[rows]).astype(np.float32)
+
+        indptr = np.zeros(n_rows + 1, np.int64)
+        np.cumsum(np.bincount(rows, minlength=n_rows), out=indptr[1:])
+        term_indptr = np.zeros(n_terms + 1, np.int64)
+        np.cumsum(doc_freq, out=term_indptr[1:])
+        by_term = np.argsort(terms, kind="stable")  # Stable: rows stay ascending within a term
+        return cls(
+            indptr=indptr,
+            indices=terms.astype(np.int32),
+            data=data,
+            term_indptr=term_indptr,
+            term_rows=rows[by_term].astype(np.int32),
+            term_data=data[by_term]
+        )
+
+    @property
+    def n_rows(self) -> int:
+        return len(self.indptr) - 1
+
+    def row(self, r: int) -> Tuple[np.ndarray, np.ndarray]:
+        start, end = self.indptr[r], self.indptr[r + 1]
+        return self.indices[start:end], self.data[start:end]
+
+    def scores(self, terms: np.ndarray, weights: np.ndarray) -> np.ndarray:
+        """Dot product of every row with a sparse query vector (see MAX_QUERY_POSTINGS)"""
+        by_weight = np.argsort(-weights, kind="stable")
+        terms, weights = terms[by_weight], weights[by_weight]
+        starts, ends = self.term_indptr[terms], self.term_indptr[terms + 1]
+        keep = max(int(np.searchsorted(np.cumsum(ends - starts), MAX_QUERY_POSTINGS, side="right")), 1)
+        terms, weights, starts, ends = terms[:keep], weights[:keep], starts[:keep], ends[:keep]
+        if not len(terms) or starts.sum() == ends.sum():
+            return np.zeros(self.n_rows)
+        rows = np.concatenate([self.term_rows[start:end] for start, end in zip(starts, ends)])
+        contributions = np.concatenate([
+            self.term_data[start:end] * weight for start, end, weight in zip(starts, ends, weights)
+        ])
+        return np.bincount(rows, weights=contributions, minlength=self.n_rows)
+
+    def arrays(self, prefix: str) -> Dict[str, np.ndarray]:
+        return {f"{prefix}_{name}": value for name, value in vars(self).items()}
+
+    @classmethod
+    def from_arrays(cls, arrays, prefix: str) -> "SparseMatrix":
+        return cls(**{name: arrays[f"{prefix}_{name}"] for name in cls.__dataclass_fields__})
+
+def top_rows(scores: np.ndarray, exclude: int, limit: int) -> List[Tuple[int, float]]:
+    """(row, score) of the best-scoring rows other than exclude, best first, zero scores left out"""
+    scores[exclude] = 0
+    if limit < len(scores):
+        candidates = np.argpartition(scores, -limit)[-limit:]
+    else:
+        candidates = np.arange(len(scores))
+    candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+    return [(int(r), float(scores[r])) for r in candidates if scores[r] > 0]
+
+class SimilarityIndex:
+    def __init__(self, messages: SparseMatrix, threads: SparseMatrix, arrays: Dict[str, np.ndarray]):
+        self.messages = messages
+        self.threads = threads
+        self.doc_ts = arrays["doc_ts"]
+        self.doc_thread = arrays["doc_thread"]  # thread id of each message
+        self.thread_ts = arrays["thread_ts"]
+        self.thread_first_doc = arrays["thread_first_doc"]  # the parent, or the earliest reply we have
+        self.thread_sizes = arrays["thread_sizes"]
+        self.channel_ids: List[str] = [str(cid) for cid in arrays["channel_ids"]]
+        self.channel_starts = arrays["channel_starts"]  # first document id of each channel, plus the total
+        self._channel_numbers = {cid: i for i, cid in enumerate(self.channel_ids)}
+
+    @classmethod
+    def build(cls, workspace: WorkspaceData) -> "SimilarityIndex":
+        vocabulary: Dict[str, int] = {}
+        term_ids, lengths = array("I"), array("I")
+        doc_ts, doc_thread = array("d"), array("I")
+        thread_numbers: Dict[Tuple[int, float], int] = {}
+        thread_ts, thread_first_doc = array("d"), array("I")
+        channel_ids, channel_starts = [], array("q")
+        for channel_number, (channel_id, messages) in enumerate(workspace.messages.items()):
+            channel_ids.append(channel_id)
+            channel_starts.append(len(doc_ts))
+            for msg in messages:
+                tokens = tokenize(msg.text)
+                term_ids.extend([vocabulary.setdefault(token, len(vocabulary)) for token in tokens])
+                lengths.append(len(tokens))
+                key = (channel_number, msg.thread_ts or msg.ts)
+                thread = thread_numbers.get(key)
+                if thread is None:
+                    thread = thread_numbers[key] = len(thread_ts)
+                    thread_ts.append(key[1])
+                    thread_first_doc.append(len(doc_ts))
+                doc_thread.append(thread)
+                doc_ts.append(msg.ts)
+        channel_starts.append(len(doc_ts))
+
+        n_docs, n_threads, n_terms = len(doc_ts), len(thread_ts), max(len(vocabulary), 1)
+        doc_thread = np.frombuffer(doc_thread, dtype=np.uint32).astype(np.int64)
+        # One (document, term) key per token; unique keys come out sorted by document, then term
+        keys = np.repeat(np.arange(n_docs, dtype=np.int64), np.frombuffer(lengths, dtype=np.uint32)) * n_terms
+        keys += np.frombuffer(term_ids, dtype=np.uint32)
+        keys, counts = np.unique(keys, return_counts=True)
+        rows, terms = np.divmod(keys, n_terms)
+        message_matrix = SparseMatrix.from_counts(rows, terms, counts, n_docs, n_terms)
+
+        # Threads: the same counts, summed per (thread, term)
+        thread_keys, inverse = np.unique(doc_thread[rows] * n_terms + terms, return_inverse=True)
+        thread_counts = np.bincount(inverse, weights=counts)
+        thread_rows, thread_terms = np.divmod(thread_keys, n_terms)
+        thread_matrix = SparseMatrix.from_counts(thread_rows, thread_terms, thread_counts, n_threads, n_terms)
+
+        return cls(message_matrix, thread_matrix, {
+            "doc_ts": np.frombuffer(doc_ts, dtype=np.float64),
+            "doc_thread": doc_thread.astype(np.int32),
+            "thread_ts": np.frombuffer(thread_ts, dtype=np.float64),
+            "thread_first_doc": np.frombuffer(thread_first_doc, dtype=np.uint32).astype(np.int32),
+            "thread_sizes": np.bincount(doc_thread, minlength=n_threads).astype(np.int32),
+            "channel_ids": np.array(channel_ids, dtype=str),
+            "channel_starts": np.frombuffer(channel_starts, dtype=np.int64),
+        })
+
+    def save(self, path: Union[str, Path]) -> None:
+        path = Path(path)
+        arrays = {
+            "format": np.array(SIMILARITY_FORMAT_VERSION),
+            "doc_ts": self.doc_ts,
+            "doc_thread": self.doc_thread,
+            "thread_ts": self.thread_ts,
+            "thread_first_doc": self.thread_first_doc,
+            "thread_sizes": self.thread_sizes,
+            "channel_ids": np.array(self.channel_ids, dtype=str),
+            "channel_starts": self.channel_starts,
+            **self.messages.arrays("messages"),
+            **self.threads.arrays("threads"),
+        }
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write to a temp file first so a crash never leaves a half-written index behind
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> Optional["SimilarityIndex"]:
+        """The saved index, or None if it's missing, unreadable or from another format version"""
+        try:
+            with np.load(path, allow_pickle=False) as saved:
+                if int(saved["format"]) != SIMILARITY_FORMAT_VERSION:
+                    return None
+                arrays = {name: saved[name] for name in saved.files}
+        except FileNotFoundError:
+            return None
+        except Exception as e:  # Corrupt/partial file, just rebuild
+            print(f"Ignoring unreadable similarity index {path}: {e}")
+            return None
+        return cls(SparseMatrix.from_arrays(arrays, "messages"), SparseMatrix.from_arrays(arrays, "threads"), arrays)
+
+    def doc_id(self, channel_id: str, ts: float) -> Optional[int]:
+        """Document id of a message, None if it isn't indexed"""
+        channel_number = self._channel_numbers.get(channel_id)
+        if channel_number is None:
+            return None
+        start, end = self.channel_starts[channel_number], self.channel_starts[channel_number + 1]
+        doc_id = start + int(np.searchsorted(self.doc_ts[start:end], ts))
+        return doc_id if doc_id < end and self.doc_ts[doc_id] == ts else None
+
+    def _hit(self, doc_id: int, ts: float, score: float) -> SearchHit:
+        channel_number = int(np.searchsorted(self.channel_starts, doc_id, side="right")) - 1
+        return SearchHit(
+            channel_id=self.channel_ids[channel_number],
+            position=doc_id - int(self.channel_starts[channel_number]),
+            ts=ts,
+            score=score
+        )
+
+    def similar_messages(self, doc_id: int, limit: int = 10) -> List[SearchHit]:
+        """Other messages most similar to this one"""
+        scores = self.messages.scores(*self.messages.row(doc_id))
+        return [self._hit(other, float(self.doc_ts[other]), score) for other, score in top_rows(scores, doc_id, limit)]
+
+    def similar_threads(self, doc_id: int, limit: int = 10) -> List[SearchHit]:
+        """
+        Other threads most similar to this message's thread, as hits on their first message
+        (ts is the thread's ts)
+        """
+        thread = int(self.doc_thread[doc_id])
+        scores = self.threads.scores(*self.threads.row(thread))
+        return [
+            self._hit(int(self.thread_first_doc[other]), float(self.thread_ts[other]), score)
+            for other, score in top_rows(scores, thread, limit)
+        ]
+
+def similarity_cache_path(export_path: Union[str, Path], version: str) -> Path:
+    """Where the index of one version of an export is saved"""
+    return default_cache_dir(export_path) / f"similarity-{version}.npz"
+
+def _prune_saved_indexes(cache_dir: Path) -> None:
+    """Delete all but the KEEP_SIMILARITY_VERSIONS most recently used saved indexes (by mtime)"""
+    saved = []
+    for path in cache_dir.glob("similarity-*.npz"):
+        try:
+            saved.append((path.stat().st_mtime_ns, path))
+        except FileNotFoundError:  # Pruned by another session meanwhile
+            pass
+    for _, path in sorted(saved, reverse=True)[KEEP_SIMILARITY_VERSIONS:]:
+        path.unlink(missing_ok=True)
+
+def get_similarity_index(workspace: WorkspaceData, cache_path: Optional[Path] = None) -> SimilarityIndex:
+    """
+    The workspace's similarity index: loaded from cache_path if it's there, otherwise built on first
+    use and saved to cache_path. Loading marks the file as used, saving prunes the least recently used
+    versions beyond KEEP_SIMILARITY_VERSIONS
+    """
+    if workspace.similarity is None:
+        index = SimilarityIndex.load(cache_path) if cache_path else None
+        if index is None:
+            index = SimilarityIndex.build(workspace)
+            if cache_path:
+                try:
+                    index.save(cache_path)
+                    _prune_saved_indexes(cache_path.parent)
+                except OSError as e:  # e.g. read-only export directory, the file is only an optimization
+                    print(f"Could not write similarity index {cache_path}: {e}")
+        else:
+            try:
+                os.utime(cache_path)  # Keeps versions that are still in use from being pruned
+            except OSError:
+                pass
+        workspace.similarity = index
+    return workspace.similarity
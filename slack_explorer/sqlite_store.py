@@ -0,0 +1,410 @@
+"""
+SQLite storage backend for the explorer.
+
+`import_export` copies an export into a SQLite database (users, channels and messages in indexed
+tables plus an FTS5 table over message text). Imports are incremental: day files are tracked by
+size/mtime and only new or changed files are (re)imported.
+
+`open_sqlite_workspace` returns a regular `WorkspaceData` whose messages and search index are backed
+by the database, so only users, channels and the page currently on screen live in the Streamlit
+process no matter how big the export is.
+"""
+import json
+import sqlite3
+import threading
+from array import array
+from collections.abc import Mapping, Sequence
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Union
+
+from data_loader import (
+    Channel, LoadProgress, Message, User, WorkspaceData,
+    existing_channel_dirs, list_day_files, load_channels, load_day_file, load_users, open_export,
+)
+from workspace_cache import default_cache_dir
+from search_index import SearchHit
+
+if TYPE_CHECKING:
+    from search_query import QueryPlan
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id TEXT PRIMARY KEY,
+    user_name TEXT NOT NULL,
+    real_name TEXT,
+    avatar_url TEXT,
+    avatar_hash TEXT
+);
+CREATE TABLE IF NOT EXISTS channels (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    is_private INTEGER NOT NULL,
+    created REAL NOT NULL,
+    members TEXT NOT NULL,  -- JSON list of user ids
+    creator TEXT,
+    is_archived INTEGER,
+    type TEXT NOT NULL,
+    display_name TEXT
+);
+-- One row per imported day file, used to detect new/changed/removed files on re-import
+CREATE TABLE IF NOT EXISTS day_files (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,  -- relative to the export root, e.g. "general/2024-01-03.json"
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY,
+    channel_id TEXT NOT NULL,
+    file_id INTEGER NOT NULL REFERENCES day_files(id),
+    ts REAL NOT NULL,
+    thread_ts REAL,
+    sort_ts REAL NOT NULL,  -- thread_ts for replies, ts otherwise: ORDER BY sort_ts, ts gives thread order
+    user TEXT,
+    text TEXT NOT NULL,
+    attachments TEXT,  -- JSON list of Slack file objects, NULL if none
+    is_orphan INTEGER NOT NULL DEFAULT 0  -- reply whose parent isn't in the channel, see FLAG_ORPHANS
+);
+CREATE INDEX IF NOT EXISTS messages_channel_ts ON messages(channel_id, ts);
+CREATE INDEX IF NOT EXISTS messages_file ON messages(file_id);
+CREATE INDEX IF NOT EXISTS messages_user_ts ON messages(user, ts);
+CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(text, content='messages', content_rowid='id');
+CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages BEGIN
+    INSERT INTO messages_fts(rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER DELETE ON messages BEGIN
+    INSERT INTO messages_fts(messages_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+"""
+
+MESSAGE_COLUMNS = "user, text, ts, attachments, thread_ts"
+
+# Replies whose parent (a top-level message with that ts) isn't in the channel are left out of thread
+# order, like thread_index.ThreadIndex does. Recomputed per channel whenever its day files change
+FLAG_ORPHANS = """
+UPDATE messages SET is_orphan = (
+    thread_ts IS NOT NULL AND thread_ts != ts AND NOT EXISTS (
+        SELECT 1 FROM messages parent
+        WHERE parent.channel_id = messages.channel_id AND parent.ts = messages.thread_ts
+            AND (parent.thread_ts IS NULL OR parent.thread_ts = parent.ts)
+    )
+)
+"""
+
+def default_db_path(export_path: Union[str, Path]) -> Path:
+    """Default database location, next to the parsed-data cache"""
+    return default_cache_dir(export_path) / "workspace.sqlite3"
+
+def connect(db_path: Union[str, Path]) -> sqlite3.Connection:
+    conn = sqlite3.connect(str(db_path))
+    conn.execute("PRAGMA journal_mode=WAL")  # Readers (Streamlit sessions) don't block a running import
+    conn.execute("PRAGMA synchronous=NORMAL")  # Safe with WAL, much faster bulk imports
+    conn.executescript(SCHEMA)
+    if "is_orphan" not in {row[1] for row in conn.execute("PRAGMA table_info(messages)")}:
+        with conn:  # Imported before orphan replies were flagged
+            conn.execute("ALTER TABLE messages ADD COLUMN is_orphan INTEGER NOT NULL DEFAULT 0")
+            conn.execute(FLAG_ORPHANS)
+    # Created here rather than in SCHEMA, older databases only have is_orphan after the ALTER above
+    conn.execute("CREATE INDEX IF NOT EXISTS messages_channel_thread ON messages(channel_id, is_orphan, sort_ts, ts)")
+    return conn
+
+def _row_to_message(row: tuple) -> Message:
+    user, text, ts, attachments, thread_ts = row
+    return Message(
+        user=user,
+        text=text,
+        ts=ts,
+        attachments=json.loads(attachments) if attachments else [],
+        thread_ts=thread_ts
+    )
+
+def import_export(
+    export_path: Union[str, Path],
+    db_path: Union[str, Path],
+    progress: Optional[LoadProgress] = None
+) -> Dict[str, int]:
+    """
+    Import (or incrementally update) the database from an export directory or .zip archive.
+    Returns counts of parsed, unchanged and removed day files.
+
+    progress, if given, is updated per day file and can cancel the import; channels imported before
+    the cancel stay in the database, so the next import picks up where it stopped.
+    """
+    export_dir = open_export(str(export_path))
+    Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+    conn = connect(db_path)
+    stats = {"files_imported": 0, "files_unchanged": 0, "files_removed": 0}
+
+    try:
+        # Users and channels are small, simply replace them on every import
+        users = load_users(export_dir)
+        channels = load_channels(export_dir, users)
+        with conn:
+            conn.execute("DELETE FROM users")
+            conn.executemany(
+                "INSERT INTO users VALUES (?, ?, ?, ?, ?)",
+                [(u.id, u.user_name, u.real_name, u.avatar_url, u.avatar_hash) for u in users.values()]
+            )
+            conn.execute("DELETE FROM channels")
+            conn.executemany(
+                "INSERT INTO channels VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (c.id, c.name, int(c.is_private), c.created.timestamp(), json.dumps(sorted(c.members)),
+                     c.creator, None if c.is_archived is None else int(c.is_archived), c.type, c.display_name)
+                    for c in channels.values()
+                ]
+            )
+
+        known_files = {
+            path: (file_id, size, mtime_ns)
+            for file_id, path, size, mtime_ns in conn.execute("SELECT id, path, size, mtime_ns FROM day_files")
+        }
+        seen_paths = set()
+        channel_dirs = existing_channel_dirs(export_dir, channels, users)
+        if progress:
+            progress.start(users, channels, channel_dirs, browsable=False)
+
+        for channel_id, channel_dir in channel_dirs.items():
+            # One transaction per channel keeps an interrupted import consistent and resumable
+            with conn:
+                channel_changed = False
+                for msg_file in list_day_files(channel_dir):
+                    rel_path = f"{channel_dir.name}/{msg_file.name}"
+                    seen_paths.add(rel_path)
+                    stat = msg_file.stat()
+
+                    known = known_files.get(rel_path)
+                    if known and known[1:] == (stat.st_size, stat.st_mtime_ns):
+                        stats["files_unchanged"] += 1
+                        continue
+
+                    if known:
+                        file_id = known[0]
+                        conn.execute("DELETE FROM messages WHERE file_id = ?", (file_id,))
+                        conn.execute(
+                            "UPDATE day_files SET size = ?, mtime_ns = ? WHERE id = ?",
+                            (stat.st_size, stat.st_mtime_ns, file_id)
+                        )
+                    else:
+                        file_id = conn.execute(
+                            "INSERT INTO day_files (path, size, mtime_ns) VALUES (?, ?, ?)",
+                            (rel_path, stat.st_size, stat.st_mtime_ns)
+                        ).lastrowid
+
+                    rows = [
+                        (channel_id, file_id, m.ts, m.thread_ts, m.thread_ts or m.ts, m.user, m.text,
+                         json.dumps(m.attachments) if m.attachments else None)
+                        for m in load_day_file(msg_file)
+                    ]
+                    conn.executemany(
+                        "INSERT INTO messages (channel_id, file_id, ts, thread_ts, sort_ts, user, text, attachments) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        rows
+                    )
+                    stats["files_imported"] += 1
+                    channel_changed = True
+                    if progress:  # A cancel here rolls back this channel's transaction
+                        progress.file_done(channel_id, len(rows))
+                if channel_changed:
+                    conn.execute(f"{FLAG_ORPHANS} WHERE channel_id = ?", (channel_id,))
+            if progress:
+                progress.channel_done(channel_id, cached=True)  # The rest of its files were unchanged
+
+        # Day files (or whole channels) that disappeared from the export
+        with conn:
+            for rel_path, (file_id, _, _) in known_files.items():
+                if rel_path not in seen_paths:
+                    conn.execute("DELETE FROM messages WHERE file_id = ?", (file_id,))
+                    conn.execute("DELETE FROM day_files WHERE id = ?", (file_id,))
+                    stats["files_removed"] += 1
+            if stats["files_removed"]:  # Rare, re-flag everything rather than track the channels
+                conn.execute(FLAG_ORPHANS)
+    finally:
+        conn.close()
+
+    return stats
+
+class SqliteStore:
+    """Hands out one connection per thread (Streamlit runs every session in its own thread)"""
+
+    def __init__(self, db_path: Union[str, Path]):
+        self.db_path = str(db_path)
+        self._local = threading.local()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if not hasattr(self._local, "conn"):
+            self._local.conn = sqlite3.connect(self.db_path)
+        return self._local.conn
+
+    def execute(self, sql: str, params: Iterable = ()) -> sqlite3.Cursor:
+        return self.conn.execute(sql, tuple(params))
+
+class SqliteChannelMessages(Sequence):
+    """A channel's messages in ts order, read from the database on demand (slices use LIMIT/OFFSET)"""
+
+    def __init__(self, store: SqliteStore, channel_id: str, count: int, orphan_count: int = 0):
+        self.store = store
+        self.channel_id = channel_id
+        self._count = count
+        self.orphan_count = orphan_count  # replies left out of thread order, like ThreadIndex.orphans
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _query(self, offset: int, limit: int, order_by: str = "ts", where: str = "") -> List[Message]:
+        rows = self.store.execute(
+            f"SELECT {MESSAGE_COLUMNS} FROM messages WHERE channel_id = ?{where} ORDER BY {order_by} LIMIT ? OFFSET ?",
+            (self.channel_id, limit, offset)
+        )
+        return [_row_to_message(row) for row in rows]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._count)
+            if step != 1:
+                raise ValueError("Stepped slices are not supported")
+            return self._query(start, max(0, stop - start))
+
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+        return self._query(index, 1)[0]
+
+    def __iter__(self) -> Iterator[Message]:
+        rows = self.store.execute(
+            f"SELECT {MESSAGE_COLUMNS} FROM messages WHERE channel_id = ? ORDER BY ts", (self.channel_id,)
+        )
+        return (_row_to_message(row) for row in rows)
+
+    def thread_page(self, offset: int, limit: int, newest_first: bool = False) -> List[Message]:
+        """
+        Messages in thread order (each parent followed by its replies, orphan replies left out), optionally
+        newest thread first
+        """
+        order_by = "sort_ts DESC, ts" if newest_first else "sort_ts, ts"
+        return self._query(offset, limit, order_by=order_by, where=" AND is_orphan = 0")
+
+    def offset_for(self, ts: float, newest_first: bool = False) -> int:
+        """Same as ThreadIndex.offset_for, counted on the (channel_id, is_orphan, sort_ts, ts) index"""
+        comparison = ">" if newest_first else "<"
+        (count,) = self.store.execute(
+            f"SELECT COUNT(*) FROM messages WHERE channel_id = ? AND is_orphan = 0 AND sort_ts {comparison} ?",
+            (self.channel_id, ts)
+        ).fetchone()
+        return count
+
+    def timestamps(self) -> array:
+        """All message timestamps in ts order, read from the (channel_id, ts) index"""
+        rows = self.store.execute("SELECT ts FROM messages WHERE channel_id = ? ORDER BY ts", (self.channel_id,))
+        return array("d", (ts for (ts,) in rows))
+
+    def get_by_ts(self, timestamps: Iterable[float]) -> Dict[float, Message]:
+        """Look up specific messages (e.g. the parents of the replies on a page)"""
+        timestamps = list(timestamps)
+        if not timestamps:
+            return {}
+        rows = self.store.execute(
+            f"SELECT {MESSAGE_COLUMNS} FROM messages "
+            f"WHERE channel_id = ? AND ts IN ({', '.join('?' * len(timestamps))})",
+            [self.channel_id, *timestamps]
+        )
+        return {msg.ts: msg for msg in map(_row_to_message, rows)}
+
+class SqliteMessages(Mapping):
+    """channel_id -> SqliteChannelMessages, for channels that have at least one message"""
+
+    def __init__(self, store: SqliteStore):
+        self.store = store
+        self._counts = {}
+        self._orphan_counts = {}
+        self.last_ts: Dict[str, float] = {}  # channel_id -> newest message ts
+        rows = store.execute("SELECT channel_id, COUNT(*), SUM(is_orphan), MAX(ts) FROM messages GROUP BY channel_id")
+        for channel_id, count, orphan_count, last_ts in rows:
+            self._counts[channel_id] = count
+            self._orphan_counts[channel_id] = orphan_count
+            self.last_ts[channel_id] = last_ts
+
+    def __getitem__(self, channel_id: str) -> SqliteChannelMessages:
+        if channel_id not in self._counts:
+            raise KeyError(channel_id)
+        return SqliteChannelMessages(self.store, channel_id, self._counts[channel_id], self._orphan_counts[channel_id])
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._counts)
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+class SqliteSearchIndex:
+    """FTS5-backed stand-in for search_index.MessageIndex, queried by search_query.search_messages"""
+
+    def __init__(self, store: SqliteStore):
+        self.store = store
+
+    def search_plan(self, plan: "QueryPlan", limit: int = 50) -> List[SearchHit]:
+        """Run a search_query.QueryPlan: its filters become WHERE clauses next to the FTS5 match"""
+        where, params = [], []
+        for column, ids in (("m.channel_id", plan.channel_ids), ("m.user", plan.user_ids)):
+            if ids is not None:
+                where.append(f"{column} IN ({', '.join('?' * len(ids))})")
+                params.extend(ids)
+        if plan.start_ts is not None:
+            where.append("m.ts >= ?")
+            params.append(plan.start_ts)
+        if plan.end_ts is not None:
+            where.append("m.ts < ?")
+            params.append(plan.end_ts)
+        if plan.has_file:
+            where.append("m.attachments IS NOT NULL")
+
+        # Quoted terms are literal, a quoted multi-word string is an FTS5 phrase
+        fts_parts = [f'"{term}"' for term in plan.terms] + [f'"{" ".join(phrase)}"' for phrase in plan.phrases]
+        if fts_parts:
+            sql = ("SELECT m.channel_id, m.ts, bm25(messages_fts) AS rank, m.text "
+                   "FROM messages_fts JOIN messages m ON m.id = messages_fts.rowid "
+                   f"WHERE {' AND '.join(['messages_fts MATCH ?', *where])} ORDER BY rank LIMIT ?")
+            params = [" ".join(fts_parts), *params]
+        elif where:  # Filters only: newest first
+            sql = (f"SELECT m.channel_id, m.ts, 0, m.text FROM messages m "
+                   f"WHERE {' AND '.join(where)} ORDER BY m.ts DESC LIMIT ?")
+        else:
+            return []
+        rows = self.store.execute(sql, [*params, limit])
+        return [
+            SearchHit(channel_id=channel_id, position=None, ts=ts, score=-rank, text=text)
+            for channel_id, ts, rank, text in rows
+        ]
+
+def open_sqlite_workspace(db_path: Union[str, Path]) -> WorkspaceData:
+    """WorkspaceData view of an imported database, messages stay on disk"""
+    connect(db_path).close()  # Adds what databases imported by older versions lack (is_orphan)
+    store = SqliteStore(db_path)
+
+    users = {
+        row[0]: User(id=row[0], user_name=row[1], real_name=row[2], avatar_url=row[3], avatar_hash=row[4])
+        for row in store.execute("SELECT id, user_name, real_name, avatar_url, avatar_hash FROM users")
+    }
+    channels = {}
+    for (channel_id, name, is_private, created, members, creator, is_archived,
+         channel_type, display_name) in store.execute("SELECT * FROM channels"):
+        channels[channel_id] = Channel(
+            id=channel_id,
+            name=name,
+            is_private=bool(is_private),
+            created=datetime.fromtimestamp(created),
+            members=set(json.loads(members)),
+            creator=creator,
+            is_archived=None if is_archived is None else bool(is_archived),
+            type=channel_type,
+            display_name=display_name
+        )
+
+    return WorkspaceData(
+        users=users,
+        channels=channels,
+        messages=SqliteMessages(store),
+        search_index=SqliteSearchIndex(store)
+    )
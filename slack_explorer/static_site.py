@@ -0,0 +1,399 @@
+"""
+Static HTML site for an export: every conversation pre-rendered into paginated HTML pages, plus a
+client-side search page. Open `index.html` in a browser, no server (or Streamlit) needed.
+
+Pages are rendered the same way the explorer shows a conversation: threads grouped with
+`thread_index.ThreadIndex` (each top-level message followed by its replies, oldest first), author,
+timestamp and mentions resolved by `render_cache.RenderCache`. Conversations are rendered in parallel
+on a process pool.
+
+Search works offline too: each conversation gets a search shard (an inverted index of its words,
+tokenized like search_index.py, plus a snippet per message) written as a .js file, since browsers
+don't let file:// pages fetch JSON. search.html loads the shards and intersects the word lists.
+
+Re-runs only rebuild conversations whose fingerprint changed: their day files (or message content for
+columnar loads), the user names, the page size and the site format version, recorded in
+`.site_manifest.json` in the output directory.
+
+Usage:
+    python static_site.py ../exported site/
+    python static_site.py ../exported.zip site/ --workers 8 --page-size 200
+    python static_site.py ../exported site/ --force      # rebuild everything
+"""
+import argparse
+import hashlib
+import html
+import json
+import os
+import shutil
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Tuple
+
+from columnar_store import ChannelColumns
+from data_loader import (
+    Channel, Message, User, WorkspaceData, load_workspace_data, messages_from_columns, messages_to_columns,
+)
+from render_cache import RenderCache, format_timestamp
+from search_index import tokenize
+from thread_index import ThreadIndex
+from workspace_cache import default_cache_path
+
+# Bump when the page layout or search shard format changes: every conversation is rebuilt
+SITE_FORMAT_VERSION = 1
+
+DEFAULT_PAGE_SIZE = 200
+MANIFEST_NAME = ".site_manifest.json"
+# Search results show this much of a message
+SNIPPET_CHARS = 200
+
+STYLE = """
+body { font-family: -apple-system, BlinkMacSystemFont, "Segoe UI", sans-serif; max-width: 900px; margin: 2em auto; padding: 0 1em; color: #1d1c1d; }
+a { color: #1264a3; text-decoration: none; }
+a:hover { text-decoration: underline; }
+nav { margin: 1em 0; color: #616061; }
+nav a, nav span { margin-right: 0.6em; }
+.msg { padding: 0.5em 0; border-bottom: 1px solid #eee; }
+.msg.reply { margin-left: 2em; border-left: 3px solid #ddd; padding-left: 0.8em; }
+.msg:target { background: #fff8c5; }
+.meta { color: #616061; font-size: 0.9em; }
+.author { font-weight: bold; color: #1d1c1d; }
+.text { white-space: pre-wrap; margin-top: 0.2em; }
+.files { font-size: 0.9em; color: #616061; }
+h2 { margin-top: 1.5em; }
+li { margin: 0.2em 0; }
+#query { width: 100%; font-size: 1.1em; padding: 0.4em; }
+.hit { padding: 0.5em 0; border-bottom: 1px solid #eee; }
+"""
+
+SEARCH_JS = """
+// Offline search over the per-conversation shards in search/ (see static_site.py)
+window.SEARCH_SHARDS = [];
+function tokenize(text) { return text.toLowerCase().match(/[\\p{L}\\p{N}_]+/gu) || []; }
+function loadShards(done) {
+  let pending = SEARCH_CONVERSATIONS.length;
+  if (!pending) done();
+  for (const conversation of SEARCH_CONVERSATIONS) {
+    const script = document.createElement("script");
+    script.src = "search/" + conversation.id + ".js";
+    script.onload = script.onerror = () => { if (--pending === 0) done(); };
+    document.head.appendChild(script);
+  }
+}
+function search(query, limit) {
+  const terms = [...new Set(tokenize(query))];
+  const hits = [];
+  if (!terms.length) return hits;
+  for (const shard of SEARCH_SHARDS) {
+    const postings = terms.map(term => shard.terms[term] || []).sort((a, b) => a.length - b.length);
+    let docs = postings[0];
+    for (const other of postings.slice(1)) {
+      const set = new Set(other);
+      docs = docs.filter(doc => set.has(doc));
+    }
+    for (const doc of docs) hits.push([shard.label, ...shard.docs[doc]]);
+  }
+  hits.sort((a, b) => b[3] - a[3]);  // newest first
+  return hits.slice(0, limit);
+}
+function escapeHtml(text) {
+  return text.replace(/[&<>"]/g, c => ({"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;"}[c]));
+}
+function render() {
+  const query = document.getElementById("query").value;
+  const hits = search(query, 200);
+  document.getElementById("status").textContent = query.trim() ? (hits.length === 200 ? "Top " : "") + hits.length + " results" : "";
+  document.getElementById("results").innerHTML = hits.map(([label, url, author, ts, time, snippet]) =>
+    `<div class="hit"><div class="meta"><a href="${url}">${escapeHtml(label)}</a> · <span class="author">${escapeHtml(author)}</span> · ${time}</div>` +
+    `<div class="text">${escapeHtml(snippet)}</div></div>`).join("");
+}
+document.addEventListener("DOMContentLoaded", () => {
+  const input = document.getElementById("query");
+  document.getElementById("status").textContent = "Loading search index...";
+  loadShards(() => {
+    document.getElementById("status").textContent = "";
+    input.addEventListener("input", render);
+    const initial = new URLSearchParams(location.search).get("q");
+    if (initial) { input.value = initial; render(); }
+  });
+});
+"""
+
+@dataclass
+class ChannelJob:
+    channel_id: str
+    label: str
+    out_dir: str  # site root
+    page_size: int
+    messages: Any  # messages_to_columns() tuple, or a ChannelColumns
+
+def conversation_label(channel: Channel) -> str:
+    if channel.type == "channel":
+        return f"{'🔒 ' if channel.is_private else '#'}{channel.name}"
+    return channel.display_name or ("Unknown User" if channel.type == "dm" else "Group Message")
+
+def users_digest(users: Dict[str, User]) -> str:
+    """Stable (across processes and runs) fingerprint of the user names shown on pages"""
+    names = sorted((uid, user.user_name, user.real_name or "") for uid, user in users.items())
+    return hashlib.sha1(json.dumps(names).encode()).hexdigest()
+
+def messages_digest(messages) -> str:
+    """Content hash, for loads that don't record their day files (columnar)"""
+    digest = hashlib.sha1()
+    if isinstance(messages, ChannelColumns):
+        for part in (messages.ts_us.tobytes(), messages.thread_ts_us.tobytes(), messages.text_buffer,
+                     json.dumps([messages.user_table.ids[i] for i in messages.user_idx.tolist()]).encode(),
+                     json.dumps(sorted(messages.attachments.items()), default=str).encode()):
+            digest.update(part)
+    else:
+        for msg in messages:
+            digest.update(repr((msg.ts, msg.thread_ts, msg.user, msg.text, msg.attachments)).encode())
+    return digest.hexdigest()
+
+def channel_fingerprint(
+    workspace: WorkspaceData,
+    channel_id: str,
+    users_key: str,
+    page_size: int
+) -> str:
+    sources = (workspace.sources or {}).get(channel_id)
+    content = sorted(sources.items()) if sources is not None else messages_digest(workspace.messages[channel_id])
+    channel = workspace.channels[channel_id]
+    key = [SITE_FORMAT_VERSION, page_size, users_key, conversation_label(channel), str(channel.created), content]
+    return hashlib.sha1(json.dumps(key, default=str).encode()).hexdigest()
+
+def message_anchor(ts: float) -> str:
+    return "m" + f"{ts:.6f}".replace(".", "_")
+
+def page_file(page: int) -> str:
+    return f"page-{page}.html"
+
+def html_page(title: str, body: str, root: str, scripts: Tuple[str, ...] = ()) -> str:
+    """A complete HTML document; root is the relative path back to the site root"""
+    script_tags = "".join(f'<script src="{root}{src}"></script>' for src in scripts)
+    return (
+        f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>{html.escape(title)}</title>'
+        f'<link rel="stylesheet" href="{root}style.css">{script_tags}</head><body>{body}</body></html>'
+    )
+
+def page_nav(page: int, page_count: int, root: str) -> str:
+    links = [f'<a href="{root}index.html">← All conversations</a>', f'<a href="{root}search.html">Search</a>']
+    if page_count > 1:
+        if page > 1:
+            links.append(f'<a href="{page_file(1)}">« First</a><a href="{page_file(page - 1)}">‹ Previous</a>')
+        links.append(f"<span>Page {page} of {page_count}</span>")
+        if page < page_count:
+            links.append(f'<a href="{page_file(page + 1)}">Next ›</a><a href="{page_file(page_count)}">Last »</a>')
+    return f"<nav>{''.join(links)}</nav>"
+
+def _attachments_html(msg: Message) -> str:
+    if not msg.attachments:
+        return ""
+    names = ", ".join(html.escape(attachment.get("name", "Unnamed attachment")) for attachment in msg.attachments)
+    return f'<div class="files">📎 {names}</div>'
+
+# Set once per worker process (see _init_worker), so the user table isn't pickled with every job
+_worker_users: Dict[str, User] = {}
+
+def _init_worker(users: Dict[str, User]) -> None:
+    global _worker_users
+    _worker_users = users
+
+def render_channel(job: ChannelJob) -> Tuple[str, int, int]:
+    """Write one conversation's pages and search shard, returns (channel_id, pages, messages shown)"""
+    users = _worker_users
+    messages = messages_from_columns(job.messages) if isinstance(job.messages, tuple) else job.messages
+    thread_index = ThreadIndex.build(messages)
+    order = thread_index.display_order(False)
+    render_cache = RenderCache(0)  # Only lives for this conversation
+
+    channel_dir = Path(job.out_dir) / "c" / job.channel_id
+    shutil.rmtree(channel_dir, ignore_errors=True)  # The page count may have shrunk
+    channel_dir.mkdir(parents=True)
+    root = "../../"
+    page_count = max(1, -(-len(order) // job.page_size))
+    terms: Dict[str, List[int]] = {}
+    docs = []
+    for page in range(1, page_count + 1):
+        parts = [f"<h1>{html.escape(job.label)}</h1>", page_nav(page, page_count, root)]
+        if thread_index.orphans and page == 1:
+            parts.append(f'<p class="meta">{len(thread_index.orphans)} replies to threads that aren\'t in '
+                         f'this export are not shown</p>')
+        for position in order[(page - 1) * job.page_size:page * job.page_size]:
+            msg = messages[position]
+            rendered = render_cache.get(job.channel_id, msg, users)
+            is_reply = bool(msg.thread_ts and msg.thread_ts != msg.ts)
+            note = ""
+            if is_reply:
+                parent = render_cache.get(job.channel_id, messages[thread_index.parents[msg.thread_ts]], users)
+                note = f" · reply to {html.escape(parent.author)}"
+            anchor = message_anchor(msg.ts)
+            parts.append(
+                f'<div class="msg{" reply" if is_reply else ""}" id="{anchor}">'
+                f'<div class="meta"><span class="author">{html.escape(rendered.author)}</span> · '
+                f'<a href="#{anchor}">{rendered.timestamp}</a>{note}</div>'
+                f'<div class="text">{html.escape(rendered.text)}</div>{_attachments_html(msg)}</div>'
+            )
+            doc_id = len(docs)
+            docs.append([f"c/{job.channel_id}/{page_file(page)}#{anchor}", rendered.author, msg.ts,
+                         rendered.timestamp, rendered.text[:SNIPPET_CHARS]])
+            for term in set(tokenize(rendered.text)):
+                terms.setdefault(term, []).append(doc_id)
+        parts.append(page_nav(page, page_count, root))
+        (channel_dir / page_file(page)).write_text(html_page(job.label, "".join(parts), root), encoding="utf-8")
+
+    shard = {"label": job.label, "terms": terms, "docs": docs}
+    search_dir = Path(job.out_dir) / "search"
+    search_dir.mkdir(exist_ok=True)
+    (search_dir / f"{job.channel_id}.js").write_text(
+        f"SEARCH_SHARDS.push({json.dumps(shard, separators=(',', ':'))});", encoding="utf-8"
+    )
+    return job.channel_id, page_count, len(order)
+
+def _run_jobs(jobs: List[ChannelJob], users: Dict[str, User], workers: int) -> Iterator[Tuple[str, int, int]]:
+    if workers <= 1 or len(jobs) <= 1:
+        _init_worker(users)
+        for job in jobs:
+            yield render_channel(job)
+        return
+    # Biggest first so a huge channel doesn't end up as the straggler; at most 2 jobs per worker in
+    # flight, so only a few conversations' messages are pickled and waiting at a time
+    pending = iter(sorted(jobs, key=lambda job: len(job.messages[0]) if isinstance(job.messages, tuple)
+                          else len(job.messages), reverse=True))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(users,)) as executor:
+        running = set()
+        while True:
+            for job in pending:
+                running.add(executor.submit(render_channel, job))
+                if len(running) >= 2 * workers:
+                    break
+            if not running:
+                return
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+def _write_index(out_dir: Path, workspace: WorkspaceData, manifest: Dict[str, Dict]) -> None:
+    sections = {"public": [], "private": [], "dm": [], "mpdm": []}
+    for channel_id, channel in workspace.channels.items():
+        entry = manifest.get(channel_id)
+        if entry is None:
+            continue
+        section = ("private" if channel.is_private else "public") if channel.type == "channel" else channel.type
+        sections[section].append((conversation_label(channel).lower(), channel_id, channel, entry))
+    titles = {"public": "📢 Public Channels", "private": "🔒 Private Channels", "dm": "👤 Direct Messages",
+              "mpdm": "👥 Group Messages"}
+    parts = ['<h1>Slack Export</h1><nav><a href="search.html">Search messages</a></nav>']
+    for section, entries in sections.items():
+        if not entries:
+            continue
+        parts.append(f"<h2>{titles[section]}</h2><ul>")
+        for _, channel_id, channel, entry in sorted(entries, key=lambda item: item[0]):
+            last = f", last active {format_timestamp(entry['last_ts'])}" if entry.get("last_ts") else ""
+            parts.append(
+                f'<li><a href="c/{channel_id}/{page_file(1)}">{html.escape(conversation_label(channel))}</a> '
+                f'<span class="meta">{entry["messages"]} messages{last}</span></li>'
+            )
+        parts.append("</ul>")
+    parts.append(f'<p class="meta">Generated {datetime.now().strftime("%Y-%m-%d %H:%M")}</p>')
+    (out_dir / "index.html").write_text(html_page("Slack Export", "".join(parts), ""), encoding="utf-8")
+
+def _write_search_page(out_dir: Path, manifest: Dict[str, Dict]) -> None:
+    conversations = [{"id": channel_id} for channel_id in manifest]
+    (out_dir / "search").mkdir(exist_ok=True)
+    (out_dir / "search" / "conversations.js").write_text(
+        f"window.SEARCH_CONVERSATIONS = {json.dumps(conversations)};", encoding="utf-8"
+    )
+    (out_dir / "search.js").write_text(SEARCH_JS, encoding="utf-8")
+    body = (
+        '<h1>Search messages</h1><nav><a href="index.html">← All conversations</a></nav>'
+        '<input id="query" placeholder="All words must match..." autofocus>'
+        '<p id="status" class="meta"></p><div id="results"></div>'
+    )
+    (out_dir / "search.html").write_text(
+        html_page("Search", body, "", scripts=("search/conversations.js", "search.js")), encoding="utf-8"
+    )
+
+def build_site(
+    workspace: WorkspaceData,
+    out_dir: str,
+    workers: int = 1,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    force: bool = False
+) -> Dict[str, int]:
+    """
+    Render the workspace into out_dir, skipping conversations that haven't changed since the last
+    build there. Returns counts of rebuilt, unchanged and removed conversations.
+    """
+    out_path = Path(out_dir)
+    out_path.mkdir(parents=True, exist_ok=True)
+    manifest_path = out_path / MANIFEST_NAME
+    try:
+        previous = json.loads(manifest_path.read_text(encoding="utf-8")) if not force else {}
+    except (OSError, ValueError):
+        previous = {}
+
+    users_key = users_digest(workspace.users)
+    manifest, jobs = {}, []
+    for channel_id, messages in workspace.messages.items():
+        fingerprint = channel_fingerprint(workspace, channel_id, users_key, page_size)
+        old = previous.get(channel_id)
+        if old and old["fingerprint"] == fingerprint and (out_path / "c" / channel_id / page_file(1)).exists():
+            manifest[channel_id] = old
+            continue
+        manifest[channel_id] = {"fingerprint": fingerprint, "messages": len(messages), "last_ts": messages[-1].ts}
+        jobs.append(ChannelJob(
+            channel_id=channel_id,
+            label=conversation_label(workspace.channels[channel_id]),
+            out_dir=str(out_path),
+            page_size=page_size,
+            messages=messages if isinstance(messages, ChannelColumns) else messages_to_columns(messages),
+        ))
+
+    for channel_id, pages, _ in _run_jobs(jobs, workspace.users, workers):
+        manifest[channel_id]["pages"] = pages
+
+    # Conversations that are gone from the export (or have no messages anymore)
+    removed = [channel_id for channel_id in previous if channel_id not in manifest]
+    for channel_id in removed:
+        shutil.rmtree(out_path / "c" / channel_id, ignore_errors=True)
+        (out_path / "search" / f"{channel_id}.js").unlink(missing_ok=True)
+
+    (out_path / "style.css").write_text(STYLE, encoding="utf-8")
+    _write_index(out_path, workspace, manifest)
+    _write_search_page(out_path, manifest)
+    # Written last: an interrupted build redoes the conversations it didn't record
+    manifest_path.write_text(json.dumps(manifest), encoding="utf-8")
+    return {"rebuilt": len(jobs), "unchanged": len(manifest) - len(jobs), "removed": len(removed)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("export", help="Export directory or .zip")
+    parser.add_argument("out_dir", help="Where to write the site")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Processes for parsing the export and rendering conversations")
+    parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE, help="Messages per page")
+    parser.add_argument("--no-cache", action="store_true", help="Don't use the explorer's parsed-data cache")
+    parser.add_argument("--columnar", action="store_true", help="Load messages into columnar storage (less memory)")
+    parser.add_argument("--force", action="store_true", help="Rebuild every conversation")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    workspace = load_workspace_data(
+        args.export,
+        cache_path=None if args.no_cache or args.columnar else default_cache_path(args.export),
+        workers=args.workers,
+        columnar=args.columnar
+    )
+    loaded = time.perf_counter()
+    stats = build_site(workspace, args.out_dir, workers=args.workers, page_size=args.page_size, force=args.force)
+    print(f"Loaded {sum(len(m) for m in workspace.messages.values()):,} messages in {loaded - start:.1f}s, "
+          f"rendered {stats['rebuilt']} conversations ({stats['unchanged']} unchanged, {stats['removed']} removed) "
+          f"in {time.perf_counter() - loaded:.1f}s")
+    print(f"Open {Path(args.out_dir).absolute() / 'index.html'}")
+
+if __name__ == "__main__":
+    main()
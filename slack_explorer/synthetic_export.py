@@ -0,0 +1,187 @@
+"""
+Deterministic synthetic Slack exports, for benchmarks and trying the explorer without real data.
+
+The same `SyntheticExportConfig` (seed included) always writes byte-identical files. The export has
+the layout load_workspace_data expects: users.json, groups.json (channels), dms.json and mpims.json,
+plus one folder of day files per conversation. Messages carry the unused Slack fields real exports
+have (blocks, user_profile, ...), so parse times are realistic; a share of them are thread replies,
+mention other users or have files attached, and each channel starts with "joined" system messages.
+
+Usage:
+    python synthetic_export.py out_dir
+    python synthetic_export.py out_dir --users 200 --channels 50 --dms 100 --mpdms 20 --days 90
+"""
+import argparse
+import json
+import random
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, List
+
+START_TS = 1600000000  # 2020-09-13, day files are named by UTC date
+
+WORDS = (
+    "deploy release bug fix meeting review merge branch test prod staging client invoice "
+    "rollback hotfix sprint ticket schedule design budget report customer feedback update"
+).split()
+
+@dataclass
+class SyntheticExportConfig:
+    users: int = 50
+    channels: int = 100
+    dms: int = 0
+    mpdms: int = 0
+    days: int = 60
+    messages_per_day: int = 100  # per conversation and day
+    thread_ratio: float = 0.0  # share of messages that are replies to an earlier message
+    attachment_ratio: float = 0.0  # share of messages with a file attached
+    mention_ratio: float = 0.0  # share of messages mentioning another user
+    seed: int = 0
+
+def _user_record(i: int) -> Dict:
+    return {
+        "id": f"U{i:08d}",
+        "name": f"user{i}",
+        "real_name_normalized": f"User {i}",
+        "image_32": f"https://avatars.example.com/U{i:08d}_32.png",
+        "avatar_hash": f"{i:012x}",
+    }
+
+def _distinct_member_sets(rng: random.Random, user_ids: List[str], count: int, size_range: tuple) -> List[List[str]]:
+    """Up to count different member sets (a DM or MPDM exists once per set of members)"""
+    seen, member_sets = set(), []
+    for _ in range(count * 20):  # Gives up if there are too few users for that many distinct sets
+        if len(member_sets) == count:
+            break
+        size = min(rng.randint(*size_range), len(user_ids))
+        members = tuple(sorted(rng.sample(user_ids, size)))
+        if members not in seen:
+            seen.add(members)
+            member_sets.append(list(members))
+    return member_sets
+
+def _message(rng: random.Random, config: SyntheticExportConfig, user: Dict, ts: str, members: List[str]) -> Dict:
+    text = " ".join(rng.choices(WORDS, k=rng.randint(4, 20)))
+    if len(members) > 1 and rng.random() < config.mention_ratio:
+        text = f"<@{rng.choice([uid for uid in members if uid != user['id']])}> {text}"
+    msg = {
+        "user": user["id"],
+        "type": "message",
+        "ts": ts,
+        "text": text,
+        "client_msg_id": f"{rng.getrandbits(128):032x}",
+        "team": "T00000000",
+        "user_team": "T00000000",
+        "user_profile": {"real_name": user["real_name_normalized"], "name": user["name"]},
+        "blocks": [{"type": "rich_text", "elements": [{"type": "text", "text": text}]}],
+    }
+    if rng.random() < config.attachment_ratio:
+        file_id = f"F{rng.getrandbits(40):010X}"
+        msg["files"] = [{
+            "id": file_id,
+            "name": f"{rng.choice(WORDS)}.pdf",
+            "mimetype": "application/pdf",
+            "size": rng.randrange(1000, 5_000_000),
+            "url_private": f"https://files.example.com/{file_id}/download",
+        }]
+    return msg
+
+def _write_conversation(
+    rng: random.Random,
+    config: SyntheticExportConfig,
+    conversation_dir: Path,
+    members: List[str],
+    users_by_id: Dict[str, Dict]
+) -> None:
+    conversation_dir.mkdir(exist_ok=True)
+    spacing = 86400 / config.messages_per_day if config.messages_per_day else 86400
+    recent_parents: List[Dict] = []  # replies go to one of the last few top-level messages
+    for day in range(config.days):
+        day_start = START_TS + day * 86400
+        day_messages = []
+        if day == 0:
+            for uid in members:
+                day_messages.append({
+                    "user": uid, "type": "message", "subtype": "channel_join",
+                    "ts": f"{day_start}.{len(day_messages):06d}", "text": f"<@{uid}> has joined the channel",
+                })
+        for i in range(config.messages_per_day):
+            # Evenly spread over the day with jitter, unique and increasing within the file
+            ts = f"{day_start + i * spacing + rng.random() * spacing * 0.9 + 1:.6f}"
+            msg = _message(rng, config, users_by_id[rng.choice(members)], ts, members)
+            if recent_parents and rng.random() < config.thread_ratio:
+                parent = rng.choice(recent_parents)
+                parent.setdefault("thread_ts", parent["ts"])
+                parent["reply_count"] = parent.get("reply_count", 0) + 1
+                msg["thread_ts"] = parent["ts"]
+                msg["parent_user_id"] = parent["user"]
+            else:
+                recent_parents = [*recent_parents[-9:], msg]
+            day_messages.append(msg)
+        # Replies can reference a parent of an earlier day, whose file is already written: like
+        # real exports, only the reply then carries the thread_ts
+        with open(conversation_dir / f"{time.strftime('%Y-%m-%d', time.gmtime(day_start))}.json", "w",
+                  encoding="utf-8") as f:
+            json.dump(day_messages, f)
+
+def write_synthetic_export(out_dir: Path, config: SyntheticExportConfig) -> None:
+    """Write the export described by config into out_dir"""
+    rng = random.Random(config.seed)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    users = [_user_record(i) for i in range(max(config.users, 2))]
+    users_by_id = {user["id"]: user for user in users}
+    user_ids = list(users_by_id)
+
+    groups = []
+    for i in range(config.channels):
+        members = sorted(rng.sample(user_ids, rng.randint(min(3, len(user_ids)), min(50, len(user_ids)))))
+        groups.append({
+            "id": f"C{i:08d}", "name": f"channel-{i}", "created": START_TS, "creator": members[0],
+            "is_archived": False, "members": members,
+        })
+    dms = [
+        {"id": f"D{i:08d}", "created": START_TS, "members": members}
+        for i, members in enumerate(_distinct_member_sets(rng, user_ids, config.dms, (2, 2)))
+    ]
+    mpims = []
+    if len(user_ids) >= 3:
+        for i, members in enumerate(_distinct_member_sets(rng, user_ids, config.mpdms, (3, 6))):
+            names = sorted(users_by_id[uid]["name"] for uid in members)
+            mpims.append({
+                "id": f"G{i:08d}", "name": f"mpdm-{'--'.join(names)}-1", "created": START_TS, "members": members,
+            })
+
+    for name, records in (("users.json", users), ("groups.json", groups), ("dms.json", dms), ("mpims.json", mpims)):
+        with open(out_dir / name, "w", encoding="utf-8") as f:
+            json.dump(records, f)
+
+    # Folder names follow data_loader.get_channel_dir
+    for group in groups:
+        _write_conversation(rng, config, out_dir / group["name"], group["members"], users_by_id)
+    for dm in dms:
+        _write_conversation(rng, config, out_dir / dm["id"], dm["members"], users_by_id)
+    for mpim in mpims:
+        _write_conversation(rng, config, out_dir / mpim["name"], mpim["members"], users_by_id)
+
+def add_config_arguments(parser: argparse.ArgumentParser, defaults: SyntheticExportConfig) -> None:
+    """One --option per config field, shared by the benchmark scripts"""
+    for name, value in asdict(defaults).items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=type(value), default=value)
+
+def config_from_arguments(args: argparse.Namespace) -> SyntheticExportConfig:
+    return SyntheticExportConfig(**{name: getattr(args, name) for name in asdict(SyntheticExportConfig())})
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("out_dir")
+    add_config_arguments(parser, SyntheticExportConfig(dms=20, mpdms=5, thread_ratio=0.2,
+                                                       attachment_ratio=0.05, mention_ratio=0.1))
+    args = parser.parse_args()
+    config = config_from_arguments(args)
+    write_synthetic_export(Path(args.out_dir), config)
+    print(f"Wrote {config} to {args.out_dir}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Per-channel thread structure, computed once and reused on every rerun.
+
+Messages are stored sorted by ts, so a single pass is enough to group replies under their parents;
+the result is kept on the workspace (`WorkspaceData.threads`) and holds positions into the channel's
+message sequence rather than the messages themselves.
+"""
+from array import array
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+
+from columnar_store import ChannelColumns
+from data_loader import Message, WorkspaceData
+
+@dataclass
+class ThreadIndex:
+    order: array  # positions in display order: each top-level message followed by its replies
+    order_ts: array  # thread (parent) ts of each entry in order, non-decreasing
+    thread_starts: array  # offsets into order where each thread starts
+    parents: Dict[float, int]  # top-level message ts -> position
+    replies: Dict[float, List[int]] = field(default_factory=dict)  # parent ts -> reply positions, in ts order
+    orphans: List[int] = field(default_factory=list)  # replies whose parent isn't in the export (not displayed)
+    _newest_first: Optional[array] = field(default=None, repr=False)
+
+    @classmethod
+    def build(cls, messages: Sequence[Message]) -> "ThreadIndex":
+        """Build from a ts-sorted message sequence"""
+        if isinstance(messages, ChannelColumns):
+            return cls.from_columns(messages)
+
+        parents = {}
+        thread_replies = {}
+        for position, msg in enumerate(messages):
+            if not msg.thread_ts or msg.thread_ts == msg.ts:
+                parents[msg.ts] = position
+            else:
+                thread_replies.setdefault(msg.thread_ts, []).append(position)
+
+        replies, orphans = {}, []
+        for thread_ts, positions in thread_replies.items():
+            if thread_ts in parents:
+                replies[thread_ts] = positions
+            else:
+                orphans.extend(positions)
+
+        order, order_ts, thread_starts = array("I"), array("d"), array("I")
+        for ts_value, position in parents.items():  # Insertion order is ts order
+            thread = [position, *replies.get(ts_value, ())]
+            thread_starts.append(len(order))
+            order.extend(thread)
+            order_ts.extend([ts_value] * len(thread))
+        return cls(
+            order=order,
+            order_ts=order_ts,
+            thread_starts=thread_starts,
+            parents=parents,
+            replies=replies,
+            orphans=sorted(orphans)
+        )
+
+    @classmethod
+    def from_columns(cls, columns: ChannelColumns) -> "ThreadIndex":
+        """Same structure, computed on the column arrays"""
+        ts = columns.ts_us / 1_000_000
+        is_reply = (columns.thread_ts_us != 0) & (columns.thread_ts_us != columns.ts_us)
+        top_level = (~is_reply).nonzero()[0]
+        parents = dict(zip(ts[top_level].tolist(), top_level.tolist()))
+
+        replies = {}
+        reply_positions = is_reply.nonzero()[0]
+        parent_positions = columns.thread_parent[reply_positions]
+        for position, parent in zip(reply_positions[parent_positions >= 0].tolist(),
+                                    parent_positions[parent_positions >= 0].tolist()):
+            replies.setdefault(float(ts[parent]), []).append(position)
+
+        order = columns.thread_order()
+        group_ts = (columns.thread_ts_us * is_reply + columns.ts_us * ~is_reply)[order] / 1_000_000
+        return cls(
+            order=array("I", order.tolist()),
+            order_ts=array("d", group_ts.tolist()),
+            thread_starts=array("I", (~is_reply[order]).nonzero()[0].tolist()),
+            parents=parents,
+            replies=replies,
+            orphans=reply_positions[parent_positions < 0].tolist()
+        )
+
+    def display_order(self, newest_first: bool = False) -> array:
+        """Display order, optionally with the newest thread first (replies stay oldest first)"""
+        if not newest_first:
+            return self.order
+        if self._newest_first is None:
+            newest_first_order = array("I")
+            ends = [*self.thread_starts[1:], len(self.order)]
+            for start, end in reversed(list(zip(self.thread_starts, ends))):
+                newest_first_order.extend(self.order[start:end])
+            self._newest_first = newest_first_order
+        return self._newest_first
+
+    def offset_for(self, ts: float, newest_first: bool = False) -> int:
+        """
+        Offset in display order of the first thread started at/after ts (oldest first) or at/before ts
+        (newest first), used to jump to a date or a specific thread.
+        """
+        if newest_first:
+            return len(self.order_ts) - bisect_right(self.order_ts, ts)
+        return bisect_left(self.order_ts, ts)
+
+def get_thread_index(workspace: WorkspaceData, channel_id: str) -> ThreadIndex:
+    """The channel's thread index, built on first access"""
+    thread_index = workspace.threads.get(channel_id)
+    if thread_index is None:
+        thread_index = workspace.threads[channel_id] = ThreadIndex.build(workspace.messages.get(channel_id, []))
+    return thread_index
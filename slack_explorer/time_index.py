@@ -0,0 +1,98 @@
+"""
+Per-channel time index: the channel's message timestamps (already in ts order) plus tables of where
+each calendar day and month starts.
+
+Date-range counts are binary searches, the daily and monthly histograms are read straight off the
+day and month tables. Days and months are in local time, like the timestamps shown in the
+conversation view. Built once per channel and kept on the workspace (`WorkspaceData.time_indexes`).
+"""
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta
+from typing import List, Sequence, Tuple
+
+from columnar_store import ChannelColumns
+from data_loader import Message, WorkspaceData
+from sqlite_store import SqliteChannelMessages
+
+def day_bounds(day: date) -> Tuple[float, float]:
+    """Local-time Unix timestamps of the start of a day and of the next day"""
+    start = datetime.combine(day, datetime.min.time())
+    return start.timestamp(), (start + timedelta(days=1)).timestamp()
+
+class TimeIndex:
+    def __init__(self, ts: array):
+        self.ts = ts  # non-decreasing
+        self.days: List[date] = []  # days with at least one message
+        self.day_starts = array("I")  # offset of each day's first message
+        self.months: List[str] = []  # "YYYY-MM", months with at least one message
+        self.month_starts = array("I")
+
+        # One step per day with messages rather than one datetime per message
+        offset = 0
+        while offset < len(ts):
+            day = datetime.fromtimestamp(ts[offset]).date()
+            self.days.append(day)
+            self.day_starts.append(offset)
+            month = day.strftime("%Y-%m")
+            if not self.months or self.months[-1] != month:
+                self.months.append(month)
+                self.month_starts.append(offset)
+            offset = bisect_left(ts, day_bounds(day)[1], offset + 1)
+
+    @classmethod
+    def build(cls, messages: Sequence[Message]) -> "TimeIndex":
+        if isinstance(messages, ChannelColumns):
+            return cls(array("d", (messages.ts_us / 1_000_000).tolist()))
+        if isinstance(messages, SqliteChannelMessages):
+            return cls(messages.timestamps())
+        return cls(array("d", (msg.ts for msg in messages)))
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    @property
+    def first_day(self) -> date:
+        return self.days[0]
+
+    @property
+    def last_day(self) -> date:
+        return self.days[-1]
+
+    def span(self, start_ts: float, end_ts: float) -> Tuple[int, int]:
+        """Offsets [lo, hi) of the messages with start_ts <= ts < end_ts"""
+        return bisect_left(self.ts, start_ts), bisect_left(self.ts, end_ts)
+
+    def count(self, start_day: date, end_day: date) -> int:
+        """Messages sent from start_day through end_day"""
+        lo, hi = self.span(day_bounds(start_day)[0], day_bounds(end_day)[1])
+        return hi - lo
+
+    def month_histogram(self) -> List[Tuple[str, int]]:
+        """(month, message count) for every month from the first to the last message, empty months included"""
+        counts = dict(zip(self.months, (
+            end - start for start, end in zip(self.month_starts, [*self.month_starts[1:], len(self.ts)])
+        )))
+        histogram = []
+        if self.months:
+            year, month = map(int, self.months[0].split("-"))
+            while True:
+                key = f"{year:04d}-{month:02d}"
+                histogram.append((key, counts.get(key, 0)))
+                if key == self.months[-1]:
+                    break
+                year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        return histogram
+
+    def day_histogram(self, start_day: date, end_day: date) -> List[Tuple[date, int]]:
+        """(day, message count) for the days with messages between start_day and end_day"""
+        lo, hi = bisect_left(self.days, start_day), bisect_right(self.days, end_day)
+        ends = [*self.day_starts[lo + 1:], len(self.ts)]
+        return [(self.days[i], ends[i - lo] - self.day_starts[i]) for i in range(lo, hi)]
+
+def get_time_index(workspace: WorkspaceData, channel_id: str) -> TimeIndex:
+    """The channel's time index, built on first access"""
+    time_index = workspace.time_indexes.get(channel_id)
+    if time_index is None:
+        time_index = workspace.time_indexes[channel_id] = TimeIndex.build(workspace.messages.get(channel_id, []))
+    return time_index
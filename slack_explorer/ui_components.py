@@ -1,12 +1,36 @@
 import streamlit as st
-from datetime import datetime
-from typing import Optional, Dict
-from data_loader import Channel
-from collections import defaultdict
-import re
-
-def render_sidebar() -> None:
-    """Render the sidebar with channel navigation and search"""
+from datetime import date
+from typing import Optional, Set
+from conversation_index import SORT_KEYS, get_conversation_index
+from data_loader import WorkspaceData
+from llm_export import DEFAULT_MAX_TOKENS, MODELS, iter_transcript_chunks, token_counter
+from render_cache import format_timestamp, get_render_cache, parse_user_mentions
+from time_index import day_bounds, get_time_index
+from search_index import SearchHit, get_message_index
+from search_query import search_messages
+from similarity_index import get_similarity_index, similarity_cache_path
+from sqlite_store import SqliteChannelMessages
+from thread_index import get_thread_index
+from workspace_analytics import WEEKDAYS, get_workspace_analytics
+import altair as alt
+import json
+import numpy as np
+import time
+
+# Conversations listed per sidebar page
+SIDEBAR_PAGE_SIZE = 50
+
+# Conversation paging: only one page of messages is rendered per rerun
+PAGE_SIZES = [50, 100, 200, 500]
+DEFAULT_PAGE_SIZE = 100
+# Longer message texts are cut on the page (full text behind an expander), so a page's payload stays bounded
+MAX_RENDERED_CHARS = 4000
+
+def render_sidebar(pending: Optional[Set[str]] = None) -> None:
+    """
+    Render the sidebar with channel navigation and search. pending: conversations still being loaded
+    (shown, but can't be opened yet)
+    """
     workspace_data = st.session_state.workspace_data
 
     # Initialize conversation type if not set
@@ -16,127 +40,438 @@ def render_sidebar() -> None:
     # Conversation type selector
     st.session_state.conversation_type = st.sidebar.radio(
         "Show conversations",
-        options=["channels", "dms", "mpdms"],
+        options=["channels", "dms", "mpdms", "messages", "analytics"],
         format_func=lambda x: {
             "channels": "💬 Channels",
             "dms": "👤 Direct Messages",
-            "mpdms": "👥 Group Messages"
+            "mpdms": "👥 Group Messages",
+            "messages": "🔎 Search Messages",
+            "analytics": "📈 Analytics"
         }[x],
         horizontal=True
     )
 
+    if st.session_state.conversation_type in ("messages", "analytics") and pending:
+        st.sidebar.info("Available once the export has finished loading")
+        return
+    if st.session_state.conversation_type == "messages":
+        render_message_search(workspace_data)
+        return
+    if st.session_state.conversation_type == "analytics":
+        st.sidebar.caption("Activity across the whole workspace is shown on the right")
+        return
+
     # Search box at the top with on_change callback
     search_label = {
         "channels": "Search channels",
         "dms": "Search direct messages",
         "mpdms": "Search group messages"
     }[st.session_state.conversation_type]
+    page_key = f"sidebar_page_{st.session_state.conversation_type}"
+
+    def reset_page() -> None:
+        st.session_state[page_key] = 1
 
     st.sidebar.text_input(
         search_label,
         value=st.session_state.get("search_query", ""),
         key="search_query",
         placeholder=f"Filter {st.session_state.conversation_type}...",
-        on_change=lambda: None  # This triggers rerun on input change
+        on_change=reset_page  # New filter, start from the first page
+    )
+    sort_key = st.sidebar.selectbox(
+        "Sort by",
+        SORT_KEYS,
+        format_func=lambda x: {"name": "Name", "activity": "Last activity", "messages": "Message count"}[x],
+        key="sidebar_sort",
+        on_change=reset_page
     )
 
-    search_query = st.session_state.search_query.lower().strip()
+    # Sorted lists and the name index are built once per workspace, a rerun only reads one page
+    conversation_list = get_conversation_index(workspace_data).lists[st.session_state.conversation_type]
+    def read_page(page: int) -> tuple:
+        offset = (page - 1) * SIDEBAR_PAGE_SIZE
+        return conversation_list.page(st.session_state.search_query, sort_key, offset, SIDEBAR_PAGE_SIZE)
 
-    # Filter conversations based on type and search
-    conversations: Dict[str, Channel] = {}
+    page = st.session_state.get(page_key, 1)
+    entries, total = read_page(page)
+    page_count = max(1, -(-total // SIDEBAR_PAGE_SIZE))
+    if page > page_count:  # The list got shorter under the current page
+        page = st.session_state[page_key] = page_count
+        entries, total = read_page(page)
 
-    if st.session_state.conversation_type == "channels":
-        # Group channels by visibility
-        public_channels = {
-            cid: c for cid, c in workspace_data.channels.items()
-            if not c.is_private and getattr(c, "type", "channel") == "channel"
-            and (not search_query or search_query in c.name.lower())
-        }
-        private_channels = {
-            cid: c for cid, c in workspace_data.channels.items()
-            if c.is_private and getattr(c, "type", "channel") == "channel"
-            and (not search_query or search_query in c.name.lower())
-        }
+    if not total:
+        if st.session_state.conversation_type == "dms":
+            st.sidebar.info("No direct messages found")
+        elif st.session_state.conversation_type == "mpdms":
+            st.sidebar.info("No group messages found")
+        return
 
-        # Public channels section
-        if public_channels:
-            st.sidebar.markdown("### 📢 Public Channels")
-            for channel_id, channel in sorted(public_channels.items(), key=lambda x: x[1].name):
-                if st.sidebar.button(
-                    f"# {channel.name}",
-                    key=f"channel_{channel_id}",
-                    use_container_width=True,
-                ):
-                    st.session_state.selected_channel = channel_id
-
-        # Private channels section
-        if private_channels:
-            st.sidebar.markdown("### 🔒 Private Channels")
-            for channel_id, channel in sorted(private_channels.items(), key=lambda x: x[1].name):
-                if st.sidebar.button(
-                    f"🔒 {channel.name}",
-                    key=f"channel_{channel_id}",
-                    use_container_width=True,
-                ):
-                    st.session_state.selected_channel = channel_id
-
-    elif st.session_state.conversation_type == "dms":
-        dms = {
-            cid: c for cid, c in workspace_data.channels.items()
-            if getattr(c, "type", "channel") == "dm"
-            and (not search_query or search_query in (getattr(c, "display_name", "") or "").lower())
-        }
+    section_titles = {
+        "public": "### 📢 Public Channels",
+        "private": "### 🔒 Private Channels",
+        "dm": "### 👤 Direct Messages",
+        "mpdm": "### 👥 Group Messages"
+    }
+    key_prefix = {"public": "channel", "private": "channel", "dm": "dm", "mpdm": "mpdm"}
+    section = None
+    for entry in entries:
+        if entry.section != section:
+            section = entry.section
+            st.sidebar.markdown(section_titles[section])
+        details = []
+        is_pending = pending is not None and entry.channel_id in pending
+        if is_pending:
+            details.append("still loading")
+        elif entry.message_count is not None:
+            details.append(f"{entry.message_count} messages")
+        if entry.last_ts is not None:
+            details.append(f"last active {format_timestamp(entry.last_ts)}")
+        if st.sidebar.button(
+            f"⏳ {entry.label}" if is_pending else entry.label,
+            key=f"{key_prefix[entry.section]}_{entry.channel_id}",
+            help=", ".join(details) or None,
+            use_container_width=True,
+            disabled=is_pending,
+        ):
+            st.session_state.selected_channel = entry.channel_id
+
+    if page_count > 1:
+        st.sidebar.number_input(
+            f"Page (of {page_count}, {total} conversations)",
+            min_value=1,
+            max_value=page_count,
+            key=page_key
+        )
+
+def render_message_search(workspace_data: WorkspaceData) -> None:
+    """Full-text search over message content, results link to the conversation"""
+    st.sidebar.text_input(
+        "Search message text",
+        key="message_query",
+        placeholder='from:@name in:#channel after:2024-01-01 has:file "a phrase" words...',
+        help="All words must match. Filters: `from:@user`, `in:#channel` (`in:@user` for DMs), "
+             "`after:`/`before:`/`on:YYYY-MM-DD`, `has:file`; quote words to match them as a phrase."
+    )
+    query = st.session_state.get("message_query", "").strip()
+    if not query:
+        return
+
+    with st.spinner("Building search index..."):  # Only slow the first time (or in lazy mode)
+        get_message_index(workspace_data)
+
+    start = time.perf_counter()
+    hits, plan = search_messages(workspace_data, query, limit=50)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    for error in plan.errors:
+        st.sidebar.warning(error)
+    st.sidebar.caption(f"{'Top ' if len(hits) == 50 else ''}{len(hits)} results in {elapsed_ms:.0f} ms")
+
+    for hit in hits:
+        channel = workspace_data.channels.get(hit.channel_id)
+        if channel is None:
+            continue
+        text = hit.text if hit.text is not None else workspace_data.messages[hit.channel_id][hit.position].text
+        snippet = text if len(text) <= 80 else text[:80] + "..."
+        channel_name = f"#{channel.name}" if channel.type == "channel" else (channel.display_name or channel.name)
+        if st.sidebar.button(
+            f"{channel_name} · {format_timestamp(hit.ts)}\n\n{snippet}",
+            key=f"hit_{hit.channel_id}_{hit.ts}",
+            use_container_width=True,
+        ):
+            open_hit(workspace_data, hit)
+
+def open_hit(workspace_data: WorkspaceData, hit: SearchHit) -> None:
+    """Select the hit's conversation, on the page holding the hit's thread"""
+    st.session_state.selected_channel = hit.channel_id
+    st.session_state.highlight_ts = hit.ts
+    messages = workspace_data.messages[hit.channel_id]
+    if hit.position is not None:
+        hit_msg = messages[hit.position]
+    else:
+        hit_msg = messages.get_by_ts([hit.ts]).get(hit.ts)
+    st.session_state.jump_to_ts = (hit_msg.thread_ts or hit_msg.ts) if hit_msg else hit.ts
+
+def render_analytics() -> None:
+    """Workspace-wide activity dashboard"""
+    workspace_data = st.session_state.workspace_data
+    with st.spinner("Computing analytics..."):  # Once per loaded export version
+        analytics = get_workspace_analytics(workspace_data)
 
-        if dms:
-            st.sidebar.markdown("### 👤 Direct Messages")
-            for channel_id, channel in sorted(dms.items(), key=lambda x: x[1].display_name or ""):
-                if st.sidebar.button(
-                    channel.display_name or "Unknown User",
-                    key=f"dm_{channel_id}",
-                    use_container_width=True,
-                ):
-                    st.session_state.selected_channel = channel_id
+    st.markdown("### 📈 Workspace analytics")
+    if not len(analytics):
+        st.info("This export has no messages")
+        return
+    st.caption(
+        f"{len(analytics):,} messages by {len(analytics.user_ids)} users in {len(analytics.channel_ids)} "
+        f"conversations, {analytics.first_day} to {analytics.last_day}"
+    )
+
+    users_tab, channels_tab, threads_tab, posters_tab = st.tabs(
+        ["Messages per user", "Conversation activity", "Thread replies", "Top posters"]
+    )
+    with users_tab:
+        period_col, top_col = st.columns(2)
+        period = period_col.radio("Per", ["day", "week"], horizontal=True, key="analytics_user_period")
+        top = top_col.slider("Most active users", 1, 30, 10, key="analytics_top_users")
+        st.line_chart(analytics.messages_per_user(period, top))
+
+    with channels_tab:
+        options = [None] + [analytics.channel_ids[c] for c in analytics.top_channels(len(analytics.channel_ids))]
+        labels = dict(zip(analytics.channel_ids, analytics.channel_labels))
+        channel_id = st.selectbox(
+            "Conversation",
+            options,
+            format_func=lambda cid: "All conversations" if cid is None else labels[cid],
+            key="analytics_channel"
+        )
+        st.altair_chart(
+            alt.Chart(analytics.hour_heatmap(channel_id)).mark_rect().encode(
+                x=alt.X("hour:O", title="Hour of day"),
+                y=alt.Y("weekday:O", sort=WEEKDAYS, title=None),
+                color=alt.Color("messages:Q", title="Messages"),
+                tooltip=["weekday", "hour", "messages"]
+            ),
+            use_container_width=True
+        )
+        period_col, top_col = st.columns(2)
+        period = period_col.radio("Per", ["week", "day"], horizontal=True, key="analytics_channel_period")
+        top = top_col.slider("Busiest conversations", 1, 50, 20, key="analytics_top_channels")
+        st.altair_chart(
+            alt.Chart(analytics.channel_heatmap(period, top)).mark_rect().encode(
+                x=alt.X("period:T", title=None),
+                y=alt.Y("conversation:N", sort=None, title=None),
+                color=alt.Color("messages:Q", title="Messages"),
+                tooltip=["conversation", alt.Tooltip("period:T", title=period), "messages"]
+            ),
+            use_container_width=True
+        )
+
+    with threads_tab:
+        first_only = st.radio(
+            "Measure",
+            [True, False],
+            format_func=lambda first: "Time to first reply" if first else "Every reply",
+            horizontal=True,
+            key="analytics_first_reply"
+        )
+        latencies = analytics.reply_latencies(first_only)
+        if not len(latencies):
+            st.info("No threaded replies in this export")
         else:
-            st.sidebar.info("No direct messages found")
+            median_col, p90_col, count_col = st.columns(3)
+            median_col.metric("Median", format_latency(float(np.median(latencies))))
+            p90_col.metric("90th percentile", format_latency(float(np.percentile(latencies, 90))))
+            count_col.metric("Threads" if first_only else "Replies", f"{len(latencies):,}")
+            st.altair_chart(
+                alt.Chart(analytics.latency_histogram(first_only)).mark_bar().encode(
+                    x=alt.X("latency:N", sort=None, title="Reply latency"),
+                    y=alt.Y("replies:Q", title="Threads" if first_only else "Replies"),
+                    tooltip=["latency", "replies"]
+                ),
+                use_container_width=True
+            )
 
-    else:  # MPDMs
-        mpdms = {
-            cid: c for cid, c in workspace_data.channels.items()
-            if getattr(c, "type", "channel") == "mpdm"
-            and (not search_query or search_query in (getattr(c, "display_name", "") or "").lower())
-        }
+    with posters_tab:
+        top = st.slider("Posters per conversation", 1, 20, 5, key="analytics_top_posters")
+        st.dataframe(
+            analytics.top_posters(top),
+            hide_index=True,
+            use_container_width=True,
+            column_config={"share": st.column_config.ProgressColumn("share", format="%.2f", min_value=0, max_value=1)}
+        )
 
-        if mpdms:
-            st.sidebar.markdown("### 👥 Group Messages")
-            for channel_id, channel in sorted(mpdms.items(), key=lambda x: x[1].display_name or ""):
-                if st.sidebar.button(
-                    channel.display_name or "Group Message",
-                    key=f"mpdm_{channel_id}",
-                    use_container_width=True,
-                ):
-                    st.session_state.selected_channel = channel_id
+def render_load_profile(workspace_data: WorkspaceData) -> None:
+    """Time and memory per load phase and the costliest conversations, for a profiled load"""
+    report = workspace_data.load_profile.report(workspace_data)
+    with st.expander("⏱️ Load profile"):
+        memory = report["trace_memory"]
+        total_col, peak_col = st.columns(2)
+        total_col.metric("Load time", f"{report['total_seconds']:.2f} s")
+        if memory:
+            peak_col.metric("Peak traced memory", f"{report['peak_bytes'] / 2**20:.1f} MB")
+            st.caption("Kept: memory still allocated at the end of the phase. Peak: highest allocation during "
+                       "it. Conversation phases add up over all conversations and their day files.")
         else:
-            st.sidebar.info("No group messages found")
+            st.caption("Conversation phases add up over all conversations and their day files. Memory isn't "
+                       "traced in the explorer, run load_profile.py for it.")
+        st.dataframe(
+            [{"Phase": phase["phase"], "Calls": phase["calls"], "Seconds": round(phase["seconds"], 3),
+              **({"MB kept": round(phase["bytes"] / 2**20, 2), "MB peak": round(phase["peak_bytes"] / 2**20, 2)}
+                 if memory else {})}
+             for phase in report["phases"]],
+            hide_index=True,
+            use_container_width=True
+        )
+        rankings = [("seconds", "top_channels_by_seconds")]
+        if memory:
+            rankings.append(("memory kept", "top_channels_by_bytes"))
+        for title, key in rankings:
+            st.markdown(f"**Top conversations by {title}**")
+            st.dataframe(
+                [{"Conversation": row["name"], "Messages": row["messages"], "Seconds": round(row["seconds"], 3),
+                  **({"MB kept": round(row["bytes"] / 2**20, 2)} if memory else {})} for row in report[key]],
+                hide_index=True,
+                use_container_width=True
+            )
+        st.download_button(
+            "Download as JSON",
+            json.dumps(report, indent=2),
+            file_name="load_profile.json",
+            mime="application/json"
+        )
+
+def format_latency(seconds: float) -> str:
+    """Short human-readable duration: 45s, 12 min, 3.5 h, 2.1 days"""
+    if seconds < 60:
+        return f"{seconds:.0f}s"
+    if seconds < 3600:
+        return f"{seconds / 60:.0f} min"
+    if seconds < 86400:
+        return f"{seconds / 3600:.1f} h"
+    return f"{seconds / 86400:.1f} days"
 
-def format_timestamp(ts: float) -> str:
-    """Format a Unix timestamp into a readable date/time"""
-    dt = datetime.fromtimestamp(ts)
-    return dt.strftime("%Y-%m-%d %I:%M %p")
+def display_window(page_source, total: int, start_day: date, end_day: date, newest_first: bool) -> tuple:
+    """Display offsets [lo, hi) of the threads started from start_day through end_day"""
+    start, _ = day_bounds(start_day)
+    _, next_start = day_bounds(end_day)
+    if newest_first:
+        return page_source.offset_for(next_start - 1e-6, True), total - page_source.offset_for(start)
+    return page_source.offset_for(start), page_source.offset_for(next_start)
 
-def parse_user_mentions(text: str, users_dict: dict) -> str:
+def render_page_controls(channel_id: str, page_source, window: tuple) -> tuple:
     """
-    Replace Slack-style user mentions (<@U123ABC>) with @RealName, falling back to @UserName.
+    Page size, ordering, jump-to-date and page selector for a conversation. page_source is a ThreadIndex
+    or SqliteChannelMessages, both can tell the display offset of a date (`offset_for`); window is the
+    [lo, hi) range of display offsets being paged through.
+    Returns (page_size, newest_first, page).
     """
-    pattern = re.compile(r"<@([A-Z0-9]+)(?:\|[^>]+)?>")
-    def replacer(match):
-        user_id = match.group(1)
-        if user_id in users_dict:
-            user = users_dict[user_id]
-            # Prioritize real_name over user_name
-            name = user.real_name or user.user_name or "UnknownUser"
-            return f"@{name}"
-        return "@UnknownUser"
-    return pattern.sub(replacer, text)
+    lo, hi = window
+    page_key = f"page_{channel_id}"
+    jump_key = f"jump_{channel_id}"
+
+    def page_for(ts: float) -> int:
+        newest_first = st.session_state.get("newest_first", False)
+        page_size = st.session_state.get("page_size", DEFAULT_PAGE_SIZE)
+        return (min(max(page_source.offset_for(ts, newest_first), lo), hi) - lo) // page_size + 1
+
+    def jump_to_date() -> None:
+        day = st.session_state.get(jump_key)
+        if day:
+            start, next_start = day_bounds(day)
+            st.session_state[page_key] = page_for(next_start - 1e-6 if st.session_state.get("newest_first") else start)
+
+    size_col, order_col, date_col, page_col = st.columns([1, 1, 1, 1])
+    size_col.selectbox("Messages per page", PAGE_SIZES, index=PAGE_SIZES.index(DEFAULT_PAGE_SIZE), key="page_size")
+    order_col.radio(
+        "Order",
+        options=[False, True],
+        format_func=lambda newest: "Newest first" if newest else "Oldest first",
+        key="newest_first",
+        horizontal=True
+    )
+    date_col.date_input("Jump to date", value=None, key=jump_key, on_change=jump_to_date)
+
+    # A search hit asks for the page holding its thread
+    jump_ts = st.session_state.pop("jump_to_ts", None)
+    if jump_ts is not None:
+        st.session_state[page_key] = page_for(jump_ts)
+
+    page_size = st.session_state.page_size
+    page_count = max(1, -(-(hi - lo) // page_size))
+    if st.session_state.get(page_key, 1) > page_count:  # Page size changed under the current page
+        st.session_state[page_key] = page_count
+    page = page_col.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count, key=page_key)
+    return page_size, st.session_state.newest_first, page
+
+def render_llm_export(
+    workspace_data: WorkspaceData,
+    channel_id: str,
+    start_day: Optional[date],
+    end_day: Optional[date]
+) -> None:
+    """Transcript chunks of the conversation (or the selected date range) sized for an LLM's context"""
+    with st.expander("🤖 Export for an LLM"):
+        scope = f"threads started from {start_day} through {end_day}" if start_day else "the whole conversation"
+        st.caption(f"Compact transcript of {scope}, split into chunks that fit the token budget")
+        model_col, budget_col = st.columns(2)
+        model = model_col.selectbox("Count tokens for", MODELS, key=f"llm_model_{channel_id}")
+        max_tokens = budget_col.number_input(
+            "Tokens per chunk", min_value=500, max_value=200_000, value=DEFAULT_MAX_TOKENS, step=500,
+            key=f"llm_budget_{channel_id}"
+        )
+        settings = (model, max_tokens, start_day, end_day)
+        state_key = f"llm_chunks_{channel_id}"
+        if st.button("Build transcript", key=f"llm_build_{channel_id}"):
+            try:
+                count_tokens = token_counter(model)
+            except Exception as e:  # tiktoken downloads its encodings on first use
+                st.error(f"Couldn't load the {model} tokenizer: {e}")
+                return
+            chunks = []
+            status = st.empty()
+            for chunk in iter_transcript_chunks(workspace_data, channel_id, max_tokens, count_tokens, start_day, end_day):
+                chunks.append(chunk)
+                status.caption(f"{len(chunks)} chunks so far...")
+            status.empty()
+            st.session_state[state_key] = (settings, chunks)
+
+        built = st.session_state.get(state_key)
+        if not built or built[0] != settings:
+            return
+        chunks = built[1]
+        if not chunks:
+            st.info("No messages to export")
+            return
+        st.caption(f"{len(chunks)} chunks, {sum(chunk.tokens for chunk in chunks):,} tokens")
+        index = st.selectbox(
+            "Chunk",
+            range(len(chunks)),
+            format_func=lambda i: (f"Part {chunks[i].index}: {format_timestamp(chunks[i].first_ts)}, "
+                                   f"{chunks[i].message_count} messages, {chunks[i].tokens} tokens"),
+            key=f"llm_chunk_{channel_id}"
+        )
+        chunk = chunks[index]
+        st.download_button(
+            "Download this chunk",
+            chunk.text,
+            file_name=f"{channel_id}-part-{chunk.index:03d}.txt",
+            key=f"llm_download_{channel_id}"
+        )
+        st.code(chunk.text, language=None)
+
+def render_similar(workspace_data: WorkspaceData, channel_id: str, ts: float) -> None:
+    """Messages and threads across the workspace most similar to a message (TF-IDF cosine similarity)"""
+    handle = st.session_state.workspace_handle
+    with st.spinner("Building similarity index..."):  # Only the first time for an export version
+        index = get_similarity_index(workspace_data, similarity_cache_path(handle.key.export_path, handle.key.version))
+    doc_id = index.doc_id(channel_id, ts)
+    if doc_id is None:
+        st.info("This message isn't in the similarity index")
+        return
+
+    start = time.perf_counter()
+    similar = {"Messages": index.similar_messages(doc_id), "Threads": index.similar_threads(doc_id)}
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    st.caption(f"Most similar across the workspace ({elapsed_ms:.0f} ms)")
+    for tab, (kind, hits) in zip(st.tabs(list(similar)), similar.items()):
+        with tab:
+            if not hits:
+                st.caption("Nothing similar found")
+            for hit in hits:
+                channel = workspace_data.channels.get(hit.channel_id)
+                if channel is None:
+                    continue
+                text = workspace_data.messages[hit.channel_id][hit.position].text
+                snippet = text if len(text) <= 80 else text[:80] + "..."
+                channel_name = f"#{channel.name}" if channel.type == "channel" else (channel.display_name or channel.name)
+                st.button(
+                    f"{hit.score:.2f} · {channel_name} · {format_timestamp(hit.ts)}\n\n{snippet}",
+                    key=f"similar_{kind}_{hit.channel_id}_{hit.ts}",
+                    on_click=open_hit,
+                    args=(workspace_data, hit),
+                    use_container_width=True
+                )
 
 def render_conversation() -> None:
     """Render the selected conversation/channel"""
@@ -148,7 +483,8 @@ def render_conversation() -> None:
         return
 
     channel = workspace_data.channels[channel_id]
-    messages = workspace_data.messages.get(channel_id, [])
+    with st.spinner("Loading messages..."):  # Only takes a while in lazy mode on first access
+        messages = workspace_data.messages.get(channel_id, [])
 
     # Conversation header
     channel_type = getattr(channel, "type", "channel")
@@ -163,49 +499,113 @@ def render_conversation() -> None:
     st.markdown(f"Created on {format_timestamp(channel.created.timestamp())}")
     st.markdown("---")
 
-    # Group messages by threads
-    messages_sorted = sorted(messages, key=lambda m: m.ts)
-    parent_map = {}
-    replies_map = defaultdict(list)
+    if isinstance(messages, SqliteChannelMessages):
+        # SQLite backend: the database counts and returns pages in thread order
+        page_source = messages
+        total = len(messages) - messages.orphan_count
+        orphan_count = messages.orphan_count
+    else:
+        # Thread grouping is computed once per channel and reused on every rerun
+        thread_index = get_thread_index(workspace_data, channel_id)
+        page_source = thread_index
+        total = len(thread_index.order)
+        orphan_count = len(thread_index.orphans)
+    if orphan_count:
+        st.caption(f"{orphan_count} replies to threads that aren't in this export are not shown")
 
-    for msg in messages_sorted:
-        if not msg.thread_ts or msg.thread_ts == msg.ts:
-            parent_map[msg.ts] = msg
-        else:
-            replies_map[msg.thread_ts].append(msg)
+    window = (0, total)
+    start_day = end_day = None
+    time_index = get_time_index(workspace_data, channel_id)
+    if len(time_index):
+        with st.expander("📊 Activity"):
+            date_range = st.date_input(
+                "Only show threads started between",
+                value=(),
+                min_value=time_index.first_day,
+                max_value=time_index.last_day,
+                key=f"range_{channel_id}"
+            )
+            if date_range:  # While picking, the range only has its start
+                start_day, end_day = date_range[0], date_range[-1]
+                newest_first = st.session_state.get("newest_first", False)
+                window = display_window(page_source, total, start_day, end_day, newest_first)
+                st.caption(f"{time_index.count(start_day, end_day)} messages sent from {start_day} through {end_day}")
+                histogram = [(day.isoformat(), count) for day, count in time_index.day_histogram(start_day, end_day)]
+            else:
+                histogram = time_index.month_histogram()
+            st.bar_chart({"Messages": dict(histogram)})
+        render_llm_export(workspace_data, channel_id, start_day, end_day)
 
-    # Build final message list with threaded replies
-    final_message_list = []
-    for ts_value in sorted(parent_map.keys()):
-        parent_msg = parent_map[ts_value]
-        final_message_list.append(parent_msg)
+    page_size, newest_first, page = render_page_controls(channel_id, page_source, window)
+    offset = window[0] + (page - 1) * page_size
+    page_size = max(0, min(page_size, window[1] - offset))
 
-        if ts_value in replies_map:
-            child_replies = sorted(replies_map[ts_value], key=lambda r: r.ts)
-            final_message_list.extend(child_replies)
+    if isinstance(messages, SqliteChannelMessages):
+        final_message_list = messages.thread_page(offset, page_size, newest_first)
+        parent_map = messages.get_by_ts({
+            msg.thread_ts for msg in final_message_list
+            if msg.thread_ts and msg.thread_ts != msg.ts
+        })
+    else:
+        positions = thread_index.display_order(newest_first)[offset:offset + page_size]
+        final_message_list = [messages[position] for position in positions]
+        # Only the parents of replies on this page
+        parent_map = {
+            msg.thread_ts: messages[thread_index.parents[msg.thread_ts]]
+            for msg in final_message_list
+            if msg.thread_ts and msg.thread_ts != msg.ts
+        }
 
-    # Render messages with thread context
+    if final_message_list:
+        in_range = f", {window[1] - window[0]} in the selected date range" if window != (0, total) else ""
+        st.caption(f"Messages {offset + 1}–{offset + len(final_message_list)} of {total}{in_range}")
+    elif total:
+        st.info("No threads started in the selected date range")
+
+    # Render messages with thread context. Author, timestamp and mention-resolved text are made once per
+    # message and reused on later reruns
+    render_cache = get_render_cache(workspace_data)
+    # Similarity needs the whole export, so not while it's still loading
+    handle = st.session_state.get("workspace_handle")
+    find_similar = handle is not None and handle.workspace is workspace_data
     for msg in final_message_list:
-        user = workspace_data.users.get(msg.user)
-        user_name = user.real_name or user.user_name if user else "Unknown User"
+        rendered = render_cache.get(channel_id, msg, workspace_data.users)
 
         threaded_note = ""
         if msg.thread_ts and msg.thread_ts != msg.ts:
             parent_msg = parent_map.get(msg.thread_ts)
             if parent_msg:
-                parent_user = workspace_data.users.get(parent_msg.user)
-                parent_user_name = parent_user.real_name or parent_user.user_name if parent_user else "Unknown User"
-                parent_time = format_timestamp(parent_msg.ts)
-                threaded_note = f" (Threaded reply to {parent_user_name} - {parent_time})"
+                parent = render_cache.get(channel_id, parent_msg, workspace_data.users)
+                threaded_note = f" (Threaded reply to {parent.author} - {parent.timestamp})"
 
-        st.markdown(f"**{user_name}** - {format_timestamp(msg.ts)}{threaded_note}")
-        # Transform Slack user mentions in the text
-        rendered_text = parse_user_mentions(msg.text, workspace_data.users)
-        st.text(rendered_text)
+        highlight = "🔎 " if msg.ts == st.session_state.get("highlight_ts") else ""
+        st.markdown(f"{highlight}**{rendered.author}** - {rendered.timestamp}{threaded_note}")
+        rendered_text = rendered.text
+        if len(rendered_text) > MAX_RENDERED_CHARS:
+            # The full text is only sent on the rerun after asking for it, and for one message at a time:
+            # collapsed expanders still ship their content to the browser
+            full = st.session_state.get("full_message") == (channel_id, msg.ts)
+            if full:
+                st.text(rendered_text)
+            else:
+                st.text(rendered_text[:MAX_RENDERED_CHARS] + f"... ({len(rendered_text) - MAX_RENDERED_CHARS} more characters)")
+            if st.button("Shorten message" if full else "Show full message", key=f"full_{channel_id}_{msg.ts}"):
+                st.session_state.full_message = None if full else (channel_id, msg.ts)
+                st.rerun()
+        else:
+            st.text(rendered_text)
 
         if msg.attachments:
             st.markdown("📎 **Attachments:**")
             for attachment in msg.attachments:
                 st.markdown(f"- {attachment.get('name', 'Unnamed attachment')}")
 
-        st.markdown("---")
\ No newline at end of file
+        if find_similar:
+            shown = st.session_state.get("similar_to") == (channel_id, msg.ts)
+            if st.button("Hide similar" if shown else "≈ Find similar", key=f"similar_{channel_id}_{msg.ts}"):
+                shown = not shown
+                st.session_state.similar_to = (channel_id, msg.ts) if shown else None
+            if shown:
+                render_similar(workspace_data, channel_id, msg.ts)
+
+        st.markdown("---")
@@ -0,0 +1,281 @@
+"""
+Workspace analytics: activity per user and conversation, thread reply latency, top posters.
+
+Everything is computed from one flat, columnar table of the workspace's messages (conversation code,
+user code, ts, thread ts as NumPy arrays), with bincounts, sorts and pandas group-bys rather than
+per-message Python loops. Building that table is the only per-message step: one pass per channel for
+Message lists, while columnar workspaces hand over their arrays and SQLite workspaces read the four
+columns in a single query. Lazy workspaces have every channel parsed once (through LazyMessages).
+
+Days, weeks and hours are in local time, like the rest of the explorer. `WorkspaceAnalytics` is built
+once per loaded workspace (`WorkspaceData.analytics`). A new export version or an incremental reload
+produces a new WorkspaceData, so the cache can't outlive the data it was computed from.
+"""
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from columnar_store import ChannelColumns
+from data_loader import Channel, WorkspaceData
+from render_cache import user_display_name
+from sqlite_store import SqliteMessages
+
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+# Reply latency buckets: (upper bound in seconds, label)
+LATENCY_BUCKETS = [
+    (60, "< 1 min"),
+    (5 * 60, "1-5 min"),
+    (15 * 60, "5-15 min"),
+    (3600, "15-60 min"),
+    (4 * 3600, "1-4 h"),
+    (24 * 3600, "4-24 h"),
+    (7 * 24 * 3600, "1-7 days"),
+    (np.inf, "> 7 days"),
+]
+
+def channel_label(channel: Optional[Channel], channel_id: str) -> str:
+    if channel is None:
+        return channel_id
+    if channel.type == "channel":
+        return f"#{channel.name}"
+    return channel.display_name or channel.name
+
+def local_seconds(ts: np.ndarray) -> np.ndarray:
+    """Unix timestamps shifted into local wall-clock seconds (UTC offsets looked up once per distinct hour)"""
+    if not len(ts):
+        return ts.copy()
+    hours, inverse = np.unique((ts // 3600).astype(np.int64), return_inverse=True)
+    offsets = np.array([datetime.fromtimestamp(int(hour) * 3600).astimezone().utcoffset().total_seconds()
+                        for hour in hours])
+    return ts + offsets[inverse]
+
+def _unique_labels(labels: List[str], ids: List[str]) -> List[str]:
+    # Chart columns must be unique, two users can share a display name
+    counts = pd.Series(labels).value_counts()
+    return [f"{label} ({uid})" if counts[label] > 1 else label for label, uid in zip(labels, ids)]
+
+def message_columns(workspace: WorkspaceData) -> Tuple[List[str], List[str], np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    (channel ids, user ids, channel code, user code, ts, thread ts) for every message; codes index the
+    id lists, thread ts is NaN for messages outside threads
+    """
+    messages = workspace.messages
+    channel_ids = list(messages)
+    user_index: Dict[str, int] = {}
+
+    if isinstance(messages, SqliteMessages):
+        channel_index = {channel_id: i for i, channel_id in enumerate(channel_ids)}
+        rows = messages.store.execute("SELECT channel_id, user, ts, thread_ts FROM messages").fetchall()
+        channel_col, user_col, ts_col, thread_col = zip(*rows) if rows else ((), (), (), ())
+        channel_codes = np.fromiter((channel_index[cid] for cid in channel_col), np.int32, len(rows))
+        user_codes = np.fromiter((user_index.setdefault(uid, len(user_index)) for uid in user_col), np.int32, len(rows))
+        return (
+            channel_ids,
+            list(user_index),
+            channel_codes,
+            user_codes,
+            np.array(ts_col, dtype=np.float64),
+            np.array(thread_col, dtype=np.float64),  # NULL -> NaN
+        )
+
+    channel_parts, user_parts, ts_parts, thread_parts = [], [], [], []
+    table_codes = {}  # id(UserTable) -> table index -> user code
+    for code, channel_id in enumerate(channel_ids):
+        msgs = messages.get(channel_id, [])
+        count = len(msgs)
+        if isinstance(msgs, ChannelColumns):
+            table = msgs.user_table
+            mapping = table_codes.get(id(table))
+            if mapping is None or len(mapping) < len(table.ids):
+                mapping = table_codes[id(table)] = np.array(
+                    [user_index.setdefault(uid, len(user_index)) for uid in table.ids], dtype=np.int32
+                )
+            user_parts.append(mapping[msgs.user_idx])
+            ts_parts.append(msgs.ts_us / 1_000_000)
+            thread_parts.append(np.where(msgs.thread_ts_us != 0, msgs.thread_ts_us / 1_000_000, np.nan))
+        else:
+            user_parts.append(np.fromiter((user_index.setdefault(m.user, len(user_index)) for m in msgs), np.int32, count))
+            ts_parts.append(np.fromiter((m.ts for m in msgs), np.float64, count))
+            thread_parts.append(np.fromiter((m.thread_ts or np.nan for m in msgs), np.float64, count))
+        channel_parts.append(np.full(count, code, dtype=np.int32))
+
+    def join(parts: list, dtype) -> np.ndarray:
+        return np.concatenate(parts) if parts else np.empty(0, dtype=dtype)
+    return (
+        channel_ids,
+        list(user_index),
+        join(channel_parts, np.int32),
+        join(user_parts, np.int32),
+        join(ts_parts, np.float64),
+        join(thread_parts, np.float64),
+    )
+
+class WorkspaceAnalytics:
+    """The message table of a workspace plus the aggregations the dashboard shows (computed on first use)"""
+
+    def __init__(self, workspace: WorkspaceData):
+        (self.channel_ids, self.user_ids, self.channel_codes, self.user_codes,
+         self.ts, self.thread_ts) = message_columns(workspace)
+        self.channel_labels = _unique_labels(
+            [channel_label(workspace.channels.get(cid), cid) for cid in self.channel_ids], self.channel_ids
+        )
+        self.user_labels = _unique_labels(
+            [user_display_name(workspace.users.get(uid)) for uid in self.user_ids], self.user_ids
+        )
+
+        local = local_seconds(self.ts)
+        self.day = (local // 86400).astype(np.int64)  # local days since 1970-01-01 (a Thursday)
+        self.weekday = ((self.day + 3) % 7).astype(np.int8)  # 0 = Monday
+        self.hour = ((local % 86400) // 3600).astype(np.int8)
+        self._cache: Dict[tuple, object] = {}
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    @property
+    def first_day(self) -> date:
+        return date(1970, 1, 1) + timedelta(days=int(self.day.min()))
+
+    @property
+    def last_day(self) -> date:
+        return date(1970, 1, 1) + timedelta(days=int(self.day.max()))
+
+    def _memo(self, key: tuple, compute):
+        # Shared between sessions: two sessions computing the same view at once just do it twice
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    def top_users(self, limit: int) -> np.ndarray:
+        """User codes of the most active users"""
+        counts = np.bincount(self.user_codes, minlength=len(self.user_ids))
+        return np.argsort(-counts, kind="stable")[:limit]
+
+    def top_channels(self, limit: int) -> np.ndarray:
+        counts = np.bincount(self.channel_codes, minlength=len(self.channel_ids))
+        return np.argsort(-counts, kind="stable")[:limit]
+
+    def _buckets(self, period: str) -> Tuple[np.ndarray, pd.DatetimeIndex]:
+        """Bucket number of every message and the start date of every bucket, for "day" or "week" """
+        if period == "week":
+            bucket = (self.day + 3) // 7  # Weeks start on Monday
+            first, last = bucket.min(), bucket.max()
+            starts = np.arange(first, last + 1) * 7 - 3
+        else:
+            bucket = self.day
+            first, last = bucket.min(), bucket.max()
+            starts = np.arange(first, last + 1)
+        return bucket - first, pd.DatetimeIndex(starts.astype("datetime64[D]"))
+
+    def messages_per_user(self, period: str = "day", top: int = 10) -> pd.DataFrame:
+        """Messages per day/week (rows) of the `top` most active users (columns)"""
+        def compute() -> pd.DataFrame:
+            if not len(self):
+                return pd.DataFrame()
+            users = self.top_users(top)
+            slot = np.full(len(self.user_ids), -1, dtype=np.int64)
+            slot[users] = np.arange(len(users))
+            bucket, starts = self._buckets(period)
+            selected = slot[self.user_codes] >= 0
+            counts = np.bincount(
+                slot[self.user_codes[selected]] * len(starts) + bucket[selected], minlength=len(users) * len(starts)
+            ).reshape(len(users), len(starts))
+            return pd.DataFrame(counts.T, index=starts, columns=[self.user_labels[u] for u in users])
+        return self._memo(("per_user", period, top), compute)
+
+    def hour_heatmap(self, channel_id: Optional[str] = None) -> pd.DataFrame:
+        """Long-form (weekday, hour, messages) for one conversation or the whole workspace"""
+        def compute() -> pd.DataFrame:
+            slots = self.weekday.astype(np.int64) * 24 + self.hour
+            if channel_id is not None:
+                slots = slots[self.channel_codes == self.channel_ids.index(channel_id)]
+            counts = np.bincount(slots, minlength=7 * 24)
+            return pd.DataFrame({
+                "weekday": np.repeat(WEEKDAYS, 24),
+                "hour": np.tile(np.arange(24), 7),
+                "messages": counts,
+            })
+        return self._memo(("hours", channel_id), compute)
+
+    def channel_heatmap(self, period: str = "week", top: int = 20) -> pd.DataFrame:
+        """Long-form (conversation, period start, messages) for the `top` busiest conversations"""
+        def compute() -> pd.DataFrame:
+            if not len(self):
+                return pd.DataFrame(columns=["conversation", "period", "messages"])
+            channels = self.top_channels(top)
+            slot = np.full(len(self.channel_ids), -1, dtype=np.int64)
+            slot[channels] = np.arange(len(channels))
+            bucket, starts = self._buckets(period)
+            selected = slot[self.channel_codes] >= 0
+            counts = np.bincount(
+                slot[self.channel_codes[selected]] * len(starts) + bucket[selected],
+                minlength=len(channels) * len(starts)
+            )
+            return pd.DataFrame({
+                "conversation": np.repeat([self.channel_labels[c] for c in channels], len(starts)),
+                "period": np.tile(starts, len(channels)),
+                "messages": counts,
+            })
+        return self._memo(("channels", period, top), compute)
+
+    def reply_latencies(self, first_only: bool = True) -> np.ndarray:
+        """
+        Seconds from a thread's parent to its replies; first_only keeps only the first reply of each
+        thread (time to first response)
+        """
+        def compute() -> np.ndarray:
+            is_reply = ~np.isnan(self.thread_ts) & (self.thread_ts != self.ts)
+            channel, thread_ts, ts = self.channel_codes[is_reply], self.thread_ts[is_reply], self.ts[is_reply]
+            if first_only and len(ts):
+                order = np.lexsort((ts, thread_ts, channel))
+                channel, thread_ts, ts = channel[order], thread_ts[order], ts[order]
+                first = np.ones(len(ts), dtype=bool)
+                first[1:] = (channel[1:] != channel[:-1]) | (thread_ts[1:] != thread_ts[:-1])
+                thread_ts, ts = thread_ts[first], ts[first]
+            return np.maximum(ts - thread_ts, 0)
+        return self._memo(("latency", first_only), compute)
+
+    def latency_histogram(self, first_only: bool = True) -> pd.DataFrame:
+        latencies = self.reply_latencies(first_only)
+        bounds = np.array([bound for bound, _ in LATENCY_BUCKETS[:-1]])
+        counts = np.bincount(np.searchsorted(bounds, latencies, side="right"), minlength=len(LATENCY_BUCKETS))
+        return pd.DataFrame({"latency": [label for _, label in LATENCY_BUCKETS], "replies": counts})
+
+    def top_posters(self, top: int = 5) -> pd.DataFrame:
+        """The `top` posters of every conversation: conversation, user, messages, share of the conversation"""
+        def compute() -> pd.DataFrame:
+            columns = ["conversation", "user", "messages", "share"]
+            if not len(self):
+                return pd.DataFrame(columns=columns)
+            pairs, counts = np.unique(
+                self.channel_codes.astype(np.int64) * len(self.user_ids) + self.user_codes, return_counts=True
+            )
+            frame = pd.DataFrame({
+                "channel": pairs // len(self.user_ids),
+                "user": pairs % len(self.user_ids),
+                "messages": counts,
+            })
+            totals = np.bincount(self.channel_codes, minlength=len(self.channel_ids))
+            frame["share"] = frame["messages"] / totals[frame["channel"]]
+            frame["total"] = totals[frame["channel"]]
+            labels, users = np.array(self.channel_labels, dtype=object), np.array(self.user_labels, dtype=object)
+            frame["name"] = users[frame["user"].to_numpy()]
+            # Busiest conversations first, each with its posters by message count (ties by name)
+            frame = frame.sort_values(["total", "channel", "messages", "name"], ascending=[False, True, False, True])
+            frame = frame.groupby("channel", sort=False).head(top)
+            return pd.DataFrame({
+                "conversation": labels[frame["channel"].to_numpy()],
+                "user": frame["name"].to_numpy(),
+                "messages": frame["messages"].to_numpy(),
+                "share": frame["share"].to_numpy(),
+            })
+        return self._memo(("posters", top), compute)
+
+def get_workspace_analytics(workspace: WorkspaceData) -> WorkspaceAnalytics:
+    """The workspace's analytics, built on first use"""
+    if workspace.analytics is None:
+        workspace.analytics = WorkspaceAnalytics(workspace)
+    return workspace.analytics
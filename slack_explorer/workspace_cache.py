@@ -0,0 +1,160 @@
+"""
+On-disk cache of parsed workspace data.
+
+Parsing a large export (users.json, groups.json, ... and every per-day message file) can take
+minutes, so the parsed `WorkspaceData` is kept in a single gzip-compressed pickle. The cache is keyed
+by a manifest of file names, sizes and mtimes: a warm load only has to stat the export, and only
+channels whose day files changed are parsed again.
+
+NOTE: the cache is a pickle, only point it at locations you trust.
+"""
+import gzip
+import os
+import pickle
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+from data_loader import (
+    DaySource, ExportPath, Message, WorkspaceData, list_day_files, messages_from_columns, messages_to_columns,
+    split_export_paths,
+)
+from zip_export import is_zip_export
+
+# Bump when the cached dataclasses or the payload layout change, older caches are then ignored
+CACHE_FORMAT_VERSION = 2
+
+METADATA_FILES = ["users.json", "groups.json", "dms.json", "mpims.json"]
+
+# Manifest: file name -> (size in bytes, mtime in ns)
+Manifest = Dict[str, Tuple[int, int]]
+
+def default_cache_dir(export_path: Union[str, Path]) -> Path:
+    """
+    Hidden folder for derived data: inside the export directory, or next to a zipped export. Merged
+    exports keep theirs in the newest export's folder
+    """
+    export_paths = split_export_paths(str(export_path))
+    if len(export_paths) > 1:
+        return default_cache_dir(export_paths[-1]) / "merged"
+    if is_zip_export(export_path):
+        return Path(export_path).parent / ".explorer_cache" / Path(export_path).stem
+    return Path(export_path) / ".explorer_cache"
+
+def default_cache_path(export_path: Union[str, Path]) -> Path:
+    """Default location of the parsed-data cache"""
+    return default_cache_dir(export_path) / "workspace.pkl.gz"
+
+def file_signature(path: ExportPath) -> Tuple[int, int]:
+    """Cheap change detection for a file: (size, mtime_ns)"""
+    stat = path.stat()
+    return stat.st_size, stat.st_mtime_ns
+
+def build_metadata_manifest(export_dir: ExportPath) -> Manifest:
+    """Manifest of the reference files users/channels are parsed from"""
+    manifest = {}
+    for name in METADATA_FILES:
+        path = export_dir / name
+        if path.exists():
+            manifest[name] = file_signature(path)
+    return manifest
+
+def build_channel_manifest(channel_dir: ExportPath) -> Manifest:
+    """Manifest of a channel directory's day files, keyed by the path relative to the export"""
+    return {
+        f"{channel_dir.name}/{msg_file.name}": file_signature(msg_file)
+        for msg_file in list_day_files(channel_dir)
+    }
+
+class WorkspaceCache:
+    """
+    Per-load view of the cache file.
+
+    Reads the previous cache (if any) on creation, hands out entries that are still fresh, collects
+    freshly parsed channels and writes the merged result back with `save`.
+    """
+
+    def __init__(self, cache_path: Union[str, Path], export_dir: ExportPath):
+        self.cache_path = Path(cache_path)
+        self.export_dir = export_dir
+        self.metadata_manifest = build_metadata_manifest(self.export_dir)
+        self._cached = self._read()
+        self._entries: Dict[str, dict] = {}  # channel_id -> {"manifest": ..., "columns": ..., "sources": ...}
+        self._dirty = self._cached is None
+
+    def _read(self) -> Optional[dict]:
+        if not self.cache_path.exists():
+            return None
+        try:
+            with gzip.open(self.cache_path, "rb") as f:
+                payload = pickle.load(f)
+        except Exception as e:  # Corrupt/partial cache or dataclasses changed shape, just rebuild
+            print(f"Ignoring unreadable workspace cache {self.cache_path}: {e}")
+            return None
+
+        if payload.get("version") != CACHE_FORMAT_VERSION:
+            return None
+        if payload.get("export_dir") != str(self.export_dir.resolve()):
+            return None
+        return payload
+
+    def metadata_is_fresh(self) -> bool:
+        """True if users/channels can be taken from the cache as-is"""
+        return self._cached is not None and self._cached["metadata_manifest"] == self.metadata_manifest
+
+    @property
+    def users(self):
+        return self._cached["users"]
+
+    @property
+    def channels(self):
+        return self._cached["channels"]
+
+    def get_channel_messages(self, channel_id: str, channel_dir: ExportPath) -> Optional[Tuple[List[Message], Dict[str, DaySource]]]:
+        """Cached (messages, day file sources) for a channel, or None if the channel's day files changed"""
+        if self._cached is None:
+            return None
+        entry = self._cached["channel_messages"].get(channel_id)
+        if entry is None or entry["manifest"] != build_channel_manifest(channel_dir):
+            return None
+        self._entries[channel_id] = entry
+        return messages_from_columns(entry["columns"]), entry["sources"]
+
+    def put_channel_messages(
+        self,
+        channel_id: str,
+        channel_dir: ExportPath,
+        messages: List[Message],
+        sources: Dict[str, DaySource]
+    ) -> None:
+        """Record freshly parsed messages so they are written on `save`"""
+        self._entries[channel_id] = {
+            # Signatures taken when the files were parsed, so a file written since then is re-parsed next time
+            "manifest": {f"{channel_dir.name}/{name}": source[:2] for name, source in sources.items()},
+            "columns": messages_to_columns(messages),
+            "sources": sources,
+        }
+        self._dirty = True
+
+    def save(self, workspace: WorkspaceData) -> None:
+        """Write the cache if anything was (re)parsed during this load"""
+        if self.metadata_is_fresh() and not self._dirty:
+            return
+
+        payload = {
+            "version": CACHE_FORMAT_VERSION,
+            "export_dir": str(self.export_dir.resolve()),
+            "metadata_manifest": self.metadata_manifest,
+            "users": workspace.users,
+            "channels": workspace.channels,
+            "channel_messages": self._entries,
+        }
+
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            # Write to a temp file first so a crash never leaves a half-written cache behind
+            tmp_path = self.cache_path.with_suffix(".tmp")
+            with gzip.open(tmp_path, "wb", compresslevel=1) as f:
+                pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:  # e.g. read-only export directory, the cache is only an optimization
+            print(f"Could not write workspace cache {self.cache_path}: {e}")
@@ -0,0 +1,134 @@
+"""
+Incremental reload: bring a loaded workspace up to date with its export directory.
+
+`WorkspaceData.sources` records, per channel, every day file's size/mtime and the ts range of its
+messages. A refresh compares that with the files on disk and only parses day files that are new or
+changed. Each day file is one calendar day, so its messages are a contiguous ts range of the channel:
+a changed or removed file's old messages are dropped by range, and the newly parsed (sorted) messages
+are merged into the sorted channel list in one linear pass instead of re-sorting it.
+
+The refresh is copy-on-write: it returns a new `WorkspaceData` and never modifies the one passed in,
+which other sessions may still be reading (see workspace_registry.py). Unchanged channels share their
+message lists, thread and time indexes with the old workspace; the search index is rebuilt lazily.
+"""
+import heapq
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+from data_loader import (
+    DaySource, ExportPath, Message, WorkspaceData, day_file_source, existing_channel_dirs, list_day_files,
+    load_channel_sources, load_channels, load_day_file, load_users, open_export,
+)
+from workspace_cache import file_signature
+
+@dataclass
+class RefreshSummary:
+    new_files: int = 0
+    changed_files: int = 0
+    removed_files: int = 0
+    updated_channels: int = 0
+    reparsed_channels: int = 0  # fell back to parsing the whole channel (new channel, or overlapping day files)
+    messages_before: int = 0
+    messages_after: int = 0
+
+    @property
+    def has_changes(self) -> bool:
+        return bool(self.new_files or self.changed_files or self.removed_files or self.reparsed_channels)
+
+def _overlaps(source: DaySource, others: List[DaySource]) -> bool:
+    return any(source[2] <= other[3] and other[2] <= source[3] for other in others)
+
+def refresh_channel(
+    channel_dir: ExportPath,
+    messages: List[Message],
+    sources: Dict[str, DaySource],
+    summary: RefreshSummary
+) -> Tuple[List[Message], Dict[str, DaySource]]:
+    """
+    Updated (messages, sources) for one channel. Returns the inputs themselves when nothing changed.
+    """
+    day_files = {msg_file.name: msg_file for msg_file in list_day_files(channel_dir)}
+    current = {name: file_signature(msg_file) for name, msg_file in day_files.items()}
+    new = [name for name in current if name not in sources]
+    changed = [name for name in current if name in sources and sources[name][:2] != current[name]]
+    removed = [name for name in sources if name not in current]
+    if not (new or changed or removed):
+        return messages, sources
+
+    summary.new_files += len(new)
+    summary.changed_files += len(changed)
+    summary.removed_files += len(removed)
+
+    # Old messages of changed/removed files are dropped by ts range; that's only safe if no file that
+    # stays has messages inside the range
+    stale = [sources[name] for name in changed + removed]
+    kept = [source for name, source in sources.items() if name not in changed and name not in removed]
+    if any(_overlaps(source, kept) for source in stale):
+        summary.reparsed_channels += 1
+        return load_channel_sources(channel_dir)
+
+    if stale:
+        messages = [msg for msg in messages if not any(lo <= msg.ts <= hi for _, _, lo, hi in stale)]
+
+    new_sources = {name: source for name, source in sources.items() if name not in changed and name not in removed}
+    parsed = []
+    for name in sorted(new + changed):
+        stat = day_files[name].stat()  # Before reading, see day_file_source
+        day_messages = load_day_file(day_files[name])
+        new_sources[name] = day_file_source(stat, day_messages)
+        parsed.extend(day_messages)
+    parsed.sort(key=lambda m: m.ts)
+
+    summary.updated_channels += 1
+    return list(heapq.merge(messages, parsed, key=lambda m: m.ts)), new_sources
+
+def refresh_workspace_data(workspace: WorkspaceData, export_path: str) -> Tuple[WorkspaceData, RefreshSummary]:
+    """
+    A new workspace with the export's new/changed day files merged in, plus what changed.
+
+    Only works for workspaces loaded as Message lists (the default, with or without the cache): lazy,
+    columnar and SQLite workspaces have no `sources` and need a full load (SQLite imports are
+    incremental already).
+    """
+    if workspace.sources is None:
+        raise ValueError("Incremental refresh needs a workspace loaded into memory as message lists")
+
+    export_dir = open_export(export_path)
+    users = load_users(export_dir)
+    channels = load_channels(export_dir, users)
+    summary = RefreshSummary(messages_before=sum(len(msgs) for msgs in workspace.messages.values()))
+
+    messages, sources = {}, {}
+    for channel_id, channel_dir in existing_channel_dirs(export_dir, channels, users).items():
+        old_sources = workspace.sources.get(channel_id)
+        if old_sources is None:  # New channel (or one whose folder only just appeared)
+            summary.reparsed_channels += 1
+            channel_messages, channel_sources = load_channel_sources(channel_dir)
+        else:
+            channel_messages, channel_sources = refresh_channel(
+                channel_dir, workspace.messages.get(channel_id, []), old_sources, summary
+            )
+        sources[channel_id] = channel_sources
+        if channel_messages:
+            messages[channel_id] = channel_messages
+
+    # Keep the channel order of channels.json, like load_workspace_data
+    messages = {channel_id: messages[channel_id] for channel_id in channels if channel_id in messages}
+    summary.messages_after = sum(len(msgs) for msgs in messages.values())
+
+    # Derived per-channel structures stay valid for channels whose message list is the same object
+    unchanged = [cid for cid, msgs in messages.items() if workspace.messages.get(cid) is msgs]
+    refreshed = WorkspaceData(
+        users=users,
+        channels=channels,
+        messages=messages,
+        sources=sources,
+        threads={cid: workspace.threads[cid] for cid in unchanged if cid in workspace.threads},
+        time_indexes={cid: workspace.time_indexes[cid] for cid in unchanged if cid in workspace.time_indexes},
+    )
+    if workspace.rendered is not None:
+        # Entries are also checked against the new user table on use (render_cache.get_render_cache)
+        refreshed.rendered = workspace.rendered.for_channels(unchanged)
+    if workspace.search_index is not None and unchanged == list(workspace.messages):
+        refreshed.search_index = workspace.search_index  # Same channels in the same order: same document ids
+    return refreshed, summary
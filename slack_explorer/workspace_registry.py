@@ -0,0 +1,166 @@
+"""
+Process-wide registry of loaded workspaces, shared by all Streamlit sessions.
+
+Every browser tab used to parse the export again and keep its own copy in `st.session_state`. Now a
+session asks the registry for (export path, export version, load options) and gets the one shared
+`WorkspaceData` for that key, loading it only if no other session has. Sessions treat it as read-only;
+the derived indexes hung off it (threads, search index, ...) are filled once and then shared too.
+
+Sessions hold a `WorkspaceHandle` in their session state and the registry only keeps weak references
+to handles, so a workspace's reference count drops on its own when a session closes or unloads it.
+Unreferenced workspaces are dropped when a newer version of the same export is loaded, or on request.
+"""
+import hashlib
+import threading
+import time
+import weakref
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import streamlit as st
+
+from columnar_store import ChannelColumns
+from data_loader import LazyMessages, WorkspaceData, estimate_messages_bytes, open_export, split_export_paths
+from sqlite_store import SqliteMessages
+from workspace_cache import METADATA_FILES, file_signature
+from zip_export import ZipExportPath
+
+class RegistryKey(NamedTuple):
+    export_path: str  # absolute
+    version: str  # see export_version
+    options: Tuple  # load options that change what's held in memory (backend, lazy, columnar, ...)
+
+def export_version(export_path: str) -> str:
+    """
+    Short hash of the export's files (sizes and mtimes), changes when files are added, removed or
+    rewritten. A zipped export is versioned by the archive file itself, merged exports by their parts.
+    """
+    export_paths = split_export_paths(export_path)
+    if len(export_paths) > 1:
+        return hashlib.sha1(repr([export_version(path) for path in export_paths]).encode()).hexdigest()[:12]
+    export_dir = open_export(export_path)
+    if isinstance(export_dir, ZipExportPath):
+        signature = file_signature(Path(export_dir.zip_path))
+    else:
+        signature = sorted(
+            (str(path.relative_to(export_dir)), *file_signature(path))
+            for path in [*export_dir.glob("*/*.json"), *(export_dir / name for name in METADATA_FILES)]
+            if path.exists()
+        )
+    return hashlib.sha1(repr(signature).encode()).hexdigest()[:12]
+
+def workspace_memory_bytes(workspace: WorkspaceData) -> int:
+    """Approximate memory held by a workspace's messages (0 for the SQLite backend, which reads from disk)"""
+    messages = workspace.messages
+    if isinstance(messages, SqliteMessages):
+        return 0
+    if isinstance(messages, LazyMessages):
+        return messages.loaded_bytes
+    return sum(
+        msgs.nbytes if isinstance(msgs, ChannelColumns) else estimate_messages_bytes(msgs)
+        for msgs in messages.values()
+    )
+
+class WorkspaceHandle:
+    """A session's reference to a shared workspace; the registry counts live handles"""
+
+    def __init__(self, key: RegistryKey, workspace: WorkspaceData):
+        self.key = key
+        self.workspace = workspace
+
+@dataclass
+class SharedWorkspace:
+    key: RegistryKey
+    workspace: WorkspaceData
+    loaded_at: float
+    load_seconds: float
+    memory_bytes: int  # measured after loading, see workspace_memory_bytes
+    loader: Callable[[], WorkspaceData]  # full load, kept for reloading newer versions of the export
+    handles: weakref.WeakSet = field(default_factory=weakref.WeakSet)
+
+    @property
+    def ref_count(self) -> int:
+        return len(self.handles)
+
+class WorkspaceRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[RegistryKey, SharedWorkspace] = {}
+        self._key_locks: Dict[RegistryKey, threading.Lock] = {}  # one load at a time per key
+
+    def acquire(
+        self,
+        key: RegistryKey,
+        loader: Callable[[], WorkspaceData],
+        build: Optional[Callable[[], WorkspaceData]] = None
+    ) -> WorkspaceHandle:
+        """
+        Handle to the workspace for key, calling loader() only if it isn't loaded yet. build optionally
+        replaces loader for this one load (e.g. an incremental refresh of the previous version), loader
+        is still what later reloads fall back to.
+        """
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:  # Sessions opening the same export at the same time wait for a single load
+            entry = self._entries.get(key)
+            if entry is None:
+                start = time.perf_counter()
+                workspace = (build or loader)()
+                entry = SharedWorkspace(
+                    key=key,
+                    workspace=workspace,
+                    loaded_at=time.time(),
+                    load_seconds=time.perf_counter() - start,
+                    memory_bytes=workspace_memory_bytes(workspace),
+                    loader=loader
+                )
+                with self._lock:
+                    self._entries[key] = entry
+                    self._drop_superseded(key)
+            handle = WorkspaceHandle(key, entry.workspace)
+            entry.handles.add(handle)
+            return handle
+
+    def loader_for(self, key: RegistryKey) -> Callable[[], WorkspaceData]:
+        return self._entries[key].loader
+
+    def _drop_superseded(self, key: RegistryKey) -> None:
+        # Older versions of the same export that no session uses anymore
+        for other in list(self._entries):
+            if other[0] == key[0] and other[2] == key[2] and other != key and not self._entries[other].ref_count:
+                del self._entries[other]
+                self._key_locks.pop(other, None)
+
+    def prune(self) -> int:
+        """Drop every workspace no session references, returns how many were dropped"""
+        with self._lock:
+            unused = [key for key, entry in self._entries.items() if not entry.ref_count]
+            for key in unused:
+                del self._entries[key]
+                self._key_locks.pop(key, None)
+        return len(unused)
+
+    def stats(self) -> List[Dict]:
+        """One row per loaded workspace: what it is, how many sessions use it and its memory use"""
+        with self._lock:
+            entries = list(self._entries.values())
+        rows = []
+        for entry in entries:
+            messages = entry.workspace.messages
+            rows.append({
+                "export": entry.key.export_path,
+                "version": entry.key.version,
+                "options": ", ".join(map(str, entry.key.options)),
+                "sessions": entry.ref_count,
+                # Lazy workspaces grow and shrink as channels are opened, measure them live
+                "memory_mb": round((messages.loaded_bytes if isinstance(messages, LazyMessages)
+                                    else entry.memory_bytes) / (1024 * 1024), 1),
+                "load_seconds": round(entry.load_seconds, 2),
+            })
+        return rows
+
+@st.cache_resource
+def get_registry() -> WorkspaceRegistry:
+    """The registry, one per server process"""
+    return WorkspaceRegistry()
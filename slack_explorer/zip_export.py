@@ -0,0 +1,137 @@
+"""
+Read Slack export .zip archives in place, without extracting them.
+
+`ZipExportPath` implements the small part of the pathlib.Path API the loader uses (`/`, `name`,
+`exists`, `glob`, `stat`, `open`), so everything that walks an export directory works on an archive
+as-is. Lookups are answered from the archive's central directory, which is read once per process.
+Paths pickle as (archive path, member name), so process pool workers reopen the archive themselves
+and read members in parallel.
+"""
+import fnmatch
+import io
+import os
+import posixpath
+import zipfile
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Dict, List, Tuple, Union
+
+class ZipArchive:
+    """An open archive plus file/directory listings built from its central directory"""
+
+    def __init__(self, zip_path: str):
+        self.zip_path = zip_path
+        stat = os.stat(zip_path)
+        self.signature = (stat.st_size, stat.st_mtime_ns)  # To notice the archive being replaced
+        self.zip = zipfile.ZipFile(zip_path)
+        infos = [info for info in self.zip.infolist() if not info.is_dir()]
+
+        # Exports are normally zipped flat, but tolerate a single wrapping folder ("export/users.json")
+        names = {info.filename for info in infos}
+        self.root = ""
+        if "users.json" not in names:
+            wrapped = [name for name in names if posixpath.basename(name) == "users.json" and name.count("/") == 1]
+            if len(wrapped) == 1:
+                self.root = posixpath.dirname(wrapped[0]) + "/"
+
+        self.files: Dict[str, zipfile.ZipInfo] = {}  # member path relative to root -> info
+        self.dirs: Dict[str, List[str]] = {"": []}  # dir relative to root -> child names
+        for info in infos:
+            if not info.filename.startswith(self.root):
+                continue
+            member = info.filename[len(self.root):]
+            self.files[member] = info
+            parent, name = posixpath.split(member)
+            self.dirs.setdefault(parent, []).append(name)
+            # Register intermediate folders too, archives don't always contain directory entries
+            while parent and parent not in self.dirs.get(posixpath.dirname(parent), ()):
+                grandparent = posixpath.dirname(parent)
+                self.dirs.setdefault(grandparent, []).append(posixpath.basename(parent))
+                self.dirs.setdefault(parent, [])
+                parent = grandparent
+
+# One open archive per process, shared by all paths into it (ZipFile reads are thread-safe). Keyed by
+# pid as well: forked pool workers inherit this dict, but must not share the parent's file offset.
+_archives: Dict[Tuple[int, str], ZipArchive] = {}
+
+def open_archive(zip_path: Union[str, Path]) -> ZipArchive:
+    key = (os.getpid(), os.path.abspath(zip_path))
+    archive = _archives.get(key)
+    if archive is not None:
+        stat = os.stat(key[1])
+        if archive.signature != (stat.st_size, stat.st_mtime_ns):
+            archive.zip.close()
+            archive = None
+    if archive is None:
+        archive = _archives[key] = ZipArchive(key[1])
+    return archive
+
+class ZipExportPath:
+    """A file or folder inside a zipped export, addressed like a pathlib.Path"""
+
+    def __init__(self, zip_path: Union[str, Path], member: str = ""):
+        self.zip_path = os.path.abspath(zip_path)
+        self.member = member.strip("/")
+
+    @property
+    def archive(self) -> ZipArchive:
+        return open_archive(self.zip_path)
+
+    def __truediv__(self, name: str) -> "ZipExportPath":
+        return ZipExportPath(self.zip_path, posixpath.join(self.member, name))
+
+    @property
+    def name(self) -> str:
+        return posixpath.basename(self.member) if self.member else Path(self.zip_path).stem
+
+    def exists(self) -> bool:
+        return self.member in self.archive.files or self.member in self.archive.dirs
+
+    def glob(self, pattern: str) -> List["ZipExportPath"]:
+        """Direct children matching pattern (no recursive ** support)"""
+        return [
+            self / name
+            for name in self.archive.dirs.get(self.member, [])
+            if fnmatch.fnmatchcase(name, pattern) and posixpath.join(self.member, name) in self.archive.files
+        ]
+
+    def stat(self) -> SimpleNamespace:
+        """Size and modification time from the central directory (the fields the loader uses)"""
+        info = self._info()
+        mtime = datetime(*info.date_time).timestamp()
+        return SimpleNamespace(st_size=info.file_size, st_mtime=mtime, st_mtime_ns=int(mtime * 1e9))
+
+    def open(self, mode: str = "r", encoding: str = "utf-8"):
+        if mode not in ("r", "rb"):
+            raise ValueError("Zipped exports are read-only")
+        raw = self.archive.zip.open(self._info())
+        return raw if mode == "rb" else io.TextIOWrapper(raw, encoding=encoding)
+
+    def resolve(self) -> "ZipExportPath":
+        return self
+
+    def _info(self) -> zipfile.ZipInfo:
+        info = self.archive.files.get(self.member)
+        if info is None:
+            raise FileNotFoundError(f"{self.member} not found in {self.zip_path}")
+        return info
+
+    def __reduce__(self):
+        # Pickle by location only, the receiving process opens its own handle on the archive
+        return ZipExportPath, (self.zip_path, self.member)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, ZipExportPath) and (self.zip_path, self.member) == (other.zip_path, other.member)
+
+    def __hash__(self) -> int:
+        return hash((self.zip_path, self.member))
+
+    def __str__(self) -> str:
+        return f"{self.zip_path}/{self.member}" if self.member else self.zip_path
+
+    def __repr__(self) -> str:
+        return f"ZipExportPath({str(self)!r})"
+
+def is_zip_export(export_path: Union[str, Path]) -> bool:
+    return str(export_path).lower().endswith(".zip") and os.path.isfile(export_path)
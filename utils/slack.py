@@ -1,17 +1,23 @@
 import os
 import re
 import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, List
 from datetime import datetime
 
 from dotenv import load_dotenv
 from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
+from slack_sdk.http_retry.builtin_handlers import RateLimitErrorRetryHandler
 
 load_dotenv()
 
 # Elevate Code Bot Settings: https://api.slack.com/apps/A06CZA1Q8D7
 
+# Thread replies fetched at the same time by get_channel_messages (requests over Slack's rate limit are
+# retried after the wait Slack asks for)
+THREAD_FETCH_WORKERS = 8
+
 def post_message_to_channel(channel_id: str, message: str, use_markdown: bool = True) -> Dict[str, Any]:
     """
     Posts a message to a specific Slack channel using the SLACK_BOT_USER_TOKEN.
@@ -42,17 +48,23 @@ def get_channel_messages(
     channel_id: str,
     start_time: str,
     end_time: str,
-    get_threads: bool = False
+    get_threads: bool = False,
+    thread_workers: int = THREAD_FETCH_WORKERS
 ) -> List[Dict[str, Any]]:
     """
     Retrieves messages from a Slack channel within a specified date range.
     Optionally fetches thread replies if get_threads is True.
 
+    Thread replies are fetched on a pool of thread_workers threads while the history is still being
+    paged through, and attached to their parent messages once it's done, so messages keep the order
+    of the history.
+
     Args:
         channel_id: The ID of the channel to fetch messages from.
         start_time: ISO 8601 timestamp for start date (e.g., "2024-03-20T00:00:00").
         end_time: ISO 8601 timestamp for end date (e.g., "2024-03-21T00:00:00").
         get_threads: If True, any message with a thread_ts will have replies fetched and nested.
+        thread_workers: Maximum number of thread reply fetches running at the same time.
 
     Returns:
         A list of message objects with relevant fields and optional thread replies.
@@ -66,11 +78,15 @@ def get_channel_messages(
         raise ValueError("Slack bot token not found in environment variables.")
 
     client = WebClient(token=slack_bot_token)
+    # Concurrent reply fetches run into the rate limit sooner, wait and retry instead of failing
+    client.retry_handlers.append(RateLimitErrorRetryHandler(max_retry_count=5))
 
     user_map = fetch_user_map(client)
     channel_map = fetch_channel_map(client)
 
     messages = []
+    pending_replies: List[tuple] = []  # (parsed message, Future of its replies)
+    executor = ThreadPoolExecutor(max_workers=thread_workers) if get_threads else None
 
     try:
         start_ts = int(datetime.fromisoformat(start_time).timestamp())
@@ -90,14 +106,15 @@ def get_channel_messages(
                 parsed = parse_message(msg, user_map, channel_map)
 
                 if get_threads and "thread_ts" in msg and msg.get("reply_count", 0) > 0:
-                    thread_replies = fetch_thread_replies(
+                    future = executor.submit(
+                        fetch_thread_replies,
                         client,
                         channel_id,
                         msg["thread_ts"],
                         user_map,
                         channel_map
                     )
-                    parsed["thread_replies"] = thread_replies
+                    pending_replies.append((parsed, future))
 
                 messages.append(parsed)
 
@@ -105,11 +122,18 @@ def get_channel_messages(
             if not cursor:
                 break
 
+        for parsed, future in pending_replies:
+            parsed["thread_replies"] = future.result()
+
         return messages
 
     except SlackApiError as e:
         print(f"Error fetching messages: {e.response['error']}")
         raise
+    finally:
+        if executor:
+            # Don't start the fetches still queued if something failed
+            executor.shutdown(cancel_futures=True)
 
 def simple_slackify(text: str) -> str:
     """